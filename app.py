@@ -1,7 +1,7 @@
 """
 PDF Kompresor - Flask Web Aplikácia
 """
-from flask import Flask, render_template, request, send_file, jsonify, session
+from flask import Flask, render_template, request, send_file, jsonify, session, Response, stream_with_context
 from werkzeug.utils import secure_filename
 import os
 import uuid
@@ -9,32 +9,97 @@ import time
 from pathlib import Path
 from datetime import datetime, timedelta
 import threading
+import multiprocessing
 import secrets
-from pdf_compressor import compress_pdf
+import json
+from job_scheduler import JobScheduler, StoreQueue, QueueFullError, JOB_QUEUE
+from pdf_compressor import get_toolchain, output_settings
+from result_cache import ResultCache, cache_key
+from job_store import FINISHED_STATUSES, STATUS_PENDING, create_job_store
+from metrics import METRICS_ENABLED, job_result_values, record_job, render_metrics
+from worker import complete_job
+from job_profiler import PROFILE_REPORT_SUFFIX, PROFILE_STATS_SUFFIX
+from upload_stream import StreamingUploadRequest
+from werkzeug.exceptions import HTTPException
 
 app = Flask(__name__)
+# Nahrávané súbory sa zapisujú streamovane priamo do UPLOAD_FOLDER
+app.request_class = StreamingUploadRequest
 app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(32))
 
 # Konfigurácia
 UPLOAD_FOLDER = Path('uploads')
 COMPRESSED_FOLDER = Path('compressed')
+CACHE_FOLDER = Path('cache')
 MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE', 600 * 1024 * 1024))  # 600 MB default
 CLEANUP_AGE_HOURS = int(os.environ.get('CLEANUP_AGE', 24))  # 24 hodín default
 ALLOWED_EXTENSIONS = {'pdf'}
 MAX_BATCH_FILES = 50  # Maximum počet súborov v jednom batchi
+SSE_MIN_INTERVAL = 0.5  # Minimálny odstup SSE správ jedného streamu (zlúčenie zmien)
+SSE_HEARTBEAT = 15  # Keepalive komentár, aby proxy nezavrela nečinné spojenie
+# Maximálny počet SSE streamov na proces - každý obsadí vlákno Gunicornu,
+# ostatné ostanú pre uploady; nad limit klient prejde na polling (HTTP 503)
+MAX_SSE_STREAMS = int(os.environ.get('MAX_SSE_STREAMS', int(os.environ.get('WEB_THREADS', 16)) // 2))
+# Token administrátora (hlavička X-Admin-Token) - povoľuje profilovanie úloh;
+# bez nastavenia nie je administrátorom nikto
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
 
 # Vytvorenie adresárov
 UPLOAD_FOLDER.mkdir(exist_ok=True)
 COMPRESSED_FOLDER.mkdir(exist_ok=True)
 
+# Cache výsledkov pre opakované nahratie rovnakých súborov
+result_cache = ResultCache(CACHE_FOLDER)
+
 # Konfigurácia Flask
 app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_SIZE
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['COMPRESSED_FOLDER'] = COMPRESSED_FOLDER
+StreamingUploadRequest.upload_folder = UPLOAD_FOLDER
+StreamingUploadRequest.max_file_size = MAX_UPLOAD_SIZE
+
+# Progress tracking - stav úloh a batchov (JOB_STORE: memory alebo sqlite)
+job_store = create_job_store()
+# Zdieľaný stav môžu meniť aj iné procesy (worker.py) - SSE ho číta periodicky
+SSE_POLL = job_store.backend != 'memory'
+
+# Notifikácia SSE streamov o zmene stavu úloh
+state_changed = threading.Condition()
+state_version = 0
+
+
+def notify_state_change():
+    """Zobudí SSE streamy - stav niektorej úlohy (alebo poradie vo fronte) sa zmenil"""
+    global state_version
+    with state_changed:
+        state_version += 1
+        state_changed.notify_all()
+
+
+# Otvorené SSE streamy (batch_id -> počet) a ich spoločný stav batchu
+# (batch_id -> (verzia stavu, čas načítania, stav)), aby sa úložisko čítalo
+# raz za batch bez ohľadu na počet sledujúcich
+sse_lock = threading.Lock()
+sse_streams = {}
+sse_snapshots = {}
+
+
+def open_sse_stream(batch_id):
+    """Obsadí miesto pre SSE stream batchu, vráti False ak je limit vyčerpaný"""
+    with sse_lock:
+        if sum(sse_streams.values()) >= MAX_SSE_STREAMS:
+            return False
+        sse_streams[batch_id] = sse_streams.get(batch_id, 0) + 1
+        return True
+
 
-# Progress tracking
-compression_progress = {}
-batch_progress = {}  # Tracking pre celé batche súborov
+def close_sse_stream(batch_id):
+    """Uvoľní miesto SSE streamu, stav batchu sa zahodí s posledným streamom"""
+    with sse_lock:
+        sse_streams[batch_id] -= 1
+        if not sse_streams[batch_id]:
+            del sse_streams[batch_id]
+            sse_snapshots.pop(batch_id, None)
 
 
 def allowed_file(filename):
@@ -56,15 +121,49 @@ def cleanup_old_files():
                         print(f"Vymazaný starý súbor: {file_path}")
                     except Exception as e:
                         print(f"Chyba pri mazaní {file_path}: {e}")
+    
+    # Vyradenie starých a nadlimitných položiek cache
+    result_cache.evict()
+    
+    # Vyradenie stavu starých batchov
+    job_store.evict()
 
 
-def progress_callback(filename, progress, job_id):
-    """Callback funkcia pre progress reporting"""
-    compression_progress[job_id] = {
-        'filename': filename,
-        'progress': progress,
-        'status': 'processing'
-    }
+def job_started(job_id):
+    """Callback plánovača - úloha sa začala spracovávať"""
+    if job_store.start_job(job_id):
+        notify_state_change()
+
+
+def job_progress(job_id, progress):
+    """Callback plánovača - zmena pokroku úlohy"""
+    # Oneskorené správy z workera po dokončení úlohy store ignoruje
+    if job_store.set_progress(job_id, progress):
+        notify_state_change()
+
+
+def job_finished(job_id, success, message):
+    """Callback plánovača - úloha dokončená (úspešne alebo s chybou)"""
+    if complete_job(job_store, result_cache, job_id, success, message):
+        notify_state_change()
+
+
+def job_stats(job_id, success, stats):
+    """Callback plánovača - merania dokončenej úlohy (fázy, počítadlá, čakanie vo fronte)"""
+    record_job(job_store, job_id, success, stats)
+
+
+# Centrálny plánovač kompresie - lokálny pool procesov (COMPRESSION_WORKERS),
+# alebo len fronta pre samostatné worker procesy (JOB_QUEUE=store, worker.py)
+if JOB_QUEUE == 'store':
+    scheduler = StoreQueue(job_store)
+else:
+    scheduler = JobScheduler(
+        on_start=job_started,
+        on_progress=job_progress,
+        on_finish=job_finished,
+        on_stats=job_stats if METRICS_ENABLED else None
+    )
 
 
 @app.route('/')
@@ -73,14 +172,159 @@ def index():
     return render_template('index.html')
 
 
+def parse_compression_params(form):
+    """
+    Získanie a validácia parametrov kompresie (predvolené hodnoty: DPI=150, Kvalita=85).
+    
+    Returns:
+        Tuple (dpi, jpeg_quality, error) - error je chybová odpoveď alebo None
+    """
+    try:
+        dpi = int(form.get('dpi', 150))
+        jpeg_quality = int(form.get('quality', 85))
+        
+        # Validácia parametrov (0 = auto režim)
+        if dpi != 0 and not (100 <= dpi <= 200):
+            return None, None, (jsonify({'error': 'DPI musí byť medzi 100 a 200, alebo 0 pre auto'}), 400)
+        if jpeg_quality != 0 and not (60 <= jpeg_quality <= 95):
+            return None, None, (jsonify({'error': 'JPEG kvalita musí byť medzi 60 a 95, alebo 0 pre auto'}), 400)
+    except ValueError:
+        return None, None, (jsonify({'error': 'Neplatné parametre DPI alebo kvality'}), 400)
+    
+    return dpi, jpeg_quality, None
+
+
+def is_admin_request():
+    """Požiadavka nesie platný token administrátora (X-Admin-Token)"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def parse_profile_flag(form):
+    """
+    Príznak profilovania úlohy z formulára (profile=1) - len pre administrátora.
+    
+    Returns:
+        Tuple (profile, error) - error je chybová odpoveď alebo None
+    """
+    if form.get('profile', '').lower() not in ('1', 'true', 'on'):
+        return False, None
+    if not is_admin_request():
+        return False, (jsonify({'error': 'Profilovanie je dostupné len pre administrátora'}), 403)
+    return True, None
+
+
+def validate_upload(file):
+    """Kontrola názvu a typu nahratého súboru, vráti chybovú odpoveď alebo None"""
+    if file.filename == '':
+        return jsonify({'error': 'Jeden alebo viac súborov nemá názov'}), 400
+    if not allowed_file(file.filename):
+        return jsonify({'error': f'Súbor {file.filename} nie je PDF. Povolené sú len PDF súbory'}), 400
+    return None
+
+
+def queue_full_response():
+    """HTTP 503 s Retry-After, keď sa úlohy nezmestia do fronty"""
+    response = jsonify({'error': 'Server je momentálne preťažený. Skúste to znova o chvíľu.'})
+    response.headers['Retry-After'] = '30'
+    return response, 503
+
+
+def create_batch(total_files, dpi, jpeg_quality):
+    """Vytvorí nový batch a vráti jeho ID"""
+    batch_id = str(uuid.uuid4())
+    job_store.create_batch(batch_id, total_files, dpi, jpeg_quality)
+    return batch_id
+
+
+def enqueue_upload(batch_id, file, profile=False):
+    """
+    Prevezme nahratý súbor do batchu a odovzdá ho plánovaču kompresie.
+    
+    Args:
+        profile: Profilovať kompresiu - profil sa uloží vedľa výstupu (cache sa obíde)
+    
+    Returns:
+        Tuple (job_id, error) - error je chybová odpoveď alebo None
+    """
+    settings = job_store.get_batch_settings(batch_id)
+    if settings is None:
+        return None, (jsonify({'error': 'Batch ID nenájdené'}), 404)
+    dpi = settings['dpi']
+    jpeg_quality = settings['jpeg_quality']
+    
+    filename = secure_filename(file.filename)
+    job_id = str(uuid.uuid4())
+    
+    unique_filename = f"{int(settings['created'])}_{job_id[:8]}_{filename}"
+    input_path = UPLOAD_FOLDER / unique_filename
+    
+    # Output path
+    output_filename = f"compressed_{unique_filename}"
+    output_path = COMPRESSED_FOLDER / output_filename
+    
+    # Hash a veľkosť sa skontrolovali už počas prenosu
+    files = {
+        'input_path': str(input_path),
+        'output_path': str(output_path),
+        'output_filename': output_filename,
+        'cache_key': cache_key(file.stream.sha256, dpi, jpeg_quality, output_settings()),
+        'queued': time.time(),
+        'profile': profile
+    }
+    
+    # Initialize progress pre tento súbor (batch nesmie prekročiť ohlásený počet)
+    if not job_store.add_job(job_id, batch_id, filename, files):
+        return None, (jsonify({'error': 'Batch už obsahuje všetky ohlásené súbory'}), 400)
+    
+    # Presun nahratého súboru na finálne miesto
+    try:
+        file.stream.finalize(input_path)
+    except Exception as e:
+        job_store.finish_job(job_id, False, {'error': str(e)})
+        notify_state_change()
+        return None, (jsonify({'error': f'Chyba pri ukladaní súboru {filename}: {str(e)}'}), 500)
+    
+    # Rovnaký súbor s rovnakými parametrami už bol skomprimovaný (profilovaná
+    # úloha sa musí skomprimovať znova)
+    cached = None if profile else result_cache.get(files['cache_key'])
+    if cached:
+        try:
+            result_cache.copy_to(cached['path'], output_path)
+            job_store.update_job_files(job_id, cache_hit=True)
+            job_finished(job_id, True, cached['message'])
+            if METRICS_ENABLED:
+                job_store.add_metrics(job_result_values('cached'))
+            return job_id, None
+        except OSError as e:
+            print(f"Chyba pri čítaní z cache: {e}")
+    
+    # Zaradenie do fronty plánovača
+    try:
+        scheduler.submit(batch_id, job_id, str(input_path), str(output_path), dpi, jpeg_quality,
+                         profile=profile)
+    except QueueFullError:
+        job_finished(job_id, False, 'Server je preťažený, fronta úloh je plná')
+    
+    notify_state_change()
+    return job_id, None
+
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Upload a kompresia PDF súboru/súborov (podporuje batch upload)"""
+    # Parsovanie multipart tela - súbory sa zapisujú priamo na disk a neplatné
+    # (nie PDF, príliš veľké) sa odmietnu už počas prenosu
+    try:
+        uploaded = request.files
+    except HTTPException as e:
+        return jsonify({'error': e.description}), e.code
+    
     # Kontrola, či boli nahraté súbory
-    if 'files' not in request.files:
+    if 'files' not in uploaded:
         return jsonify({'error': 'Neboli nahraté žiadne súbory'}), 400
     
-    files = request.files.getlist('files')
+    files = uploaded.getlist('files')
     
     if len(files) == 0:
         return jsonify({'error': 'Neboli vybrané žiadne súbory'}), 400
@@ -91,181 +335,32 @@ def upload_file():
     
     # Validácia typu súborov
     for file in files:
-        if file.filename == '':
-            return jsonify({'error': 'Jeden alebo viac súborov nemá názov'}), 400
-        if not allowed_file(file.filename):
-            return jsonify({'error': f'Súbor {file.filename} nie je PDF. Povolené sú len PDF súbory'}), 400
+        error = validate_upload(file)
+        if error:
+            return error
     
-    # Získanie parametrov (predvolené hodnoty: DPI=150, Kvalita=85)
-    try:
-        dpi = int(request.form.get('dpi', 150))
-        jpeg_quality = int(request.form.get('quality', 85))
-        
-        # Validácia parametrov (0 = auto režim)
-        if dpi != 0 and not (100 <= dpi <= 200):
-            return jsonify({'error': 'DPI musí byť medzi 100 a 200, alebo 0 pre auto'}), 400
-        if jpeg_quality != 0 and not (60 <= jpeg_quality <= 95):
-            return jsonify({'error': 'JPEG kvalita musí byť medzi 60 a 95, alebo 0 pre auto'}), 400
-    except ValueError:
-        return jsonify({'error': 'Neplatné parametre DPI alebo kvality'}), 400
+    dpi, jpeg_quality, error = parse_compression_params(request.form)
+    if error:
+        return error
     
-    # Vytvorenie jedinečného batch ID
-    batch_id = str(uuid.uuid4())
-    timestamp = int(time.time())
+    profile, error = parse_profile_flag(request.form)
+    if error:
+        return error
     
-    # Inicializácia batch progress
-    batch_progress[batch_id] = {
-        'total_files': len(files),
-        'completed': 0,
-        'failed': 0,
-        'processing': 0,
-        'files': {}
-    }
+    # Backpressure - ak sa batch nezmestí do fronty, odmietneme ho celý
+    if not scheduler.has_capacity(len(files)):
+        return queue_full_response()
+    
+    batch_id = create_batch(len(files), dpi, jpeg_quality)
     
     # Spracovanie každého súboru
     job_ids = []
     
     for file in files:
-        filename = secure_filename(file.filename)
-        job_id = str(uuid.uuid4())
+        job_id, error = enqueue_upload(batch_id, file, profile)
+        if error:
+            return error
         job_ids.append(job_id)
-        
-        unique_filename = f"{timestamp}_{job_id[:8]}_{filename}"
-        input_path = UPLOAD_FOLDER / unique_filename
-        
-        # Uloženie súboru
-        try:
-            file.save(input_path)
-        except Exception as e:
-            return jsonify({'error': f'Chyba pri ukladaní súboru {filename}: {str(e)}'}), 500
-        
-        # Kontrola veľkosti súboru
-        file_size = input_path.stat().st_size
-        if file_size > MAX_UPLOAD_SIZE:
-            input_path.unlink()
-            return jsonify({'error': f'Súbor {filename} je príliš veľký. Maximum: {MAX_UPLOAD_SIZE / (1024*1024):.0f} MB'}), 400
-        
-        # Output path
-        output_filename = f"compressed_{unique_filename}"
-        output_path = COMPRESSED_FOLDER / output_filename
-        
-        # Initialize progress pre tento súbor
-        compression_progress[job_id] = {
-            'filename': filename,
-            'progress': 0,
-            'status': 'pending',
-            'batch_id': batch_id
-        }
-        
-        batch_progress[batch_id]['files'][job_id] = {
-            'filename': filename,
-            'status': 'pending',
-            'progress': 0
-        }
-        
-        # Spustenie kompresie v samostatnom vlákne
-        def compress_task(job_id=job_id, input_path=input_path, output_path=output_path, 
-                         filename=filename, output_filename=output_filename, batch_id=batch_id):
-            try:
-                # Update status
-                compression_progress[job_id]['status'] = 'processing'
-                batch_progress[batch_id]['files'][job_id]['status'] = 'processing'
-                batch_progress[batch_id]['processing'] += 1
-                
-                # Progress callback wrapper
-                def progress_wrapper(fname, prog):
-                    compression_progress[job_id]['progress'] = prog
-                    batch_progress[batch_id]['files'][job_id]['progress'] = prog
-                
-                success, message = compress_pdf(
-                    str(input_path),
-                    str(output_path),
-                    dpi=dpi,
-                    jpeg_quality=jpeg_quality,
-                    progress_callback=progress_wrapper
-                )
-                
-                if success:
-                    # Získanie veľkostí súborov
-                    original_size = input_path.stat().st_size / (1024 * 1024)  # MB
-                    compressed_size = output_path.stat().st_size / (1024 * 1024)  # MB
-                    compression_ratio = (1 - compressed_size / original_size) * 100
-                    
-                    compression_progress[job_id] = {
-                        'filename': filename,
-                        'progress': 100,
-                        'status': 'completed',
-                        'output_file': output_filename,
-                        'original_size': original_size,
-                        'compressed_size': compressed_size,
-                        'compression_ratio': compression_ratio,
-                        'message': message,
-                        'batch_id': batch_id
-                    }
-                    
-                    batch_progress[batch_id]['files'][job_id] = {
-                        'filename': filename,
-                        'status': 'completed',
-                        'progress': 100,
-                        'output_file': output_filename,
-                        'original_size': original_size,
-                        'compressed_size': compressed_size,
-                        'compression_ratio': compression_ratio
-                    }
-                    batch_progress[batch_id]['completed'] += 1
-                else:
-                    compression_progress[job_id] = {
-                        'filename': filename,
-                        'progress': 0,
-                        'status': 'error',
-                        'error': message,
-                        'batch_id': batch_id
-                    }
-                    batch_progress[batch_id]['files'][job_id] = {
-                        'filename': filename,
-                        'status': 'error',
-                        'progress': 0,
-                        'error': message
-                    }
-                    batch_progress[batch_id]['failed'] += 1
-                
-                batch_progress[batch_id]['processing'] -= 1
-                
-                # Vymazanie vstupného súboru
-                try:
-                    input_path.unlink()
-                except:
-                    pass
-                    
-            except Exception as e:
-                compression_progress[job_id] = {
-                    'filename': filename,
-                    'progress': 0,
-                    'status': 'error',
-                    'error': str(e),
-                    'batch_id': batch_id
-                }
-                batch_progress[batch_id]['files'][job_id] = {
-                    'filename': filename,
-                    'status': 'error',
-                    'progress': 0,
-                    'error': str(e)
-                }
-                batch_progress[batch_id]['failed'] += 1
-                batch_progress[batch_id]['processing'] -= 1
-                
-                # Vymazanie súborov pri chybe
-                try:
-                    if input_path.exists():
-                        input_path.unlink()
-                    if output_path.exists():
-                        output_path.unlink()
-                except:
-                    pass
-        
-        # Spustenie vlákna pre tento súbor
-        thread = threading.Thread(target=compress_task, daemon=True)
-        thread.start()
     
     return jsonify({
         'batch_id': batch_id,
@@ -275,29 +370,283 @@ def upload_file():
     })
 
 
+@app.route('/batch', methods=['POST'])
+def start_batch():
+    """
+    Vytvorenie batchu pre postupný upload (jeden request na súbor).
+    
+    Každý súbor sa začne komprimovať hneď po nahratí, kým sa ďalšie ešte
+    nahrávajú. Zlyhaný upload sa dá zopakovať bez posielania celého batchu.
+    """
+    try:
+        total_files = int(request.form.get('total_files', 0))
+    except ValueError:
+        return jsonify({'error': 'Neplatný počet súborov'}), 400
+    
+    if total_files < 1:
+        return jsonify({'error': 'Neboli vybrané žiadne súbory'}), 400
+    if total_files > MAX_BATCH_FILES:
+        return jsonify({'error': f'Môžete nahrať maximálne {MAX_BATCH_FILES} súborov naraz'}), 400
+    
+    dpi, jpeg_quality, error = parse_compression_params(request.form)
+    if error:
+        return error
+    
+    if not scheduler.has_capacity(total_files):
+        return queue_full_response()
+    
+    batch_id = create_batch(total_files, dpi, jpeg_quality)
+    return jsonify({'batch_id': batch_id, 'total_files': total_files, 'status': 'created'})
+
+
+@app.route('/batch/<batch_id>/files', methods=['POST'])
+def upload_batch_file(batch_id):
+    """Upload jedného súboru do existujúceho batchu - kompresia začne hneď"""
+    if job_store.get_batch_settings(batch_id) is None:
+        return jsonify({'error': 'Batch ID nenájdené'}), 404
+    
+    try:
+        uploaded = request.files
+    except HTTPException as e:
+        return jsonify({'error': e.description}), e.code
+    
+    if 'file' not in uploaded:
+        return jsonify({'error': 'Neboli nahraté žiadne súbory'}), 400
+    
+    file = uploaded['file']
+    error = validate_upload(file)
+    if error:
+        return error
+    
+    profile, error = parse_profile_flag(request.form)
+    if error:
+        return error
+    
+    if not scheduler.has_capacity(1):
+        return queue_full_response()
+    
+    job_id, error = enqueue_upload(batch_id, file, profile)
+    if error:
+        return error
+    
+    return jsonify({'batch_id': batch_id, 'job_id': job_id, 'status': 'queued'})
+
+
+@app.route('/batch/<batch_id>/close', methods=['POST'])
+def close_batch(batch_id):
+    """
+    Uzavretie batchu po poslednom uploade.
+    
+    Súbory, ktorých upload definitívne zlyhal, sa z batchu vynechajú, aby sa
+    batch mohol dokončiť.
+    """
+    total_files = job_store.close_batch(batch_id)
+    if total_files is None:
+        return jsonify({'error': 'Batch ID nenájdené'}), 404
+    
+    notify_state_change()
+    return jsonify({'batch_id': batch_id, 'total_files': total_files, 'status': 'closed'})
+
+
+def cancel_job(job_id):
+    """
+    Zruší nedokončenú úlohu - zapíše stav, zastaví kompresiu a vymaže jej súbory.
+    
+    Returns:
+        False, ak úloha neexistuje alebo už bola dokončená
+    """
+    files = job_store.cancel_job(job_id)
+    if files is None:
+        return False
+    
+    # Lokálny plánovač proces úlohy zabije hneď, worker.py zrušenie zistí zo stavu úlohy
+    scheduler.cancel(job_id)
+    for path in (files['input_path'], files['output_path']):
+        try:
+            Path(path).unlink(missing_ok=True)
+        except OSError as e:
+            print(f"Chyba pri mazaní {path}: {e}")
+    
+    if METRICS_ENABLED:
+        job_store.add_metrics(job_result_values('cancelled'))
+    return True
+
+
+@app.route('/job/<job_id>', methods=['DELETE'])
+def delete_job(job_id):
+    """Zrušenie kompresie jedného súboru (čakajúcej aj bežiacej)"""
+    if job_store.get_job(job_id) is None:
+        return jsonify({'error': 'Job ID nenájdené'}), 404
+    
+    if not cancel_job(job_id):
+        return jsonify({'error': 'Kompresia súboru je už dokončená',
+                        'status': job_store.get_job(job_id)['status']}), 409
+    
+    notify_state_change()
+    return jsonify({'job_id': job_id, 'status': 'cancelled'})
+
+
+@app.route('/batch/<batch_id>', methods=['DELETE'])
+def delete_batch(batch_id):
+    """
+    Zrušenie celého batchu.
+    
+    Batch sa uzavrie (ďalšie súbory sa neprijmú) a všetky nedokončené súbory
+    sa zrušia. Hotové výsledky zostávajú na stiahnutie.
+    """
+    total_files = job_store.close_batch(batch_id)
+    if total_files is None:
+        return jsonify({'error': 'Batch ID nenájdené'}), 404
+    
+    # Najprv čakajúce úlohy - zrušenie bežiacej uvoľní slot a plánovač by
+    # inak spustil ďalšiu úlohu z toho istého batchu
+    files = job_store.batch_snapshot(batch_id)['files']
+    unfinished = sorted(
+        (job_id for job_id, file_data in files.items() if file_data['status'] not in FINISHED_STATUSES),
+        key=lambda job_id: files[job_id]['status'] != STATUS_PENDING
+    )
+    cancelled = sum(1 for job_id in unfinished if cancel_job(job_id))
+    
+    notify_state_change()
+    return jsonify({'batch_id': batch_id, 'total_files': total_files, 'cancelled': cancelled,
+                    'status': 'cancelled'})
+
+
 @app.route('/progress/<job_id>')
 def get_progress(job_id):
     """Získanie pokroku kompresie jedného súboru"""
-    if job_id in compression_progress:
-        return jsonify(compression_progress[job_id])
+    job = job_store.get_job(job_id)
+    if job is not None:
+        if job['status'] == 'pending':
+            job['queue_position'] = scheduler.queue_position(job_id)
+        return jsonify(job)
     else:
         return jsonify({'error': 'Job ID nenájdené'}), 404
 
 
+def batch_snapshot(batch_id):
+    """Aktuálny stav batchu vrátane poradia čakajúcich súborov vo fronte (alebo None)"""
+    batch = job_store.batch_snapshot(batch_id)
+    if batch is None:
+        return None
+    
+    positions = scheduler.queue_positions()
+    batch['files'] = {
+        job_id: dict(file_data, queue_position=positions.get(job_id))
+        if file_data['status'] == 'pending' else file_data
+        for job_id, file_data in batch['files'].items()
+    }
+    return batch
+
+
 @app.route('/batch_progress/<batch_id>')
 def get_batch_progress(batch_id):
     """Získanie pokroku celého batchu súborov"""
-    if batch_id in batch_progress:
-        return jsonify(batch_progress[batch_id])
+    batch = batch_snapshot(batch_id)
+    if batch is not None:
+        return jsonify(batch)
     else:
         return jsonify({'error': 'Batch ID nenájdené'}), 404
 
 
+def shared_batch_snapshot(batch_id, version):
+    """
+    Stav batchu pre SSE streamy - jedno čítanie úložiska zdieľajú všetky
+    streamy batchu (pri SSE_POLL najviac raz za SSE_MIN_INTERVAL).
+    
+    Args:
+        batch_id: ID batchu
+        version: state_version, pri ktorej sa stream zobudil
+    """
+    with sse_lock:
+        cached = sse_snapshots.get(batch_id)
+        if cached is not None:
+            cached_version, read_at, batch = cached
+            if cached_version == version and (not SSE_POLL or time.monotonic() - read_at < SSE_MIN_INTERVAL):
+                return batch
+        
+        batch = batch_snapshot(batch_id)
+        if batch_id in sse_streams:
+            sse_snapshots[batch_id] = (version, time.monotonic(), batch)
+        return batch
+
+
+@app.route('/batch_events/<batch_id>')
+def batch_events(batch_id):
+    """
+    Server-Sent Events stream so stavom batchu.
+    
+    Správa sa pošle len pri zmene stavu, najviac raz za SSE_MIN_INTERVAL -
+    viacero progress callbackov sa zlúči do jednej správy. Stream sa ukončí
+    po dokončení všetkých súborov batchu. Nad MAX_SSE_STREAMS vráti HTTP 503
+    a klient sleduje pokrok pollingom /batch_progress.
+    """
+    if job_store.get_batch_settings(batch_id) is None:
+        return jsonify({'error': 'Batch ID nenájdené'}), 404
+    
+    if not open_sse_stream(batch_id):
+        response = jsonify({'error': 'Príliš veľa sledovaní naraz, pokrok sa načíta opakovane'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    
+    def stream():
+        last_version = None
+        last_payload = None
+        last_sent = time.time()
+        
+        while True:
+            with state_changed:
+                state_changed.wait_for(lambda: state_version != last_version, timeout=wait_timeout)
+                version = state_version
+            
+            if version == last_version and not SSE_POLL:
+                yield ': keepalive\n\n'
+                continue
+            last_version = version
+            
+            batch = shared_batch_snapshot(batch_id, version)
+            if batch is None:
+                return
+            
+            payload = json.dumps(batch)
+            if payload != last_payload:
+                last_payload = payload
+                last_sent = time.time()
+                yield f'data: {payload}\n\n'
+            elif time.time() - last_sent >= SSE_HEARTBEAT:
+                last_sent = time.time()
+                yield ': keepalive\n\n'
+            
+            if batch['completed'] + batch['failed'] >= batch['total_files']:
+                return
+            
+            time.sleep(SSE_MIN_INTERVAL)
+    
+    # Zmeny z iných procesov notifikácia nezachytí - stav sa číta periodicky
+    wait_timeout = SSE_MIN_INTERVAL if SSE_POLL else SSE_HEARTBEAT
+    
+    response = Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Nginx nesmie SSE bufferovať
+        }
+    )
+    # Miesto sa uvoľní aj pri odpojení klienta uprostred streamu
+    response.call_on_close(lambda: close_sse_stream(batch_id))
+    return response
+
+
 @app.route('/download/<filename>')
 def download_file(filename):
-    """Stiahnutie skomprimovaného súboru"""
+    """Stiahnutie skomprimovaného súboru (profil úlohy len pre administrátora)"""
     file_path = COMPRESSED_FOLDER / secure_filename(filename)
     
+    # Profil obsahuje cesty a názvy súborov servera
+    if file_path.name.endswith((PROFILE_STATS_SUFFIX, PROFILE_REPORT_SUFFIX)) and not is_admin_request():
+        return jsonify({'error': 'Profil je dostupný len pre administrátora'}), 403
+    
     if not file_path.exists():
         return jsonify({'error': 'Súbor nenájdený'}), 404
     
@@ -316,10 +665,32 @@ def health():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'timestamp': datetime.now().isoformat()
+        'timestamp': datetime.now().isoformat(),
+        'scheduler': scheduler.stats(),
+        'cache': result_cache.stats(),
+        'jobs': job_store.stats(),
+        'toolchain': {
+            key: value for key, value in get_toolchain().items()
+            if key != 'poppler_message'
+        }
     })
 
 
+@app.route('/metrics')
+def metrics():
+    """Metriky kompresných úloh v Prometheus text formáte"""
+    if not METRICS_ENABLED:
+        return jsonify({'error': 'Metriky sú vypnuté (METRICS_ENABLED=0)'}), 404
+    
+    gauges = {
+        f'scheduler_{key}': (value, f'Stav fronty kompresie: {key}')
+        for key, value in scheduler.stats().items()
+        if isinstance(value, (int, float))
+    }
+    return Response(render_metrics(job_store.metric_values(), gauges),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/cleanup', methods=['POST'])
 def manual_cleanup():
     """Manuálne vyčistenie starých súborov (admin endpoint)"""
@@ -328,22 +699,52 @@ def manual_cleanup():
     return jsonify({'status': 'Vyčistenie dokončené'})
 
 
-# Automatické čistenie pri štarte
-cleanup_old_files()
-
-# Periodické čistenie (každých 6 hodín)
 def periodic_cleanup():
-    """Periodické čistenie v pozadí"""
+    """
+    Čistenie pri štarte a potom každých 6 hodín.
+    
+    Beží v jedinom procese - pod Gunicornom ho spúšťa gunicorn.conf.py
+    (samostatný proces, pri JOB_STORE=memory vlákno jediného workera).
+    """
     while True:
-        time.sleep(6 * 60 * 60)  # 6 hodín
         cleanup_old_files()
+        time.sleep(6 * 60 * 60)  # 6 hodín
+
+
+def requeue_interrupted_jobs():
+    """
+    Úlohy prerušené reštartom servera zaradí znova do lokálneho plánovača.
+    
+    Volá sa v procese, ktorý úlohy spracúva (JOB_QUEUE=local má jediný
+    proces webovej aplikácie) - samostatné workery si rozpracované úlohy
+    riešia samy.
+    """
+    interrupted = job_store.requeue_interrupted() if JOB_QUEUE == 'local' else []
+    for job in interrupted:
+        if not Path(job['input_path']).exists():
+            job_finished(job['job_id'], False, 'Vstupný súbor sa po reštarte servera nenašiel')
+            continue
+        try:
+            scheduler.submit(job['batch_id'], job['job_id'], job['input_path'],
+                             job['output_path'], job['dpi'], job['jpeg_quality'],
+                             profile=job.get('profile', False))
+        except QueueFullError:
+            job_finished(job['job_id'], False, 'Server je preťažený, fronta úloh je plná')
+
 
-# Spustenie cleanup vlákna
-cleanup_thread = threading.Thread(target=periodic_cleanup, daemon=True)
-cleanup_thread.start()
+# Worker procesy plánovača (spawn) importujú tento modul znova - kontrolu
+# spúšťame len v hlavnom procese
+if multiprocessing.parent_process() is None:
+    # Kontrola nástrojov pri štarte (výsledok sa uloží pre celý proces)
+    toolchain = get_toolchain()
+    if not toolchain['poppler_installed']:
+        print(f"UPOZORNENIE: {toolchain['poppler_message']}")
 
 
 if __name__ == '__main__':
-    # Development server
+    # Development server - jediný proces, čistenie beží vo vlákne
+    requeue_interrupted_jobs()
+    cleanup_thread = threading.Thread(target=periodic_cleanup, daemon=True)
+    cleanup_thread.start()
     app.run(host='0.0.0.0', port=5000, debug=False)
 
@@ -1,24 +1,93 @@
 #!/usr/bin/env python3
 """
 Batch PDF Kompresor - Pre spracovanie veľkého počtu súborov
-Použitie: python batch_compress.py /cesta/k/pdf/suborom /cesta/k/vystupu
+Použitie: python batch_compress.py /cesta/k/pdf/suborom /cesta/k/vystupu [--workers N] [--incremental]
+                                   [--target-size MB] [--min-ssim X]
+
+PROFILE_JOBS=1 uloží ku každému výstupu profil kompresie (.prof a .profile.txt).
 """
 
 import sys
 import os
+import time
 from pathlib import Path
 from pdf_compressor import compress_directory
+from job_profiler import PROFILE_JOBS
+
+
+def parse_args(argv):
+    """
+    Spracuje argumenty príkazového riadku.
+    
+    Returns:
+        Tuple (input_dir, output_dir, workers, incremental, target_size_mb, min_ssim)
+        alebo None pri neplatných argumentoch
+    """
+    positional = []
+    workers = 1
+    incremental = False
+    target_size_mb = None
+    min_ssim = None
+    
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        try:
+            if arg in ('-w', '--workers'):
+                workers = int(argv[i + 1])
+                i += 1
+            elif arg.startswith('--workers='):
+                workers = int(arg.split('=', 1)[1])
+            elif arg in ('-i', '--incremental'):
+                incremental = True
+            elif arg == '--target-size':
+                target_size_mb = float(argv[i + 1])
+                i += 1
+            elif arg.startswith('--target-size='):
+                target_size_mb = float(arg.split('=', 1)[1])
+            elif arg == '--min-ssim':
+                min_ssim = float(argv[i + 1])
+                i += 1
+            elif arg.startswith('--min-ssim='):
+                min_ssim = float(arg.split('=', 1)[1])
+            else:
+                positional.append(arg)
+        except (IndexError, ValueError):
+            return None
+        i += 1
+    
+    if len(positional) not in (1, 2) or workers < 1:
+        return None
+    if target_size_mb is not None and target_size_mb <= 0:
+        return None
+    if min_ssim is not None and not (0 < min_ssim <= 1):
+        return None
+    
+    output_dir = positional[1] if len(positional) > 1 else None
+    return positional[0], output_dir, workers, incremental, target_size_mb, min_ssim
+
 
 def main():
-    if len(sys.argv) < 2:
-        print("Použitie: python batch_compress.py <vstupny_priecinok> [vystupny_priecinok]")
+    args = parse_args(sys.argv[1:])
+    if args is None:
+        print("Použitie: python batch_compress.py <vstupny_priecinok> [vystupny_priecinok] [--workers N] [--incremental]")
+        print("                                   [--target-size MB] [--min-ssim X]")
+        print("\nVoľby:")
+        print(f"  -w, --workers N   Počet paralelných procesov (1 = sériovo, dostupných jadier: {os.cpu_count()})")
+        print("  -i, --incremental Spracovať len nové a zmenené súbory (manifest vo výstupnom adresári)")
+        print("  --target-size MB  Cieľová veľkosť každého súboru - DPI a kvalita sa zvolia podľa vzorových strán")
+        print("  --min-ssim X      Minimálna podobnosť s originálom (SSIM 0-1, napr. 0.95) pri čo najmenšom súbore")
+        print("\nPremenné prostredia:")
+        print("  PROFILE_JOBS=1    Profil kompresie (cProfile, špičková pamäť) vedľa každého výstupu")
         print("\nPríklad:")
         print("  python batch_compress.py C:\\Documents\\PDFs")
         print("  python batch_compress.py C:\\Documents\\PDFs C:\\Documents\\Compressed")
+        print("  python batch_compress.py C:\\Documents\\PDFs --workers 8")
+        print("  python batch_compress.py C:\\Documents\\PDFs C:\\Documents\\Compressed --incremental")
+        print("  python batch_compress.py C:\\Documents\\PDFs --target-size 2")
         sys.exit(1)
     
-    input_dir = sys.argv[1]
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else None
+    input_dir, output_dir, workers, incremental, target_size_mb, min_ssim = args
     
     # Kontrola existencie adresára
     if not os.path.exists(input_dir):
@@ -31,6 +100,15 @@ def main():
     print(f"Vstupny adresar: {input_dir}")
     print(f"Vystupny adresar: {output_dir if output_dir else 'Automaticky (compressed)'}")
     print(f"Rezim: Auto (DPI=150, Kvalita=85) - Optimalizovane pre citatelnost")
+    print(f"Paralelne procesy: {workers}")
+    if incremental:
+        print("Inkrementalny rezim: nezmenene subory sa preskocia")
+    if target_size_mb is not None:
+        print(f"Cielova velkost: {target_size_mb} MB na subor")
+    if min_ssim is not None:
+        print(f"Minimalna SSIM: {min_ssim}")
+    if PROFILE_JOBS:
+        print("Profilovanie: zapnute (.prof a .profile.txt vedla vystupov, kompresia je pomalsia)")
     print("=" * 60)
     print()
     
@@ -44,9 +122,12 @@ def main():
         print("UPOZORNENIE: Ziadne PDF subory nenajdene!")
         sys.exit(0)
     
-    if pdf_count > 100:
+    # Inkrementálny režim beží typicky bez obsluhy (cron) - bez potvrdzovania
+    if pdf_count > 100 and not incremental:
         print(f"UPOZORNENIE: Naslo sa {pdf_count} suborov!")
-        print(f"   Odhadovany cas: {pdf_count * 0.5:.0f}-{pdf_count * 2:.0f} minut")
+        print(f"   Odhadovany cas: {pdf_count * 0.5 / workers:.0f}-{pdf_count * 2 / workers:.0f} minut")
+        if workers > 1:
+            print("   Presny odhad sa priebezne vypisuje podla nameranej priepustnosti")
         response = input("\n   Pokracovat? (ano/nie): ")
         if response.lower() not in ['ano', 'a', 'yes', 'y']:
             print("Zrusene pouziavtelom")
@@ -57,14 +138,21 @@ def main():
     print()
     
     # Spustenie kompresie
+    start_time = time.monotonic()
     results = compress_directory(
         input_dir=input_dir,
         output_dir=output_dir,
         dpi=0,  # Auto režim
         jpeg_quality=0,  # Auto režim
         progress_callback=None,  # Žiadny progress callback
-        log_callback=print  # Výpis do konzoly
+        log_callback=print,  # Výpis do konzoly
+        workers=workers,
+        incremental=incremental,
+        target_size_mb=target_size_mb,
+        min_ssim=min_ssim,
+        profile=bool(PROFILE_JOBS)
     )
+    elapsed_minutes = (time.monotonic() - start_time) / 60
     
     # Výsledky
     print()
@@ -74,6 +162,11 @@ def main():
     print(f"Celkovo spracovanych: {results['success'] + results['failed']}")
     print(f"Uspesnych: {results['success']}")
     print(f"Zlyhalo: {results['failed']}")
+    if incremental:
+        print(f"Preskocenych (bez zmeny): {results.get('skipped', 0)}")
+    processed = results['success'] + results['failed']
+    if elapsed_minutes > 0 and processed > 0:
+        print(f"Trvanie: {elapsed_minutes:.1f} min ({processed / elapsed_minutes:.1f} suborov/min)")
     
     if results['failed'] > 0:
         print()
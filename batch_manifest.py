@@ -0,0 +1,129 @@
+"""
+PDF Kompresor - Manifest pre inkrementálnu dávkovú kompresiu
+"""
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+# Názov manifestu vo výstupnom adresári
+MANIFEST_FILENAME = '.pdf_kompresor_manifest.jsonl'
+
+# Výsledky, ktoré sa pri ďalšom behu neopakujú
+STATUS_COMPRESSED = 'compressed'
+STATUS_WOULD_GROW = 'would_grow'
+STATUS_FAILED = 'failed'
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 hash obsahu súboru (číta po blokoch)"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class BatchManifest:
+    """
+    Záznam spracovaných súborov vo výstupnom adresári.
+
+    Manifest je JSON Lines súbor, do ktorého sa po každom súbore pripíše
+    jeden riadok - prerušený beh tak pokračuje tam, kde skončil. Pri načítaní
+    platí posledný záznam pre daný zdrojový súbor a manifest sa zhutní.
+    """
+
+    def __init__(self, output_dir: Path, params: dict):
+        """
+        Args:
+            output_dir: Výstupný adresár (obsahuje manifest)
+            params: Parametre kompresie (dpi, jpeg_quality, pdf_compressor.output_settings()) -
+                pri ich zmene sa súbory komprimujú znova
+        """
+        self.path = Path(output_dir) / MANIFEST_FILENAME
+        self.params = params
+        self.entries = {}
+        self._load()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self):
+        """Načíta existujúci manifest a prepíše ho bez duplicitných záznamov"""
+        if not self.path.exists():
+            return
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self.entries[entry['source']] = entry
+                except (ValueError, KeyError):
+                    # Neúplný posledný riadok po prerušení behu
+                    continue
+
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, source: str, pdf_file: Path, output_file: Path) -> Optional[dict]:
+        """
+        Vráti záznam, ak súbor netreba spracovať znova.
+
+        Nezmenený súbor sa spozná podľa veľkosti a mtime (bez čítania obsahu),
+        hash sa počíta len ak sa tieto líšia (napr. súbor bol len skopírovaný).
+
+        Args:
+            source: Relatívna cesta zdrojového súboru (kľúč v manifeste)
+            pdf_file: Zdrojový súbor
+            output_file: Očakávaný výstupný súbor
+
+        Returns:
+            Záznam z manifestu alebo None
+        """
+        entry = self.entries.get(source)
+        if entry is None or entry['params'] != self.params:
+            return None
+        if entry['status'] not in (STATUS_COMPRESSED, STATUS_WOULD_GROW):
+            return None
+        if entry['status'] == STATUS_COMPRESSED and not output_file.exists():
+            return None
+
+        stat = pdf_file.stat()
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+            return entry
+        if stat.st_size != entry['size']:
+            return None
+
+        if file_sha256(str(pdf_file)) != entry['sha256']:
+            return None
+
+        # Obsah sa nezmenil - aktualizujeme mtime, aby sa hash nabudúce nepočítal
+        self.record(source, pdf_file, entry['sha256'], entry['status'], entry['message'],
+                    entry.get('output'))
+        return entry
+
+    def record(self, source: str, pdf_file: Path, sha256: Optional[str], status: str,
+               message: str, output: Optional[str] = None) -> None:
+        """Pripíše výsledok spracovania súboru do manifestu"""
+        stat = pdf_file.stat()
+        entry = {
+            'source': source,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': sha256 or file_sha256(str(pdf_file)),
+            'params': self.params,
+            'status': status,
+            'message': message.split('\n')[0],
+            'output': output
+        }
+        self.entries[source] = entry
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+PDF Kompresor - Benchmark kompresie na syntetických skenoch
+Použitie: python benchmark.py [subor.pdf ...] [--corpus small|full] [--dpi 150,0] [--quality 85]
+                              [--engine pil,pdftoppm] [--repeat N] [--directory] [--output subor.json]
+
+Bez zadaných súborov vygeneruje deterministický korpus syntetických skenov
+(1-bitový text, šedé a farebné strany pri 150/300/600 DPI, 1 až 500 strán) -
+offline, rovnaké bajty pri každom behu. Každú kombináciu nastavení spustí
+v novom procese (kvôli meraniu špičkovej pamäte) a výsledky uloží ako JSON,
+aby sa dali porovnať behy pred a po zmene.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import platform
+import subprocess
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from pdf_compressor import (
+    ENGINE_VERSION, IN_MEMORY_LIMIT_MB, PAGE_WORKERS, RENDER_ENGINES, STREAM_CHUNK_PAGES,
+    compress_directory, compress_pdf, get_toolchain
+)
+try:
+    import resource
+except ImportError:
+    # Windows - špičková pamäť sa nemeria
+    resource = None
+
+# Zmena generátora strán mení korpus - zvýšte, aby sa korpus vygeneroval znova
+CORPUS_VERSION = 2
+# Dokumenty korpusu: (typ strán, DPI skenu, počet strán)
+CORPUS_SMALL = [
+    ('text', 150, 1),
+    ('text', 300, 10),
+    ('gray', 300, 10),
+    ('color', 300, 10),
+    ('mixed', 300, 20),
+    ('text', 600, 2),
+    ('color', 600, 2),
+]
+CORPUS_FULL = CORPUS_SMALL + [
+    ('text', 300, 200),
+    ('mixed', 300, 100),
+    ('color', 600, 10),
+    ('mixed', 150, 500),
+]
+CORPORA = {'small': CORPUS_SMALL, 'full': CORPUS_FULL}
+# Poradie strán v zmiešanom dokumente
+MIXED_PAGES = ('text', 'text', 'gray', 'color')
+# Rozmer strany A4 (palce) a JPEG kvalita "skenera"
+PAGE_SIZE_INCHES = (8.27, 11.69)
+SCAN_JPEG_QUALITY = 90
+
+
+def _noise_tile(rng: random.Random, size: int = 256) -> Image.Image:
+    """Deterministický šum (Image.effect_noise používa C rand() - nie je opakovateľný)"""
+    return Image.frombytes('L', (size, size), rng.randbytes(size * size))
+
+
+def _tiled(tile: Image.Image, size: tuple) -> Image.Image:
+    image = Image.new('L', size)
+    for top in range(0, size[1], tile.height):
+        for left in range(0, size[0], tile.width):
+            image.paste(tile, (left, top))
+    return image
+
+
+def _photo_channel(rng: random.Random, size: tuple) -> Image.Image:
+    """Plynulé tóny (zväčšený náhodný obrázok) so zrnom skenera"""
+    small = Image.frombytes('L', (24, 34), rng.randbytes(24 * 34))
+    smooth = small.resize(size, Image.BICUBIC)
+    return Image.blend(smooth, _tiled(_noise_tile(rng), size), 0.12)
+
+
+def _draw_text(image: Image.Image, rng: random.Random, dpi: int, ink: int) -> None:
+    """Riadky "slov" ako obdĺžniky - histogram a hrany ako pri texte"""
+    draw = ImageDraw.Draw(image)
+    margin = dpi // 2
+    line_height = max(2, dpi // 6)
+    word_height = max(1, dpi // 12)
+    for top in range(margin, image.height - margin, line_height):
+        left = margin
+        while left < image.width - margin:
+            width = rng.randint(dpi // 15, dpi // 3)
+            draw.rectangle([left, top, min(left + width, image.width - margin), top + word_height], fill=ink)
+            left += width + rng.randint(dpi // 30, dpi // 12)
+
+
+def synthetic_page(kind: str, dpi: int, seed: str) -> Image.Image:
+    """
+    Vygeneruje syntetický sken strany.
+
+    Args:
+        kind: 'text' (1-bitový čierno-biely sken textu), 'gray' (šedá fotka s textom), 'color'
+        dpi: Rozlíšenie skenu
+        seed: Semienko - rovnaké semienko dá rovnaký obrázok
+
+    Returns:
+        PIL obrázok (1, L alebo RGB)
+    """
+    rng = random.Random(seed)
+    size = (round(PAGE_SIZE_INCHES[0] * dpi), round(PAGE_SIZE_INCHES[1] * dpi))
+
+    if kind == 'text':
+        # Čierno-biely sken (ako z dokumentového skenera) - bez poltónov
+        image = Image.new('1', size, 1)
+        _draw_text(image, rng, dpi, 0)
+        return image
+    if kind == 'gray':
+        image = _photo_channel(rng, size)
+        _draw_text(image, rng, dpi, 10)
+    elif kind == 'color':
+        image = Image.merge('RGB', [_photo_channel(rng, size) for _ in range(3)])
+    else:
+        raise ValueError(f"Neznámy typ strany: {kind}")
+
+    # Mierne rozmazanie ako pri skenovaní (vyhladené hrany písma)
+    return image.filter(ImageFilter.GaussianBlur(dpi / 300))
+
+
+def _document_name(kind: str, dpi: int, pages: int) -> str:
+    return f"{kind}-{dpi}dpi-{pages}p.pdf"
+
+
+def generate_corpus(directory: Path, documents: list, log=print) -> list:
+    """
+    Vygeneruje chýbajúce dokumenty korpusu (existujúce z rovnakej verzie sa použijú znova).
+
+    Returns:
+        Zoznam dict {'path', 'kind', 'dpi', 'pages', 'size'}
+    """
+    import img2pdf
+
+    directory.mkdir(parents=True, exist_ok=True)
+    marker = directory / 'corpus.json'
+    try:
+        version = json.loads(marker.read_text()).get('version')
+    except (OSError, ValueError):
+        version = None
+    if version != CORPUS_VERSION:
+        for old in directory.glob('*.pdf'):
+            old.unlink()
+        marker.write_text(json.dumps({'version': CORPUS_VERSION}))
+
+    corpus = []
+    for kind, dpi, pages in documents:
+        path = directory / _document_name(kind, dpi, pages)
+        if not path.exists():
+            log(f"Generujem {path.name} ...")
+            encoded = []
+            for page_number in range(1, pages + 1):
+                page_kind = MIXED_PAGES[(page_number - 1) % len(MIXED_PAGES)] if kind == 'mixed' else kind
+                image = synthetic_page(page_kind, dpi, f"{kind}-{dpi}-{pages}-{page_number}")
+                buffer = io.BytesIO()
+                if image.mode == '1':
+                    # 1-bitové strany ako CCITT G4 (img2pdf ich vloží bez prekódovania)
+                    image.save(buffer, 'TIFF', compression='group4', dpi=(dpi, dpi))
+                else:
+                    image.save(buffer, 'JPEG', quality=SCAN_JPEG_QUALITY, dpi=(dpi, dpi))
+                image.close()
+                encoded.append(buffer.getvalue())
+            temp_path = path.with_suffix('.part')
+            with open(temp_path, 'wb') as f:
+                # Bez dátumu a náhodného /ID (pikepdf) - rovnaké bajty pri každom generovaní
+                img2pdf.convert(encoded, outputstream=f, nodate=True, engine=img2pdf.Engine.internal)
+            os.replace(temp_path, path)
+        corpus.append({'path': str(path), 'kind': kind, 'dpi': dpi, 'pages': pages,
+                       'size': path.stat().st_size})
+    return corpus
+
+
+def _peak_rss_mb() -> dict:
+    """Špičková pamäť tohto procesu a najväčšieho podprocesu (pdftoppm, workery)"""
+    if resource is None:
+        return {'peak_rss_mb': None, 'peak_child_rss_mb': None}
+    # Linux vracia KB, macOS bajty
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        'peak_child_rss_mb': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1)
+    }
+
+
+def _measure_pdf(input_file: str, dpi: int, jpeg_quality: int, engine: str) -> dict:
+    """Jedna kompresia súboru (beží v samostatnom procese)"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = os.path.join(temp_dir, 'out.pdf')
+        stats = {}
+        started = time.perf_counter()
+        success, message = compress_pdf(input_file, output_file, dpi=dpi, jpeg_quality=jpeg_quality,
+                                        engine=engine, stats=stats)
+        seconds = time.perf_counter() - started
+
+    result = {'success': success, 'message': message.splitlines()[0], 'seconds': seconds,
+              'stages': stats.get('stages', {}), 'counters': stats.get('counters', {})}
+    result.update(_peak_rss_mb())
+    return result
+
+
+def _measure_directory(input_dir: str, dpi: int, jpeg_quality: int, engine: str, workers: int) -> dict:
+    """Kompresia celého adresára cez compress_directory (beží v samostatnom procese)"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        started = time.perf_counter()
+        results = compress_directory(input_dir, temp_dir, dpi=dpi, jpeg_quality=jpeg_quality, workers=workers,
+                                     engine=engine)
+        seconds = time.perf_counter() - started
+        output_bytes = sum(path.stat().st_size for path in Path(temp_dir).glob('*.pdf'))
+
+    result = {'success': results['failed'] == 0,
+              'message': f"{results['success']} OK, {results['failed']} chyb",
+              'seconds': seconds, 'stages': {}, 'counters': {'output_bytes': output_bytes}}
+    result.update(_peak_rss_mb())
+    return result
+
+
+def _in_child(function, *args) -> dict:
+    """Spustí meranie v novom procese - špičková pamäť patrí len tomuto behu"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(function, *args).result()
+
+
+def _summarize(name: str, pages: int, input_bytes: int, settings: dict, runs: list) -> dict:
+    """Najlepší z opakovaných behov a odvodené metriky"""
+    best = min(runs, key=lambda run: run['seconds'])
+    seconds = best['seconds']
+    output_bytes = best['counters'].get('output_bytes')
+    entry = {'document': name, 'pages': pages, 'input_bytes': input_bytes}
+    entry.update(settings)
+    entry.update({
+        'success': best['success'],
+        'message': best['message'],
+        'seconds': round(seconds, 4),
+        'runs': [round(run['seconds'], 4) for run in runs],
+        'pages_per_second': round(pages / seconds, 3) if seconds else None,
+        'mb_per_second': round(input_bytes / (1024 * 1024) / seconds, 3) if seconds else None,
+        'output_ratio': round(output_bytes / input_bytes, 4) if output_bytes and best['success'] else None,
+        'peak_rss_mb': max((run['peak_rss_mb'] or 0) for run in runs) or None,
+        'peak_child_rss_mb': max((run['peak_child_rss_mb'] or 0) for run in runs) or None,
+        'stages': best['stages'],
+        'counters': best['counters']
+    })
+    return entry
+
+
+def _git_commit() -> str:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                timeout=5, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _int_list(value: str) -> list:
+    return [int(item) for item in value.split(',') if item]
+
+
+def parse_args(argv):
+    """
+    Spracuje argumenty príkazového riadku.
+
+    Returns:
+        Dict s nastaveniami alebo None pri neplatných argumentoch
+    """
+    options = {
+        'files': [],
+        'corpus': 'small',
+        'corpus_dir': 'benchmark_corpus',
+        'dpi': [150],
+        'quality': [85],
+        'engine': list(RENDER_ENGINES),
+        'repeat': 1,
+        'directory': False,
+        'workers': os.cpu_count() or 1,
+        'output': None
+    }
+    parsers = {
+        '--corpus': str, '--corpus-dir': str, '--dpi': _int_list, '--quality': _int_list,
+        '--engine': lambda value: value.split(','), '--repeat': int, '--workers': int, '--output': str
+    }
+
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        name, _, value = arg.partition('=')
+        try:
+            if arg == '--directory':
+                options['directory'] = True
+            elif name in parsers:
+                if not value:
+                    value = argv[i + 1]
+                    i += 1
+                options[name[2:].replace('-', '_')] = parsers[name](value)
+            elif arg.startswith('-'):
+                return None
+            else:
+                options['files'].append(arg)
+        except (IndexError, ValueError):
+            return None
+        i += 1
+
+    if (options['corpus'] not in CORPORA or options['repeat'] < 1 or options['workers'] < 1
+            or not options['dpi'] or not options['quality']
+            or not options['engine'] or any(engine not in RENDER_ENGINES for engine in options['engine'])):
+        return None
+    return options
+
+
+def main():
+    options = parse_args(sys.argv[1:])
+    if options is None:
+        print("Použitie: python benchmark.py [subor.pdf ...] [voľby]")
+        print("\nVoľby:")
+        print("  --corpus small|full   Syntetický korpus, ak nie sú zadané súbory (default small)")
+        print("  --corpus-dir DIR      Adresár vygenerovaného korpusu (default benchmark_corpus)")
+        print("  --dpi 150,0           DPI nastavenia, čiarkou oddelené (0 = auto)")
+        print("  --quality 85          JPEG kvality, čiarkou oddelené (0 = auto)")
+        print(f"  --engine {','.join(RENDER_ENGINES):<13} Spôsoby renderovania")
+        print("  --repeat N            Opakovania každého behu, použije sa najlepší čas")
+        print("  --directory           Zmerať aj compress_directory na celom korpuse")
+        print("  --workers N           Procesy pre --directory (default počet jadier)")
+        print("  --output FILE         JSON s výsledkami (default benchmark-<cas>.json)")
+        sys.exit(1)
+
+    toolchain = get_toolchain()
+    if not toolchain['poppler_installed']:
+        print(toolchain['poppler_message'])
+        sys.exit(1)
+
+    if options['files']:
+        corpus = [{'path': path, 'kind': None, 'dpi': None, 'pages': None, 'size': os.path.getsize(path)}
+                  for path in options['files']]
+        corpus_dir = None
+    else:
+        corpus_dir = Path(options['corpus_dir'])
+        corpus = generate_corpus(corpus_dir, CORPORA[options['corpus']])
+
+    from pdf_compressor import get_pdf_page_count
+    for document in corpus:
+        if document['pages'] is None:
+            document['pages'] = get_pdf_page_count(document['path'], toolchain['poppler_path'])
+
+    settings_matrix = [
+        {'dpi': dpi, 'jpeg_quality': quality, 'engine': engine}
+        for dpi in options['dpi'] for quality in options['quality'] for engine in options['engine']
+    ]
+
+    print(f"{'Dokument':<26} {'DPI':>4} {'Q':>3} {'Engine':<9} {'Cas s':>8} {'Str/s':>7} {'MB/s':>7} "
+          f"{'Pomer':>6} {'RSS MB':>7}")
+    results = []
+
+    def report(entry):
+        results.append(entry)
+        if not entry['success']:
+            print(f"{entry['document'][:26]:<26} {entry['dpi']:>4} {entry['jpeg_quality']:>3} "
+                  f"{entry['engine']:<9} [CHYBA] {entry['message'][:60]}")
+            return
+        ratio = f"{entry['output_ratio']:.2f}" if entry['output_ratio'] is not None else '-'
+        rss = f"{entry['peak_rss_mb']:.0f}" if entry['peak_rss_mb'] else '-'
+        print(f"{entry['document'][:26]:<26} {entry['dpi']:>4} {entry['jpeg_quality']:>3} "
+              f"{entry['engine']:<9} {entry['seconds']:>8.2f} {entry['pages_per_second']:>7.1f} "
+              f"{entry['mb_per_second']:>7.2f} {ratio:>6} {rss:>7}")
+
+    for document in corpus:
+        for settings in settings_matrix:
+            runs = [
+                _in_child(_measure_pdf, document['path'], settings['dpi'], settings['jpeg_quality'],
+                          settings['engine'])
+                for _ in range(options['repeat'])
+            ]
+            report(_summarize(os.path.basename(document['path']), document['pages'], document['size'],
+                              settings, runs))
+
+    if options['directory'] and corpus_dir is not None:
+        pages = sum(document['pages'] for document in corpus)
+        input_bytes = sum(document['size'] for document in corpus)
+        for settings in settings_matrix:
+            runs = [
+                _in_child(_measure_directory, str(corpus_dir), settings['dpi'], settings['jpeg_quality'],
+                          settings['engine'], options['workers'])
+                for _ in range(options['repeat'])
+            ]
+            entry = _summarize(f"<adresar x{options['workers']}>", pages, input_bytes, settings, runs)
+            entry['workers'] = options['workers']
+            report(entry)
+
+    output = options['output'] or f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    report_data = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'engine_version': ENGINE_VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'poppler_version': toolchain['poppler_version'],
+            'img2pdf_version': toolchain['img2pdf_version'],
+            'stream_chunk_pages': STREAM_CHUNK_PAGES,
+            'page_workers': PAGE_WORKERS,
+            'in_memory_limit_mb': IN_MEMORY_LIMIT_MB,
+            'repeat': options['repeat']
+        },
+        'corpus': [
+            {'document': os.path.basename(document['path']), 'kind': document['kind'], 'dpi': document['dpi'],
+             'pages': document['pages'], 'size': document['size']}
+            for document in corpus
+        ],
+        'results': results
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report_data, f, indent=2, ensure_ascii=False)
+    print(f"\nVysledky ulozene: {output}")
+
+
+if __name__ == "__main__":
+    main()
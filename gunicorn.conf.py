@@ -0,0 +1,83 @@
+"""
+PDF Kompresor - Konfigurácia Gunicorn (produkčný WSGI server)
+
+Gunicorn beží s vláknovými workermi (gthread): upload veľkého PDF aj SSE
+stream drží vlákno po celý čas prenosu, takže počet vlákien určuje, koľko
+používateľov naraz server obslúži. Viac procesov vyžaduje zdieľaný stav
+úloh (JOB_STORE=sqlite) a samostatné kompresné workery (JOB_QUEUE=store),
+inak by každý proces videl len svoje úlohy a spúšťal vlastný pool kompresií.
+"""
+import os
+import sys
+import subprocess
+import threading
+
+JOB_STORE = os.environ.get('JOB_STORE', 'memory')
+JOB_QUEUE = os.environ.get('JOB_QUEUE', 'local')
+SHARED_STATE = JOB_STORE == 'sqlite' and JOB_QUEUE == 'store'
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+
+# Počet procesov - s pamäťovým stavom úloh len jeden
+workers = int(os.environ.get('WEB_WORKERS', min(4, os.cpu_count() or 1) if SHARED_STATE else 1))
+worker_class = 'gthread'
+# Vlákna na proces - každý prebiehajúci upload a SSE stream obsadí jedno
+# (SSE streamov je najviac MAX_SSE_STREAMS, ostatní klienti pollujú)
+threads = int(os.environ.get('WEB_THREADS', 16))
+
+# Heartbeat workera (nie limit requestu - gthread vlákna bežia aj dlhé uploady,
+# limit prenosu určuje nginx: client_body_timeout/proxy_read_timeout 1200 s)
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Heartbeat súbory v RAM (v kontajneri je /tmp často na pomalom overlay FS)
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Za nginx - dôverujeme X-Forwarded-* hlavičkám
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '*')
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    """Kontrola, že viac procesov má zdieľaný stav úloh"""
+    if workers > 1 and not SHARED_STATE:
+        raise RuntimeError(
+            "WEB_WORKERS > 1 vyžaduje JOB_STORE=sqlite a JOB_QUEUE=store "
+            f"(aktuálne JOB_STORE={JOB_STORE}, JOB_QUEUE={JOB_QUEUE})"
+        )
+    if workers > 1 and not os.environ.get('SECRET_KEY'):
+        server.log.warning("SECRET_KEY nie je nastavený - každý proces si vygeneruje vlastný")
+
+
+def when_ready(server):
+    """
+    Čistenie starých súborov v jednom samostatnom procese.
+
+    Master aplikáciu neimportuje (workery by zdedili jeho spojenie so
+    SQLite), čistenie preto beží vo vlastnom procese. Stav úloh v pamäti
+    (JOB_STORE=memory) vidí len jediný worker - tam beží čistenie v ňom.
+    """
+    if JOB_STORE == 'sqlite':
+        server.cleanup_process = subprocess.Popen(
+            [sys.executable, '-c', 'from app import periodic_cleanup; periodic_cleanup()']
+        )
+
+
+def post_worker_init(worker):
+    """Zaradenie úloh prerušených reštartom (a čistenie pri JOB_STORE=memory) vo workeri"""
+    from app import periodic_cleanup, requeue_interrupted_jobs
+    requeue_interrupted_jobs()
+    if JOB_STORE != 'sqlite':
+        threading.Thread(target=periodic_cleanup, daemon=True).start()
+
+
+def on_exit(server):
+    """Ukončenie procesu čistenia spolu s Gunicornom"""
+    process = getattr(server, 'cleanup_process', None)
+    if process is not None:
+        process.terminate()
+        process.wait()
@@ -0,0 +1,123 @@
+"""
+PDF Kompresor - Profilovanie jednej kompresnej úlohy
+
+Úloha beží pod cProfile a tracemalloc. Vedľa výstupného PDF sa uložia:
+- <vystup>.prof - štatistiky cProfile (python -m pstats, snakeviz)
+- <vystup>.profile.txt - čitateľný súhrn: čas, špičková pamäť, fázy
+  kompresie a najdrahšie funkcie
+
+Profilovanie spomalí kompresiu (tracemalloc sleduje každú alokáciu),
+preto sa zapína len pre jednotlivé úlohy.
+"""
+import io
+import os
+import sys
+import time
+import pstats
+import cProfile
+import tracemalloc
+from datetime import datetime
+try:
+    import resource
+except ImportError:
+    # Windows - špičková pamäť procesu sa neuvádza
+    resource = None
+
+# Profilovať každý súbor v batch_compress.py (1 = zapnuté)
+PROFILE_JOBS = int(os.environ.get('PROFILE_JOBS', 0))
+# Počet funkcií v textovom súhrne
+PROFILE_TOP_FUNCTIONS = 40
+
+PROFILE_STATS_SUFFIX = '.prof'
+PROFILE_REPORT_SUFFIX = '.profile.txt'
+
+
+def profile_paths(output_path: str) -> tuple[str, str]:
+    """Cesty k profilu úlohy: (štatistiky cProfile, textový súhrn)"""
+    return str(output_path) + PROFILE_STATS_SUFFIX, str(output_path) + PROFILE_REPORT_SUFFIX
+
+
+def _peak_rss_mb() -> tuple:
+    """Špičková pamäť procesu a podprocesov (pdftoppm) od ich štartu (MB)"""
+    if resource is None:
+        return None, None
+    # Linux vracia KB, macOS bajty
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+
+def _write_report(report_path: str, title: str, result, seconds: float, peak_bytes: int,
+                  profiler: cProfile.Profile, stats: dict) -> None:
+    rss, children_rss = _peak_rss_mb()
+    lines = [
+        f"Profil kompresie: {title}",
+        f"Cas vytvorenia: {datetime.now().isoformat(timespec='seconds')}",
+        f"Trvanie: {seconds:.2f} s",
+        f"Spickova pamat Python alokacii (tracemalloc): {peak_bytes / (1024 * 1024):.1f} MB",
+    ]
+    if rss is not None:
+        lines.append(f"Spickova pamat procesu od startu (RSS): {rss:.0f} MB, "
+                     f"podprocesy (pdftoppm): {children_rss:.0f} MB")
+    lines.append("(obrazove buffre PIL a pdftoppm tracemalloc nevidi - pozri RSS)")
+
+    if isinstance(result, tuple) and len(result) == 2:
+        success, message = result
+        lines.append(f"Vysledok: {'OK' if success else 'CHYBA'} - {str(message).splitlines()[0] if message else ''}")
+
+    if stats:
+        lines.append("")
+        lines.append("Fazy kompresie (s):")
+        lines.extend(f"  {name:<12} {value:>10.3f}" for name, value in stats.get('stages', {}).items())
+        lines.append("Pocitadla:")
+        lines.extend(f"  {name:<14} {value}" for name, value in stats.get('counters', {}).items())
+
+    for sort, label in (('cumulative', 'celkovy cas vratane volanych funkcii'), ('tottime', 'vlastny cas funkcie')):
+        buffer = io.StringIO()
+        pstats.Stats(profiler, stream=buffer).sort_stats(sort).print_stats(PROFILE_TOP_FUNCTIONS)
+        lines.append("")
+        lines.append(f"=== Najdrahsie funkcie - {label} ===")
+        lines.append(buffer.getvalue().strip())
+
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def run_profiled(function: callable, output_path: str, *args, **kwargs):
+    """
+    Spustí funkciu pod cProfile a tracemalloc a uloží profil vedľa výstupu.
+
+    Args:
+        function: Profilovaná funkcia (compress_pdf)
+        output_path: Výstupný súbor úlohy - profil sa uloží vedľa neho
+        *args, **kwargs: Argumenty funkcie (dict v kwargs['stats'] sa pridá do súhrnu)
+
+    Returns:
+        Výsledok funkcie
+    """
+    stats_path, report_path = profile_paths(output_path)
+    profiler = cProfile.Profile()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    result = None
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        result = function(*args, **kwargs)
+        return result
+    finally:
+        profiler.disable()
+        seconds = time.perf_counter() - started
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+
+        try:
+            profiler.dump_stats(stats_path)
+            _write_report(report_path, os.path.basename(str(args[0]) if args else str(output_path)),
+                          result, seconds, peak_bytes, profiler, kwargs.get('stats'))
+        except OSError as e:
+            print(f"Chyba pri ukladani profilu {report_path}: {e}")
@@ -0,0 +1,640 @@
+"""
+PDF Kompresor - Plánovač kompresných úloh (obmedzený pool procesov)
+"""
+import os
+import time
+import shutil
+import signal
+import tempfile
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from multiprocessing.connection import wait
+from typing import Optional
+
+from job_store import QueueJobStore
+from pdf_compressor import LOW_MEMORY_OPTIONS, compress_pdf, estimate_memory_mb
+
+# Počet paralelných kompresií (predvolene počet jadier)
+COMPRESSION_WORKERS = int(os.environ.get('COMPRESSION_WORKERS', os.cpu_count() or 1))
+# Maximálny počet úloh čakajúcich vo fronte (nad limit sa vráti HTTP 503)
+MAX_QUEUED_JOBS = int(os.environ.get('MAX_QUEUED_JOBS', 200))
+# Kde beží kompresia: 'local' (pool procesov webovej aplikácie) alebo
+# 'store' (samostatné worker procesy - worker.py - čítajú frontu zo SQLite)
+JOB_QUEUE = os.environ.get('JOB_QUEUE', 'local')
+# Worker bez heartbeatu dlhšie ako tento čas (sekundy) sa považuje za mŕtvy
+WORKER_STALE_TIMEOUT = int(os.environ.get('WORKER_STALE_TIMEOUT', 120))
+# Pamäť pre súbežné kompresie (MB), 0 = 75 % pamäte kontajnera/stroja
+MEMORY_BUDGET_MB = int(os.environ.get('MEMORY_BUDGET_MB', 0))
+# Po koľkých sekundách čakania na pamäť sa veľkej úlohe uvoľní miesto
+# (nové úlohy sa nespúšťajú, kým sa nezmestí)
+MEMORY_DEFER_TIMEOUT = int(os.environ.get('MEMORY_DEFER_TIMEOUT', 60))
+# Maximálny čas behu jednej kompresie (sekundy) - potom sa úloha ukončí
+# aj s pdftoppm. 0 = bez limitu.
+JOB_TIMEOUT = int(os.environ.get('JOB_TIMEOUT', 1800))
+# Odhad pamäte úlohy, ktorej PDF sa nedá prečítať pomocou pdfinfo (MB)
+DEFAULT_JOB_MEMORY_MB = 300
+# Ako často plánovač kontroluje limity bežiacich úloh (sekundy)
+MONITOR_INTERVAL = 0.5
+
+
+def default_memory_budget_mb() -> int:
+    """75 % limitu pamäte cgroup (kontajner), inak 75 % fyzickej pamäte"""
+    limit = None
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 60:
+            limit = int(value)
+        break
+
+    if limit is None:
+        try:
+            limit = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+        except (ValueError, OSError, AttributeError):
+            limit = 4 * 1024 ** 3
+    return int(limit * 0.75 / (1024 * 1024))
+
+
+def plan_job_memory(input_path: str, dpi: int, share_mb: int) -> tuple[int, dict]:
+    """
+    Odhadne pamäť úlohy a zvolí parametre kompresie.
+
+    Úloha, ktorá by pri bežných parametroch prekročila `share_mb` (podiel
+    jedného slotu na rozpočte pamäte), sa spustí v úspornom režime - po
+    jednej strane, so zakódovanými stránkami na disku.
+
+    Returns:
+        Tuple (odhad pamäte v MB, kwargs pre compress_pdf)
+    """
+    try:
+        memory_mb = estimate_memory_mb(input_path, dpi)
+        if memory_mb <= share_mb:
+            return memory_mb, {}
+        return estimate_memory_mb(input_path, dpi, **LOW_MEMORY_OPTIONS), dict(LOW_MEMORY_OPTIONS)
+    except Exception:
+        return DEFAULT_JOB_MEMORY_MB, {}
+
+
+class QueueFullError(Exception):
+    """Fronta úloh je plná, nová úloha nemôže byť prijatá"""
+
+
+# Spojenie procesu úlohy s plánovačom (nastaví sa v _job_process_main),
+# pokrok posielajú aj vlákna rozsahov strán
+_job_connection = None
+_job_connection_lock = threading.Lock()
+
+
+def round_robin_positions(queues: list) -> dict:
+    """
+    Poradie čakajúcich úloh pri striedaní batchov.
+
+    Args:
+        queues: Zoznam front batchov (zoznamy job_id) v poradí, v akom prídu na rad
+
+    Returns:
+        Dict job_id -> pozícia vo fronte (1 = spustí sa ako ďalšia)
+    """
+    positions = {}
+    position = 1
+    depth = 0
+    while True:
+        scheduled = False
+        for jobs in queues:
+            if depth < len(jobs):
+                positions[jobs[depth]] = position
+                position += 1
+                scheduled = True
+        if not scheduled:
+            return positions
+        depth += 1
+
+
+def _run_compression_job(job_id: str, input_path: str, output_path: str, dpi: int,
+                         jpeg_quality: int, options: dict, collect_stats: bool) -> tuple[bool, str, Optional[dict]]:
+    """
+    Spustí compress_pdf v procese úlohy a posiela pokrok do hlavného procesu.
+
+    Returns:
+        Tuple (success, message, merania fáz a počítadlá alebo None)
+    """
+    def progress_wrapper(fname, prog):
+        if _job_connection is not None:
+            with _job_connection_lock:
+                _job_connection.send(('progress', prog))
+
+    stats = {} if collect_stats else None
+    success, message = compress_pdf(
+        input_path,
+        output_path,
+        dpi=dpi,
+        jpeg_quality=jpeg_quality,
+        progress_callback=progress_wrapper,
+        stats=stats,
+        **options
+    )
+    return success, message, stats
+
+
+def _kill_process_group(signum, frame):
+    # Ukončenie procesu úlohy (napr. pri vypínaní) zabije aj pdftoppm
+    os.killpg(0, signal.SIGKILL)
+
+
+def _job_process_main(connection):
+    """Slučka procesu úloh - prijme úlohu, pošle pokrok a výsledok, čaká na ďalšiu"""
+    global _job_connection
+    if hasattr(os, 'setpgrp'):
+        # Vlastná skupina procesov - pdftoppm a pdfimages ju zdedia,
+        # JobProcess.kill() ich ukončí naraz
+        os.setpgrp()
+        signal.signal(signal.SIGTERM, _kill_process_group)
+    _job_connection = connection
+
+    while True:
+        try:
+            temp_dir, args = connection.recv()
+        except EOFError:
+            return
+        # Dočasné súbory úlohy (stránky, JPEG z pdftoppm) v adresári, ktorý
+        # rodič vymaže aj po zabití procesu
+        tempfile.tempdir = temp_dir
+        try:
+            result = _run_compression_job(*args)
+        except Exception as e:
+            result = (False, f"Chyba pri kompresii: {str(e)}", None)
+        connection.send(('result', result))
+
+
+class JobProcess:
+    """
+    Proces pre kompresné úlohy, ktorý sa dá kedykoľvek zastaviť.
+
+    Proces spracúva úlohy jednu po druhej. Beží vo vlastnej skupine procesov,
+    takže kill() ukončí aj rasterizér (pdftoppm). Každá úloha má vlastný
+    dočasný adresár, ktorý sa po jej skončení - aj zabitím - vymaže spolu
+    s rozpracovaným výstupom. Pokrok a výsledok idú cez vlastnú rúru procesu
+    (zabitie procesu počas zápisu do zdieľanej fronty by ju poškodilo).
+    """
+
+    def __init__(self, context):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_job_process_main, args=(child_connection,), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.job_id = None
+        self.output_path = None
+        self.temp_dir = None
+        self.timeout = 0
+        self.deadline = None
+        self.killed = False
+
+    def start(self, args: tuple, timeout: int = JOB_TIMEOUT) -> None:
+        """
+        Odovzdá procesu úlohu.
+
+        Args:
+            args: Argumenty _run_compression_job (job_id, input_path, output_path, ...)
+            timeout: Maximálny čas behu úlohy v sekundách (0 = bez limitu)
+        """
+        self.job_id, _, self.output_path = args[:3]
+        self.temp_dir = tempfile.mkdtemp(prefix='pdf-job-')
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout > 0 else None
+        self.connection.send((self.temp_dir, args))
+
+    def receive(self) -> tuple[Optional[float], Optional[tuple]]:
+        """
+        Prečíta správy procesu bez čakania. Úlohu, ktorá prekročila časový
+        limit, zabije a vráti pre ňu chybový výsledok.
+
+        Returns:
+            Tuple (posledný pokrok alebo None, výsledok (success, message, stats) alebo None)
+        """
+        progress = None
+        try:
+            while self.connection.poll():
+                kind, value = self.connection.recv()
+                if kind == 'result':
+                    self._clear()
+                    return progress, value
+                progress = value
+        except (EOFError, OSError):
+            # Proces skončil bez výsledku (napr. OOM killer)
+            self.kill()
+            return progress, (False, f"Worker proces neočakávane skončil (kód {self.process.exitcode})", None)
+
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            timeout = self.timeout
+            self.kill()
+            return progress, (False, f"Kompresia trvala dlhšie ako {timeout} s (JOB_TIMEOUT) a bola ukončená", None)
+        return progress, None
+
+    def terminate(self) -> None:
+        """Zabije proces aj s podprocesmi (spojenie a súbory upracie kill())"""
+        self.killed = True
+        if not self.process.is_alive():
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            # Windows, alebo proces ešte nezaložil vlastnú skupinu
+            self.process.kill()
+
+    def kill(self) -> None:
+        """Zabije proces a vymaže dočasné súbory a rozpracovaný výstup úlohy"""
+        self.terminate()
+        self.process.join(5)
+        self.connection.close()
+        if self.output_path:
+            try:
+                os.unlink(self.output_path)
+            except OSError:
+                pass
+        self._clear()
+
+    def _clear(self) -> None:
+        """Vymaže dočasný adresár úlohy, proces je pripravený na ďalšiu"""
+        if self.temp_dir:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+        self.job_id = self.output_path = self.temp_dir = self.deadline = None
+        self.timeout = 0
+
+
+class JobScheduler:
+    """
+    Centrálny plánovač kompresných úloh.
+
+    Úlohy čakajú vo FIFO fronte rozdelenej podľa batchov. Batche sa striedajú
+    (round-robin), takže veľký batch jedného používateľa neblokuje ostatných.
+    Kompresia beží v procesoch (JobProcess), JPEG enkódovanie teda nie je
+    obmedzené GIL. Úlohu možno zrušiť (cancel) a úloha bežiaca dlhšie ako
+    JOB_TIMEOUT sa ukončí - v oboch prípadoch aj s pdftoppm a jej slot sa
+    hneď uvoľní.
+
+    Úloha sa spustí, len ak sa jej odhad pamäte zmestí do rozpočtu spolu
+    s bežiacimi úlohami. Úloha, ktorá sa nezmestí, čaká a medzitým môžu
+    bežať menšie úlohy z ďalších batchov - po MEMORY_DEFER_TIMEOUT sa už
+    nové úlohy nespúšťajú, kým sa pre ňu neuvoľní pamäť. Úloha väčšia ako
+    celý rozpočet beží sama.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = COMPRESSION_WORKERS,
+        max_queue_size: int = MAX_QUEUED_JOBS,
+        on_start: Optional[callable] = None,
+        on_progress: Optional[callable] = None,
+        on_finish: Optional[callable] = None,
+        on_stats: Optional[callable] = None,
+        memory_budget_mb: int = MEMORY_BUDGET_MB,
+        job_timeout: int = JOB_TIMEOUT
+    ):
+        """
+        Args:
+            max_workers: Počet paralelne bežiacich kompresií
+            max_queue_size: Maximálny počet čakajúcich úloh
+            memory_budget_mb: Pamäť pre súbežné kompresie (0 = default_memory_budget_mb())
+            job_timeout: Maximálny čas behu úlohy v sekundách (0 = bez limitu)
+            on_start: Callback (job_id) pri spustení úlohy
+            on_progress: Callback (job_id, progress) pri zmene pokroku
+            on_finish: Callback (job_id, success, message) po dokončení úlohy
+            on_stats: Callback (job_id, success, stats) s meraniami dokončenej úlohy
+                (fázy a počítadlá z compress_pdf, 'queue_wait' v sekundách).
+                Bez neho sa merania nezbierajú.
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_queue_size = max_queue_size
+        self.on_start = on_start
+        self.on_progress = on_progress
+        self.on_finish = on_finish
+        self.on_stats = on_stats
+        self.memory_budget_mb = memory_budget_mb or default_memory_budget_mb()
+        self.job_timeout = job_timeout
+
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()  # batch_id -> deque úloh
+        self._pending_count = 0
+        self._running = {}  # job_id -> rezervovaná pamäť (MB)
+        self._deferred = {}  # job_id -> čas, odkedy čaká na pamäť
+        self._processes = {}  # job_id -> (JobProcess, čakanie vo fronte) bežiacej úlohy
+        self._idle = []  # voľné procesy úloh
+        self._cancelled = set()  # zrušené úlohy, ktorých proces ešte nebol uprataný
+        self._mp_context = multiprocessing.get_context('spawn')
+        self._monitor_thread = None
+
+    def _ensure_monitor(self):
+        """Lenivo spustí vlákno, ktoré sleduje procesy úloh (volať pod zámkom)"""
+        if self._monitor_thread is None:
+            self._monitor_thread = threading.Thread(target=self._monitor, daemon=True)
+            self._monitor_thread.start()
+
+    def _monitor(self):
+        """Preposiela pokrok a výsledky procesov úloh, ukončuje úlohy po limite"""
+        while True:
+            with self._lock:
+                running = dict(self._processes)
+            if running:
+                wait([process.connection for process, _ in running.values()], timeout=MONITOR_INTERVAL)
+            else:
+                time.sleep(MONITOR_INTERVAL)
+
+            for job_id, (process, queue_wait) in running.items():
+                self._check_process(job_id, process, queue_wait)
+
+    def _check_process(self, job_id, process, queue_wait):
+        """Spracuje správy procesu úlohy, dokončenú úlohu odovzdá _job_done"""
+        progress, result = process.receive()
+        if result is None:
+            if progress is not None and self.on_progress and job_id not in self._cancelled:
+                try:
+                    self.on_progress(job_id, progress)
+                except Exception as e:
+                    print(f"Chyba v progress callbacku pre {job_id}: {e}")
+            return
+
+        if process.killed:
+            # Zrušená úloha mohla doslať výsledok - spojenie zabitého procesu sa zatvorí
+            process.kill()
+        with self._lock:
+            self._processes.pop(job_id, None)
+            if not process.killed:
+                self._idle.append(process)
+            if job_id in self._cancelled:
+                # Slot sa uvoľnil už pri zrušení, výsledok sa zahodí
+                self._cancelled.discard(job_id)
+                return
+
+        success, message, stats = result
+        self._job_done(job_id, success, message, dict(stats or {}, queue_wait=queue_wait))
+
+    def has_capacity(self, count: int = 1) -> bool:
+        """Vráti True, ak sa do fronty zmestí `count` ďalších úloh"""
+        with self._lock:
+            return self._pending_count + count <= self.max_queue_size
+
+    def submit(self, batch_id: str, job_id: str, input_path: str, output_path: str,
+               dpi: int, jpeg_quality: int, profile: bool = False) -> None:
+        """
+        Zaradí úlohu do fronty.
+
+        Args:
+            profile: Profilovať kompresiu (profil sa uloží vedľa výstupu)
+
+        Raises:
+            QueueFullError: Ak je fronta plná
+        """
+        if not self.has_capacity():
+            raise QueueFullError("Fronta kompresných úloh je plná")
+
+        # Odhad pamäte z pdfinfo (mimo zámku - spúšťa podproces)
+        memory_mb, options = plan_job_memory(input_path, dpi, self.memory_budget_mb // self.max_workers)
+        if profile:
+            options = dict(options, profile=True)
+
+        with self._lock:
+            if self._pending_count >= self.max_queue_size:
+                raise QueueFullError("Fronta kompresných úloh je plná")
+
+            args = (job_id, input_path, output_path, dpi, jpeg_quality, options, self.on_stats is not None)
+            job = (job_id, args, memory_mb, time.monotonic())
+            self._pending.setdefault(batch_id, deque()).append(job)
+            self._pending_count += 1
+
+        self._dispatch()
+
+    def _fits(self, memory_mb: int) -> bool:
+        """Zmestí sa úloha do rozpočtu pamäte (volať pod zámkom)"""
+        if not self._running:
+            # Aj úloha väčšia ako celý rozpočet musí raz bežať - sama
+            return True
+        return sum(self._running.values()) + memory_mb <= self.memory_budget_mb
+
+    def _next_job(self):
+        """
+        Vyberie ďalšiu úlohu - round-robin medzi batchmi (volať pod zámkom).
+
+        Returns:
+            Úloha alebo None, ak sa žiadna nezmestí do rozpočtu pamäte
+        """
+        now = time.monotonic()
+        for batch_id, jobs in self._pending.items():
+            job_id, args, memory_mb, queued_at = jobs[0]
+            if not self._fits(memory_mb):
+                deferred_since = self._deferred.setdefault(job_id, now)
+                if now - deferred_since > MEMORY_DEFER_TIMEOUT:
+                    # Úloha čaká dlho - ďalšie sa nespustia, kým sa pamäť neuvoľní
+                    return None
+                continue
+
+            jobs.popleft()
+            del self._pending[batch_id]
+            if jobs:
+                # Batch ide na koniec radu, aby sa vystriedali ostatné batche
+                self._pending[batch_id] = jobs
+            self._pending_count -= 1
+            self._deferred.pop(job_id, None)
+            return job_id, args, memory_mb, queued_at
+        return None
+
+    def _dispatch(self):
+        """Spustí čakajúce úlohy, kým sú voľné sloty"""
+        while True:
+            with self._lock:
+                if not self._pending or len(self._running) >= self.max_workers:
+                    return
+                job = self._next_job()
+                if job is None:
+                    return
+                job_id, args, memory_mb, queued_at = job
+                self._running[job_id] = memory_mb
+                self._ensure_monitor()
+            queue_wait = time.monotonic() - queued_at
+
+            # Slot je rezervovaný - akákoľvek chyba pri spúšťaní ho musí uvoľniť
+            # a úlohu ukončiť cez _job_done, inak by ostala navždy "bežiaca"
+            try:
+                if self.on_start:
+                    self.on_start(job_id)
+
+                with self._lock:
+                    if job_id not in self._running:
+                        # Zrušená medzi výberom a spustením
+                        continue
+                    process = None
+                    try:
+                        process = self._idle_process() or JobProcess(self._mp_context)
+                        process.start(args, self.job_timeout)
+                        self._processes[job_id] = (process, queue_wait)
+                        continue
+                    except Exception:
+                        if process is not None:
+                            process.kill()
+                        raise
+            except Exception as e:
+                error = f"Chyba worker procesu: {e}"
+            self._job_done(job_id, False, error, {'queue_wait': queue_wait})
+
+    def _idle_process(self) -> Optional[JobProcess]:
+        """Voľný živý proces úloh alebo None (volať pod zámkom)"""
+        while self._idle:
+            process = self._idle.pop()
+            if process.process.is_alive():
+                return process
+            process.kill()
+        return None
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Zruší čakajúcu alebo bežiacu úlohu.
+
+        Bežiaca úloha sa zabije aj s pdftoppm a jej slot sa hneď uvoľní
+        (dočasné súbory a rozpracovaný výstup upracú monitorovacie vlákno).
+        Callbacky on_finish a on_stats sa pre zrušenú úlohu nevolajú.
+
+        Returns:
+            True, ak úloha čakala alebo bežala
+        """
+        with self._lock:
+            for batch_id, jobs in self._pending.items():
+                job = next((job for job in jobs if job[0] == job_id), None)
+                if job is not None:
+                    jobs.remove(job)
+                    if not jobs:
+                        del self._pending[batch_id]
+                    self._pending_count -= 1
+                    self._deferred.pop(job_id, None)
+                    return True
+
+            if self._running.pop(job_id, None) is None:
+                return False
+            running = self._processes.get(job_id)
+            if running is not None:
+                self._cancelled.add(job_id)
+                running[0].terminate()
+
+        self._dispatch()
+        return True
+
+    def _job_done(self, job_id, success, message, stats=None):
+        """Uvoľní slot, zavolá callbacky a spustí ďalšie úlohy"""
+        with self._lock:
+            self._running.pop(job_id, None)
+
+        if self.on_finish:
+            try:
+                self.on_finish(job_id, success, message)
+            except Exception as e:
+                print(f"Chyba vo finish callbacku pre {job_id}: {e}")
+
+        if self.on_stats and stats is not None:
+            try:
+                self.on_stats(job_id, success, stats)
+            except Exception as e:
+                print(f"Chyba v stats callbacku pre {job_id}: {e}")
+
+        self._dispatch()
+
+    def queue_positions(self) -> dict:
+        """
+        Vypočíta poradie čakajúcich úloh podľa round-robin plánovania.
+
+        Returns:
+            Dict job_id -> pozícia vo fronte (1 = spustí sa ako ďalšia)
+        """
+        with self._lock:
+            queues = [[job[0] for job in jobs] for jobs in self._pending.values()]
+
+        return round_robin_positions(queues)
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """Pozícia úlohy vo fronte alebo None, ak nečaká"""
+        return self.queue_positions().get(job_id)
+
+    def stats(self) -> dict:
+        """Aktuálny stav plánovača"""
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'running': len(self._running),
+                'queued': self._pending_count,
+                'max_queued': self.max_queue_size,
+                'memory_budget_mb': self.memory_budget_mb,
+                'memory_reserved_mb': sum(self._running.values()),
+                'waiting_for_memory': len(self._deferred)
+            }
+
+
+class StoreQueue:
+    """
+    Fronta úloh v zdieľanom úložisku stavu (JOB_QUEUE=store).
+
+    Webová aplikácia úlohy len zapisuje do SQLite úložiska ako čakajúce,
+    spracúvajú ich samostatné worker procesy (worker.py) - aj na iných
+    uzloch so zdieľanými adresármi. Rozhranie zodpovedá JobScheduler.
+
+    Odhad pamäte úlohy sa zapíše do úložiska pri zaradení, workery ho pri
+    prevzatí rezervujú v spoločnom rozpočte (SqliteJobStore.claim_job).
+    """
+
+    def __init__(self, job_store, max_queue_size: int = MAX_QUEUED_JOBS,
+                 stale_timeout: int = WORKER_STALE_TIMEOUT,
+                 memory_budget_mb: int = MEMORY_BUDGET_MB, max_workers: int = COMPRESSION_WORKERS):
+        """
+        Args:
+            job_store: Zdieľané úložisko stavu úloh a fronta (QueueJobStore)
+            max_queue_size: Maximálny počet čakajúcich úloh
+            stale_timeout: Čas bez heartbeatu, po ktorom worker nie je aktívny
+            memory_budget_mb: Spoločný rozpočet pamäte workerov (0 = default_memory_budget_mb())
+            max_workers: Počet paralelných kompresií workera - úloha väčšia ako
+                jej podiel na rozpočte beží v úspornom režime
+        """
+        if not isinstance(job_store, QueueJobStore):
+            raise ValueError("JOB_QUEUE=store vyžaduje JOB_STORE=sqlite")
+        self.job_store = job_store
+        self.max_queue_size = max_queue_size
+        self.stale_timeout = stale_timeout
+        self.memory_budget_mb = memory_budget_mb or default_memory_budget_mb()
+        self.max_workers = max(1, max_workers)
+
+    def has_capacity(self, count: int = 1) -> bool:
+        """Vráti True, ak sa do fronty zmestí `count` ďalších úloh"""
+        return len(self.job_store.pending_jobs()) + count <= self.max_queue_size
+
+    def submit(self, batch_id: str, job_id: str, input_path: str, output_path: str,
+               dpi: int, jpeg_quality: int, profile: bool = False) -> None:
+        """
+        Zapíše odhad pamäte úlohy - od tej chvíle si ju workery môžu prevziať
+        (parametre a príznak profile sú už v úložisku).
+        """
+        # Odhad pamäte z pdfinfo
+        memory_mb, options = plan_job_memory(input_path, dpi, self.memory_budget_mb // self.max_workers)
+        if options:
+            self.job_store.update_job_files(job_id, memory_options=options)
+        self.job_store.set_job_memory(job_id, memory_mb)
+
+    def cancel(self, job_id: str) -> bool:
+        """Zrušenie zapíše úložisko (cancel_job) - worker ho zistí a zabije kompresiu sám"""
+        return True
+
+    def queue_positions(self) -> dict:
+        """Poradie čakajúcich úloh podľa striedania batchov vo workeroch"""
+        queues = OrderedDict()
+        for batch_id, job_id in self.job_store.pending_jobs():
+            queues.setdefault(batch_id, []).append(job_id)
+        return round_robin_positions(list(queues.values()))
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """Pozícia úlohy vo fronte alebo None, ak nečaká"""
+        return self.queue_positions().get(job_id)
+
+    def stats(self) -> dict:
+        """Aktuálny stav fronty"""
+        stats = self.job_store.queue_stats(self.stale_timeout)
+        stats['max_queued'] = self.max_queue_size
+        stats['memory_budget_mb'] = self.memory_budget_mb
+        return stats
@@ -0,0 +1,766 @@
+"""
+PDF Kompresor - Úložisko stavu kompresných úloh (pamäť s TTL alebo SQLite)
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+# Backend úložiska: 'memory' (stav sa stratí pri reštarte) alebo 'sqlite'
+JOB_STORE = os.environ.get('JOB_STORE', 'memory')
+# Cesta k SQLite databáze stavu úloh
+JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH', 'data/jobs.db')
+# Ako dlho (hodiny) sa drží stav batchu od jeho poslednej zmeny
+JOB_TTL_HOURS = int(os.environ.get('JOB_TTL', os.environ.get('CLEANUP_AGE', 24)))
+
+# Stavy úlohy
+STATUS_PENDING = 'pending'
+STATUS_PROCESSING = 'processing'
+STATUS_COMPLETED = 'completed'
+STATUS_ERROR = 'error'
+STATUS_CANCELLED = 'cancelled'
+
+FINISHED_STATUSES = (STATUS_COMPLETED, STATUS_ERROR, STATUS_CANCELLED)
+
+CANCELLED_MESSAGE = 'Kompresia bola zrušená'
+
+# Úlohu bez odhadu pamäte dlhšie ako tento čas (sekundy) webový proces
+# nedokončil (spadol medzi add_job a set_job_memory) - worker ju prevezme
+# a pamäť odhadne sám
+SUBMIT_TIMEOUT = 300
+
+
+class JobStore(ABC):
+    """
+    Spoločné rozhranie úložiska stavu úloh.
+
+    Úloha (job) patrí do batchu. Verejný stav úlohy (názov, stav, pokrok,
+    výsledok) sa posiela klientovi, interné údaje (cesty k súborom, kľúč
+    cache) zostávajú na serveri. Počítadlá batchu sa menia atomicky spolu
+    so stavom úlohy, takže súbežné callbacky ich nerozbijú.
+    """
+
+    backend = None
+
+    @abstractmethod
+    def create_batch(self, batch_id: str, total_files: int, dpi: int, jpeg_quality: int) -> None:
+        """Založí nový batch s parametrami kompresie"""
+
+    @abstractmethod
+    def get_batch_settings(self, batch_id: str) -> Optional[dict]:
+        """Parametre batchu {'dpi', 'jpeg_quality', 'created'} alebo None"""
+
+    @abstractmethod
+    def close_batch(self, batch_id: str) -> Optional[int]:
+        """Zníži počet očakávaných súborov na počet prijatých, vráti ho (alebo None)"""
+
+    @abstractmethod
+    def add_job(self, job_id: str, batch_id: str, filename: str, files: dict) -> bool:
+        """
+        Pridá čakajúcu úlohu do batchu.
+
+        Args:
+            job_id: ID úlohy
+            batch_id: ID batchu
+            filename: Pôvodný názov súboru
+            files: Interné údaje úlohy (input_path, output_path, output_filename, cache_key)
+
+        Returns:
+            False, ak batch neexistuje alebo už obsahuje všetky ohlásené súbory
+        """
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """Verejný stav úlohy alebo None"""
+
+    @abstractmethod
+    def get_job_files(self, job_id: str) -> Optional[dict]:
+        """Interné údaje úlohy alebo None"""
+
+    @abstractmethod
+    def update_job_files(self, job_id: str, **fields) -> None:
+        """Doplní interné údaje úlohy"""
+
+    @abstractmethod
+    def start_job(self, job_id: str) -> bool:
+        """Prepne čakajúcu úlohu na spracovanie, vráti False ak nečakala"""
+
+    @abstractmethod
+    def set_progress(self, job_id: str, progress: float) -> bool:
+        """Nastaví pokrok spracovávanej úlohy, vráti True ak sa zmenil"""
+
+    @abstractmethod
+    def finish_job(self, job_id: str, success: bool, result: dict) -> Optional[dict]:
+        """
+        Označí úlohu za dokončenú a aktualizuje počítadlá batchu.
+
+        Args:
+            job_id: ID úlohy
+            success: Či kompresia uspela
+            result: Výsledok pre klienta (veľkosti a správa, alebo 'error')
+
+        Returns:
+            Interné údaje úlohy, alebo None ak úloha neexistuje či už bola dokončená
+        """
+
+    @abstractmethod
+    def cancel_job(self, job_id: str) -> Optional[dict]:
+        """
+        Označí čakajúcu alebo spracovávanú úlohu za zrušenú (v počítadlách
+        batchu ako zlyhanú). Bežiacu kompresiu zastaví plánovač, worker.py
+        zrušenie zistí z tohto stavu.
+
+        Returns:
+            Interné údaje úlohy, alebo None ak úloha neexistuje či už bola dokončená
+        """
+
+    @abstractmethod
+    def batch_snapshot(self, batch_id: str) -> Optional[dict]:
+        """Stav batchu s počítadlami a stavom všetkých súborov (alebo None)"""
+
+    @abstractmethod
+    def requeue_interrupted(self) -> list:
+        """
+        Vráti nedokončené úlohy (napr. po reštarte) a nastaví ich ako čakajúce.
+
+        Returns:
+            Zoznam dict s job_id, batch_id, input_path, output_path, dpi, jpeg_quality
+        """
+
+    @abstractmethod
+    def evict(self) -> int:
+        """Odstráni batche nezmenené dlhšie ako TTL, vráti ich počet"""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Počet batchov a úloh v úložisku"""
+
+    @abstractmethod
+    def add_metrics(self, values: dict) -> None:
+        """Pripočíta prírastky metrík {časová rada: hodnota} (metriky sa nevyraďujú)"""
+
+    @abstractmethod
+    def metric_values(self) -> dict:
+        """Nasčítané metriky {časová rada: hodnota}"""
+
+
+class QueueJobStore(JobStore):
+    """
+    Úložisko stavu, ktoré je zároveň frontou pre samostatné worker procesy
+    (worker.py, JOB_QUEUE=store) - len zdieľaný backend.
+    """
+    @abstractmethod
+    def set_job_memory(self, job_id: str, memory_mb: int) -> None:
+        """Zapíše odhad pamäte úlohy - až potom si ju môže worker prevziať"""
+
+    @abstractmethod
+    def claim_job(self, worker_id: str, memory_budget_mb: int = 0,
+                  defer_timeout: float = 0) -> Optional[dict]:
+        """
+        Atomicky prevezme ďalšiu čakajúcu úlohu (round-robin medzi batchmi).
+
+        Pamäť úlohy (odhad zo set_job_memory) sa rezervuje v úložisku, takže
+        všetky workery zdieľajúce frontu sa delia o jeden rozpočet. Úloha,
+        ktorá sa k bežiacim nezmestí, zostane vo fronte a medzitým môžu bežať
+        menšie úlohy - po defer_timeout od zaradenia sa už nové úlohy
+        nepreberajú, kým sa pre ňu pamäť neuvoľní. Úloha väčšia ako celý
+        rozpočet beží sama.
+
+        Args:
+            worker_id: Identifikátor workera
+            memory_budget_mb: Spoločný rozpočet pamäte (0 = bez limitu)
+            defer_timeout: Ako dlho (sekundy) môžu menšie úlohy predbiehať veľkú
+
+        Returns:
+            Dict s job_id, batch_id, input_path, output_path, dpi, jpeg_quality,
+            queued (čas zaradenia do fronty), profile, memory_mb (None = odhadnúť
+            a zapísať cez set_job_memory) a memory_options (parametre kompresie
+            z odhadu pamäte) alebo None
+        """
+
+    @abstractmethod
+    def heartbeat(self, job_id: str) -> None:
+        """Potvrdí, že worker na úlohe stále pracuje"""
+
+    @abstractmethod
+    def release_job(self, job_id: str) -> None:
+        """Vráti rozpracovanú úlohu do fronty (worker sa ukončuje)"""
+
+    @abstractmethod
+    def requeue_stale(self, timeout: float) -> int:
+        """Vráti do fronty úlohy workerov bez heartbeatu dlhšie ako timeout sekúnd"""
+
+    @abstractmethod
+    def pending_jobs(self) -> list:
+        """Čakajúce úlohy ako zoznam (batch_id, job_id) v poradí spúšťania batchov"""
+
+    @abstractmethod
+    def queue_stats(self, stale_timeout: float) -> dict:
+        """Počet bežiacich a čakajúcich úloh a aktívnych workerov"""
+
+
+def _finished_state(state: dict, status: str, result: dict) -> dict:
+    """Verejný stav dokončenej úlohy"""
+    finished = {
+        'filename': state['filename'],
+        'status': status,
+        'progress': 100 if status == STATUS_COMPLETED else 0
+    }
+    finished.update(result)
+    return finished
+
+
+class MemoryJobStore(JobStore):
+    """Stav úloh v pamäti procesu, staré batche vyraďuje evict() podľa TTL"""
+
+    backend = 'memory'
+
+    def __init__(self, ttl_hours: int = JOB_TTL_HOURS):
+        self.ttl = ttl_hours * 60 * 60
+        self._lock = threading.Lock()
+        self._batches = {}  # batch_id -> počítadlá, parametre a job_id súborov
+        self._jobs = {}  # job_id -> {'batch_id', 'state', 'files'}
+        self._metrics = {}  # časová rada -> hodnota
+
+    def _touch(self, batch: dict) -> None:
+        batch['updated'] = time.time()
+
+    def create_batch(self, batch_id, total_files, dpi, jpeg_quality):
+        now = time.time()
+        with self._lock:
+            self._batches[batch_id] = {
+                'total_files': total_files,
+                'completed': 0,
+                'failed': 0,
+                'processing': 0,
+                'dpi': dpi,
+                'jpeg_quality': jpeg_quality,
+                'created': now,
+                'updated': now,
+                'jobs': []
+            }
+
+    def get_batch_settings(self, batch_id):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return None
+            return {key: batch[key] for key in ('dpi', 'jpeg_quality', 'created')}
+
+    def close_batch(self, batch_id):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return None
+            batch['total_files'] = len(batch['jobs'])
+            self._touch(batch)
+            return batch['total_files']
+
+    def add_job(self, job_id, batch_id, filename, files):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None or len(batch['jobs']) >= batch['total_files']:
+                return False
+            batch['jobs'].append(job_id)
+            self._jobs[job_id] = {
+                'batch_id': batch_id,
+                'state': {'filename': filename, 'status': STATUS_PENDING, 'progress': 0},
+                'files': dict(files)
+            }
+            self._touch(batch)
+            return True
+
+    def get_job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return dict(job['state'], batch_id=job['batch_id'])
+
+    def get_job_files(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job['files']) if job else None
+
+    def update_job_files(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job['files'].update(fields)
+
+    def start_job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['state']['status'] != STATUS_PENDING:
+                return False
+            job['state']['status'] = STATUS_PROCESSING
+            batch = self._batches[job['batch_id']]
+            batch['processing'] += 1
+            self._touch(batch)
+            return True
+
+    def set_progress(self, job_id, progress):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            # Oneskorené správy po dokončení úlohy ignorujeme
+            if job is None or job['state']['status'] != STATUS_PROCESSING:
+                return False
+            if job['state']['progress'] == progress:
+                return False
+            job['state']['progress'] = progress
+            self._touch(self._batches[job['batch_id']])
+            return True
+
+    def finish_job(self, job_id, success, result):
+        return self._finish(job_id, STATUS_COMPLETED if success else STATUS_ERROR, result)
+
+    def cancel_job(self, job_id):
+        return self._finish(job_id, STATUS_CANCELLED, {'error': CANCELLED_MESSAGE})
+
+    def _finish(self, job_id: str, status: str, result: dict) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['state']['status'] in FINISHED_STATUSES:
+                return None
+            batch = self._batches[job['batch_id']]
+            if job['state']['status'] == STATUS_PROCESSING:
+                batch['processing'] -= 1
+            batch['completed' if status == STATUS_COMPLETED else 'failed'] += 1
+            job['state'] = _finished_state(job['state'], status, result)
+            self._touch(batch)
+            return dict(job['files'])
+
+    def batch_snapshot(self, batch_id):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return None
+            return {
+                'total_files': batch['total_files'],
+                'completed': batch['completed'],
+                'failed': batch['failed'],
+                'processing': batch['processing'],
+                'files': {job_id: dict(self._jobs[job_id]['state']) for job_id in batch['jobs']}
+            }
+
+    def requeue_interrupted(self):
+        # Pamäťový stav reštart neprežije - nie je čo obnoviť
+        return []
+
+    def evict(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [batch_id for batch_id, batch in self._batches.items()
+                       if batch['updated'] < cutoff]
+            for batch_id in expired:
+                for job_id in self._batches.pop(batch_id)['jobs']:
+                    self._jobs.pop(job_id, None)
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': self.backend, 'batches': len(self._batches), 'jobs': len(self._jobs)}
+
+    def add_metrics(self, values):
+        with self._lock:
+            for series, value in values.items():
+                self._metrics[series] = self._metrics.get(series, 0) + value
+
+    def metric_values(self):
+        with self._lock:
+            return dict(self._metrics)
+
+
+class SqliteJobStore(QueueJobStore):
+    """
+    Stav úloh v SQLite databáze (prežije reštart, zdieľaný medzi procesmi).
+
+    Každé vlákno má vlastné spojenie, databáza beží v režime WAL. Zmeny stavu
+    úlohy a počítadiel batchu prebiehajú v jednej transakcii (BEGIN IMMEDIATE).
+    """
+
+    backend = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS batches (
+            batch_id TEXT PRIMARY KEY,
+            total_files INTEGER NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            processing INTEGER NOT NULL DEFAULT 0,
+            jobs INTEGER NOT NULL DEFAULT 0,
+            dispatched REAL NOT NULL DEFAULT 0,
+            dpi INTEGER NOT NULL,
+            jpeg_quality INTEGER NOT NULL,
+            created REAL NOT NULL,
+            updated REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            batch_id TEXT NOT NULL REFERENCES batches(batch_id) ON DELETE CASCADE,
+            status TEXT NOT NULL,
+            progress REAL NOT NULL DEFAULT 0,
+            state TEXT NOT NULL,
+            files TEXT NOT NULL,
+            worker TEXT,
+            heartbeat REAL,
+            memory_mb INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS jobs_batch ON jobs(batch_id);
+        CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status);
+        CREATE TABLE IF NOT EXISTS metrics (
+            series TEXT PRIMARY KEY,
+            value REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str = JOB_STORE_PATH, ttl_hours: int = JOB_TTL_HOURS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl_hours * 60 * 60
+        self._local = threading.local()
+        db = self._connection()
+        db.executescript(self.SCHEMA)
+        # Databáza zo staršej verzie - jej úlohy sa prevezmú bez rezervácie pamäte
+        columns = [row['name'] for row in db.execute('PRAGMA table_info(jobs)')]
+        if 'memory_mb' not in columns:
+            db.execute('ALTER TABLE jobs ADD COLUMN memory_mb INTEGER')
+            db.execute('UPDATE jobs SET memory_mb = 0')
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute('PRAGMA foreign_keys=ON')
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def create_batch(self, batch_id, total_files, dpi, jpeg_quality):
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                'INSERT INTO batches (batch_id, total_files, dpi, jpeg_quality, created, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (batch_id, total_files, dpi, jpeg_quality, now, now)
+            )
+
+    def get_batch_settings(self, batch_id):
+        row = self._connection().execute(
+            'SELECT dpi, jpeg_quality, created FROM batches WHERE batch_id = ?', (batch_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def close_batch(self, batch_id):
+        with self._transaction() as db:
+            db.execute('UPDATE batches SET total_files = jobs, updated = ? WHERE batch_id = ?',
+                       (time.time(), batch_id))
+            row = db.execute('SELECT total_files FROM batches WHERE batch_id = ?',
+                             (batch_id,)).fetchone()
+        return row['total_files'] if row else None
+
+    def add_job(self, job_id, batch_id, filename, files):
+        state = {'filename': filename, 'status': STATUS_PENDING, 'progress': 0}
+        with self._transaction() as db:
+            updated = db.execute(
+                'UPDATE batches SET jobs = jobs + 1, updated = ? '
+                'WHERE batch_id = ? AND jobs < total_files',
+                (time.time(), batch_id)
+            ).rowcount
+            if not updated:
+                return False
+            db.execute(
+                'INSERT INTO jobs (job_id, batch_id, status, state, files) VALUES (?, ?, ?, ?, ?)',
+                (job_id, batch_id, STATUS_PENDING, json.dumps(state), json.dumps(files, default=str))
+            )
+        return True
+
+    @staticmethod
+    def _state(row) -> dict:
+        state = json.loads(row['state'])
+        state['status'] = row['status']
+        state['progress'] = row['progress']
+        return state
+
+    def get_job(self, job_id):
+        row = self._connection().execute(
+            'SELECT batch_id, status, progress, state FROM jobs WHERE job_id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(self._state(row), batch_id=row['batch_id'])
+
+    def get_job_files(self, job_id):
+        row = self._connection().execute(
+            'SELECT files FROM jobs WHERE job_id = ?', (job_id,)
+        ).fetchone()
+        return json.loads(row['files']) if row else None
+
+    def update_job_files(self, job_id, **fields):
+        with self._transaction() as db:
+            row = db.execute('SELECT files FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+            if row is None:
+                return
+            files = json.loads(row['files'])
+            files.update(fields)
+            db.execute('UPDATE jobs SET files = ? WHERE job_id = ?',
+                       (json.dumps(files, default=str), job_id))
+
+    def start_job(self, job_id):
+        with self._transaction() as db:
+            row = db.execute(
+                'UPDATE jobs SET status = ? WHERE job_id = ? AND status = ? RETURNING batch_id',
+                (STATUS_PROCESSING, job_id, STATUS_PENDING)
+            ).fetchone()
+            if row is None:
+                return False
+            db.execute('UPDATE batches SET processing = processing + 1, updated = ? WHERE batch_id = ?',
+                       (time.time(), row['batch_id']))
+        return True
+
+    def set_progress(self, job_id, progress):
+        with self._transaction() as db:
+            # Oneskorené správy po dokončení úlohy ignorujeme
+            row = db.execute(
+                'UPDATE jobs SET progress = ?, heartbeat = ? '
+                'WHERE job_id = ? AND status = ? AND progress != ? RETURNING batch_id',
+                (progress, time.time(), job_id, STATUS_PROCESSING, progress)
+            ).fetchone()
+            if row is None:
+                return False
+            db.execute('UPDATE batches SET updated = ? WHERE batch_id = ?',
+                       (time.time(), row['batch_id']))
+        return True
+
+    def finish_job(self, job_id, success, result):
+        return self._finish(job_id, STATUS_COMPLETED if success else STATUS_ERROR, result)
+
+    def cancel_job(self, job_id):
+        return self._finish(job_id, STATUS_CANCELLED, {'error': CANCELLED_MESSAGE})
+
+    def _finish(self, job_id: str, status: str, result: dict) -> Optional[dict]:
+        with self._transaction() as db:
+            row = db.execute(
+                'SELECT batch_id, status, progress, state, files FROM jobs WHERE job_id = ?',
+                (job_id,)
+            ).fetchone()
+            if row is None or row['status'] in FINISHED_STATUSES:
+                return None
+
+            state = _finished_state(self._state(row), status, result)
+            db.execute(
+                'UPDATE jobs SET status = ?, progress = ?, state = ? WHERE job_id = ?',
+                (state['status'], state['progress'], json.dumps(state), job_id)
+            )
+            counter = 'completed' if status == STATUS_COMPLETED else 'failed'
+            was_processing = 1 if row['status'] == STATUS_PROCESSING else 0
+            db.execute(
+                f'UPDATE batches SET {counter} = {counter} + 1, processing = processing - ?, '
+                'updated = ? WHERE batch_id = ?',
+                (was_processing, time.time(), row['batch_id'])
+            )
+        return json.loads(row['files'])
+
+    def batch_snapshot(self, batch_id):
+        db = self._connection()
+        # Počítadlá a súbory z jedného konzistentného snímku databázy
+        db.execute('BEGIN')
+        try:
+            batch = db.execute(
+                'SELECT total_files, completed, failed, processing FROM batches WHERE batch_id = ?',
+                (batch_id,)
+            ).fetchone()
+            if batch is None:
+                return None
+            rows = db.execute(
+                'SELECT job_id, status, progress, state FROM jobs WHERE batch_id = ? ORDER BY rowid',
+                (batch_id,)
+            ).fetchall()
+        finally:
+            db.execute('COMMIT')
+
+        snapshot = dict(batch)
+        snapshot['files'] = {row['job_id']: self._state(row) for row in rows}
+        return snapshot
+
+    def requeue_interrupted(self):
+        with self._transaction() as db:
+            rows = db.execute(
+                'SELECT j.job_id, j.batch_id, j.files, j.memory_mb, b.dpi, b.jpeg_quality '
+                'FROM jobs j JOIN batches b ON b.batch_id = j.batch_id '
+                'WHERE j.status IN (?, ?) ORDER BY j.rowid',
+                (STATUS_PENDING, STATUS_PROCESSING)
+            ).fetchall()
+            db.execute('UPDATE jobs SET status = ?, progress = 0, worker = NULL WHERE status = ?',
+                       (STATUS_PENDING, STATUS_PROCESSING))
+            db.execute('UPDATE batches SET processing = 0 WHERE processing != 0')
+
+        return [self._job_args(row) for row in rows]
+
+    @staticmethod
+    def _job_args(row) -> dict:
+        files = json.loads(row['files'])
+        return {
+            'job_id': row['job_id'],
+            'batch_id': row['batch_id'],
+            'input_path': files['input_path'],
+            'output_path': files['output_path'],
+            'dpi': row['dpi'],
+            'jpeg_quality': row['jpeg_quality'],
+            'queued': files.get('queued'),
+            'profile': files.get('profile', False),
+            'memory_mb': row['memory_mb'],
+            'memory_options': files.get('memory_options')
+        }
+
+    def set_job_memory(self, job_id, memory_mb):
+        self._connection().execute('UPDATE jobs SET memory_mb = ? WHERE job_id = ?',
+                                   (memory_mb, job_id))
+
+    def claim_job(self, worker_id, memory_budget_mb=0, defer_timeout=0):
+        now = time.time()
+        with self._transaction() as db:
+            running, reserved = db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(memory_mb), 0) FROM jobs WHERE status = ?',
+                (STATUS_PROCESSING,)
+            ).fetchone()
+            # Batch, z ktorého sa najdlhšie nič nespustilo, ide na rad ako prvý
+            rows = db.execute(
+                'SELECT j.job_id, j.batch_id, j.files, j.memory_mb, b.dpi, b.jpeg_quality '
+                'FROM jobs j JOIN batches b ON b.batch_id = j.batch_id '
+                'WHERE j.status = ? ORDER BY b.dispatched, j.rowid',
+                (STATUS_PENDING,)
+            ).fetchall()
+
+            row = None
+            for candidate in rows:
+                queued = json.loads(candidate['files']).get('queued') or now
+                if candidate['memory_mb'] is None:
+                    # Webová aplikácia úlohu ešte odovzdáva - po SUBMIT_TIMEOUT
+                    # ju prevezme worker a pamäť odhadne sám
+                    if now - queued > SUBMIT_TIMEOUT:
+                        row = candidate
+                        break
+                    continue
+                if not memory_budget_mb or not running or reserved + candidate['memory_mb'] <= memory_budget_mb:
+                    row = candidate
+                    break
+                if now - queued > defer_timeout:
+                    # Úloha čaká dlho - ďalšie sa neprevezmú, kým sa pamäť neuvoľní
+                    break
+            if row is None:
+                return None
+            db.execute('UPDATE jobs SET status = ?, worker = ?, heartbeat = ? WHERE job_id = ?',
+                       (STATUS_PROCESSING, worker_id, now, row['job_id']))
+            db.execute(
+                'UPDATE batches SET processing = processing + 1, dispatched = ?, updated = ? '
+                'WHERE batch_id = ?',
+                (now, now, row['batch_id'])
+            )
+        return self._job_args(row)
+
+    def heartbeat(self, job_id):
+        self._connection().execute('UPDATE jobs SET heartbeat = ? WHERE job_id = ?',
+                                   (time.time(), job_id))
+
+    def _requeue(self, db, condition: str, params: tuple) -> int:
+        """Vráti vybrané bežiace úlohy do fronty a opraví počítadlá batchov"""
+        rows = db.execute(
+            f'SELECT batch_id, COUNT(*) AS count FROM jobs WHERE status = ? AND {condition} '
+            'GROUP BY batch_id',
+            (STATUS_PROCESSING,) + params
+        ).fetchall()
+        db.execute(
+            f'UPDATE jobs SET status = ?, progress = 0, worker = NULL WHERE status = ? AND {condition}',
+            (STATUS_PENDING, STATUS_PROCESSING) + params
+        )
+        for row in rows:
+            db.execute('UPDATE batches SET processing = processing - ?, updated = ? WHERE batch_id = ?',
+                       (row['count'], time.time(), row['batch_id']))
+        return sum(row['count'] for row in rows)
+
+    def release_job(self, job_id):
+        with self._transaction() as db:
+            self._requeue(db, 'job_id = ?', (job_id,))
+
+    def requeue_stale(self, timeout):
+        with self._transaction() as db:
+            return self._requeue(db, 'heartbeat < ?', (time.time() - timeout,))
+
+    def pending_jobs(self):
+        rows = self._connection().execute(
+            'SELECT j.batch_id, j.job_id FROM jobs j JOIN batches b ON b.batch_id = j.batch_id '
+            'WHERE j.status = ? ORDER BY b.dispatched, j.rowid',
+            (STATUS_PENDING,)
+        ).fetchall()
+        return [(row['batch_id'], row['job_id']) for row in rows]
+
+    def queue_stats(self, stale_timeout):
+        db = self._connection()
+        counts = dict(db.execute(
+            'SELECT status, COUNT(*) FROM jobs WHERE status IN (?, ?) GROUP BY status',
+            (STATUS_PENDING, STATUS_PROCESSING)
+        ).fetchall())
+        workers = db.execute(
+            'SELECT COUNT(DISTINCT worker) FROM jobs WHERE status = ? AND heartbeat >= ?',
+            (STATUS_PROCESSING, time.time() - stale_timeout)
+        ).fetchone()[0]
+        reserved = db.execute(
+            'SELECT COALESCE(SUM(memory_mb), 0) FROM jobs WHERE status = ?', (STATUS_PROCESSING,)
+        ).fetchone()[0]
+        return {
+            'running': counts.get(STATUS_PROCESSING, 0),
+            'queued': counts.get(STATUS_PENDING, 0),
+            'busy_workers': workers,
+            'memory_reserved_mb': reserved
+        }
+
+    def evict(self):
+        cutoff = time.time() - self.ttl
+        with self._transaction() as db:
+            return db.execute('DELETE FROM batches WHERE updated < ?', (cutoff,)).rowcount
+
+    def stats(self):
+        db = self._connection()
+        batches = db.execute('SELECT COUNT(*) FROM batches').fetchone()[0]
+        jobs = db.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+        return {'backend': self.backend, 'batches': batches, 'jobs': jobs}
+
+    def add_metrics(self, values):
+        with self._transaction() as db:
+            db.executemany(
+                'INSERT INTO metrics (series, value) VALUES (?, ?) '
+                'ON CONFLICT(series) DO UPDATE SET value = value + excluded.value',
+                list(values.items())
+            )
+
+    def metric_values(self):
+        rows = self._connection().execute('SELECT series, value FROM metrics').fetchall()
+        return {row['series']: row['value'] for row in rows}
+
+
+def create_job_store(backend: str = JOB_STORE) -> JobStore:
+    """Vytvorí úložisko podľa nastavenia JOB_STORE"""
+    if backend == 'sqlite':
+        return SqliteJobStore()
+    if backend == 'memory':
+        return MemoryJobStore()
+    raise ValueError(f"Neznámy JOB_STORE backend: {backend}")
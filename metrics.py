@@ -0,0 +1,153 @@
+"""
+PDF Kompresor - Metriky kompresných úloh (Prometheus text formát)
+
+Každá dokončená úloha prispeje do histogramov (trvanie úlohy a jej fáz,
+čakanie vo fronte, počet strán, veľkosť vstupu) a počítadiel. Hodnoty sa
+sčítavajú v úložisku stavu úloh (JobStore.add_metrics) - pri JOB_QUEUE=store
+ich zapisujú worker procesy do zdieľanej SQLite databázy a webová aplikácia
+ich vypíše na /metrics.
+"""
+import os
+import re
+import json
+
+# 0 = metriky vypnuté (úlohy nič nezapisujú, /metrics vráti 404)
+METRICS_ENABLED = int(os.environ.get('METRICS_ENABLED', 1))
+
+PREFIX = 'pdf_compressor_'
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+PAGES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+BYTES_BUCKETS = tuple(mb * 1024 * 1024 for mb in (0.1, 1, 5, 10, 25, 50, 100, 300, 600))
+
+# Názov -> (typ, popis, hranice histogramu)
+METRICS = {
+    'jobs_total': ('counter', 'Dokoncene ulohy podla vysledku (success, error, cached, cancelled)', None),
+    'job_seconds': ('histogram', 'Trvanie kompresie jednej ulohy (s)', SECONDS_BUCKETS),
+    'queue_wait_seconds': ('histogram', 'Cakanie ulohy vo fronte pred spustenim (s)', SECONDS_BUCKETS),
+    'stage_seconds': ('histogram', 'Trvanie fazy kompresie jednej ulohy (s)', SECONDS_BUCKETS),
+    'job_pages': ('histogram', 'Pocet stran jednej ulohy', PAGES_BUCKETS),
+    'job_input_bytes': ('histogram', 'Velkost vstupneho PDF (B)', BYTES_BUCKETS),
+    'pages_total': ('counter', 'Spracovane strany podla kodovania', None),
+    'input_bytes_total': ('counter', 'Spracovane vstupne bajty', None),
+    'output_bytes_total': ('counter', 'Zapisane vystupne bajty', None),
+}
+
+_HISTOGRAM_SUFFIXES = ('_bucket', '_sum', '_count')
+_LE_LABEL = re.compile(r',?le="([^"]*)"')
+
+
+def _format_value(value) -> str:
+    value = float(value)
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _series(name: str, labels: dict, suffix: str = '') -> str:
+    """Názov časovej rady, napr. pdf_compressor_stage_seconds_bucket{stage="render",le="1"}"""
+    text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    return f"{PREFIX}{name}{suffix}{{{text}}}" if text else f"{PREFIX}{name}{suffix}"
+
+
+def _add(values: dict, key: str, amount: float) -> None:
+    values[key] = values.get(key, 0) + amount
+
+
+def _increment(values: dict, name: str, amount: float, labels: dict = None) -> None:
+    _add(values, _series(name, labels or {}), amount)
+
+
+def _observe(values: dict, name: str, value: float, labels: dict = None) -> None:
+    """Pridá pozorovanie do histogramu (kumulatívne koše, ako v Prometheus)"""
+    labels = labels or {}
+    for bound in METRICS[name][2] + (float('inf'),):
+        if value <= bound:
+            _add(values, _series(name, dict(labels, le=_format_value(bound)), '_bucket'), 1)
+    _add(values, _series(name, labels, '_sum'), value)
+    _add(values, _series(name, labels, '_count'), 1)
+
+
+def job_metric_values(stats: dict, success: bool) -> dict:
+    """
+    Prírastky metrík z jednej dokončenej úlohy.
+
+    Args:
+        stats: Merania úlohy - výstup compress_pdf(stats=...) doplnený o 'queue_wait'
+        success: Či kompresia uspela
+
+    Returns:
+        Dict časová rada -> prírastok (pre JobStore.add_metrics)
+    """
+    values = {}
+    _increment(values, 'jobs_total', 1, {'result': 'success' if success else 'error'})
+
+    if stats.get('queue_wait') is not None:
+        _observe(values, 'queue_wait_seconds', stats['queue_wait'])
+    if stats.get('seconds') is not None:
+        _observe(values, 'job_seconds', stats['seconds'])
+    for stage, seconds in stats.get('stages', {}).items():
+        _observe(values, 'stage_seconds', seconds, {'stage': stage})
+
+    counters = stats.get('counters', {})
+    if counters.get('pages'):
+        _observe(values, 'job_pages', counters['pages'])
+    if counters.get('input_bytes'):
+        _observe(values, 'job_input_bytes', counters['input_bytes'])
+        _increment(values, 'input_bytes_total', counters['input_bytes'])
+    if counters.get('output_bytes'):
+        _increment(values, 'output_bytes_total', counters['output_bytes'])
+    for name, count in counters.items():
+        if name.startswith('pages_') and count:
+            _increment(values, 'pages_total', count, {'kind': name[len('pages_'):]})
+
+    return values
+
+
+def job_result_values(result: str) -> dict:
+    """Prírastky metrík úlohy bez merania kompresie - 'cached' (z cache výsledkov) alebo 'cancelled'"""
+    values = {}
+    _increment(values, 'jobs_total', 1, {'result': result})
+    return values
+
+
+def record_job(job_store, job_id: str, success: bool, stats: dict) -> None:
+    """Zapíše merania dokončenej úlohy do metrík a do logu (jeden JSON riadok)"""
+    job_store.add_metrics(job_metric_values(stats, success))
+    print(f"[{job_id}] Metriky: {json.dumps(dict(stats, success=success), sort_keys=True)}")
+
+
+def _sort_key(key: str) -> tuple:
+    """Poradie časových radov: podľa štítkov, koše vzostupne pred _sum a _count"""
+    base, _, labels = key.partition('{')
+    le = _LE_LABEL.search(labels)
+    suffix = next((index for index, suffix in enumerate(_HISTOGRAM_SUFFIXES) if base.endswith(suffix)), 0)
+    return _LE_LABEL.sub('', labels).rstrip('}'), suffix, float(le.group(1)) if le else 0.0
+
+
+def render_metrics(values: dict, gauges: dict = None) -> str:
+    """
+    Vypíše metriky v Prometheus text formáte (verzia 0.0.4).
+
+    Args:
+        values: Nasčítané časové rady z JobStore.metric_values()
+        gauges: Okamžité hodnoty {názov: (hodnota, popis)}, napr. stav fronty
+
+    Returns:
+        Text pre odpoveď /metrics
+    """
+    lines = []
+    for name, (kind, description, _) in METRICS.items():
+        family = PREFIX + name
+        names = {family} if kind != 'histogram' else {family + suffix for suffix in _HISTOGRAM_SUFFIXES}
+        series = sorted((key for key in values if key.partition('{')[0] in names), key=_sort_key)
+        lines.append(f"# HELP {family} {description}")
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(f"{key} {_format_value(values[key])}" for key in series)
+
+    for name, (value, description) in (gauges or {}).items():
+        lines.append(f"# HELP {PREFIX}{name} {description}")
+        lines.append(f"# TYPE {PREFIX}{name} gauge")
+        lines.append(f"{PREFIX}{name} {_format_value(value)}")
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,245 @@
+"""
+PDF Kompresor - Klasifikácia stránok a výber kódovania
+
+Každá vyrenderovaná stránka sa podľa obsahu zakóduje najvhodnejším kodekom:
+- čierno-biely text (bilevel) -> 1-bit CCITT G4 (TIFF), 5-20x menší ako JPEG
+- šedé stránky -> jednokanálový JPEG
+- farebné stránky -> RGB JPEG
+
+img2pdf vkladá G4 TIFF aj JPEG do PDF bez rekompresie.
+"""
+import io
+import os
+
+from PIL import Image, ImageChops
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    # Test farebnosti má pomalšiu náhradu cez ImageChops
+    NUMPY_AVAILABLE = False
+
+PAGE_BILEVEL = 'bilevel'
+PAGE_GRAY = 'gray'
+PAGE_COLOR = 'color'
+# Strana prevzatá z originálu bez rekompresie (pôvodný JPEG stream)
+PAGE_PASSTHROUGH = 'passthrough'
+PAGE_KINDS = (PAGE_BILEVEL, PAGE_GRAY, PAGE_COLOR, PAGE_PASSTHROUGH)
+# Označenie typov strán v správach o kompresii
+PAGE_KIND_LABELS = {
+    PAGE_BILEVEL: 'G4', PAGE_GRAY: 'sede', PAGE_COLOR: 'farebne', PAGE_PASSTHROUGH: 'povodne JPEG'
+}
+
+# Stránky sa klasifikujú na zmenšenine s touto dlhšou stranou (pixely)
+CLASSIFY_MAX_SIDE = 512
+# Pixel je farebný, ak sa jeho kanály líšia viac ako o túto hodnotu (0-255)
+COLOR_CHANNEL_DIFF = 48
+# Stránka je farebná, ak má aspoň tento podiel farebných pixelov
+COLOR_PIXEL_RATIO = float(os.environ.get('COLOR_PIXEL_RATIO', 0.005))
+# Stránka je bilevel, ak má najviac tento podiel poltónov (64-191).
+# 0 = bilevel kódovanie vypnuté (text sa kóduje ako šedý JPEG)
+BILEVEL_MAX_MIDTONES = float(os.environ.get('BILEVEL_MAX_MIDTONES', 0.02))
+# Strana s oblasťou poltónov (napr. malou fotografiou) nie je bilevel ani pri
+# nízkom celkovom podiele poltónov - zmenšenina sa delí na štvorce s touto
+# stranou (pixely) a štvorec s aspoň BILEVEL_TILE_MIDTONES poltónov je obrázok
+BILEVEL_TILE_SIZE = 32
+BILEVEL_TILE_MIDTONES = 0.25
+
+
+def page_thumbnail(image: Image.Image, max_side: int = CLASSIFY_MAX_SIDE) -> Image.Image:
+    """
+    Zmenšenina strany pre klasifikáciu.
+
+    Použije sa vzorkovanie najbližším pixelom - pri vyhladzovaní by sa hrany
+    písma rozmazali do poltónov a text by vyzeral ako fotografia.
+    """
+    scale = max_side / max(image.size)
+    if scale < 1:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.NEAREST)
+    return image.convert('RGB') if image.mode != 'RGB' else image.copy()
+
+
+def is_color_page(thumbnail: Image.Image) -> bool:
+    """
+    Zistí, či má RGB zmenšenina dosť pixelov s rozdielnymi kanálmi.
+
+    Šedý sken uložený ako RGB má všetky tri kanály takmer rovnaké - takú
+    stranu stačí kódovať jedným kanálom (tretina dát pre JPEG enkóder).
+    """
+    if NUMPY_AVAILABLE:
+        pixels = np.asarray(thumbnail, dtype=np.int16)
+        chroma = pixels.max(axis=2) - pixels.min(axis=2)
+        colored = int(np.count_nonzero(chroma > COLOR_CHANNEL_DIFF))
+        return colored > COLOR_PIXEL_RATIO * chroma.size
+
+    red, green, blue = thumbnail.split()
+    # max(|R-G|, |G-B|, |R-B|) = rozdiel najsvetlejšieho a najtmavšieho kanála
+    chroma = ImageChops.lighter(
+        ImageChops.lighter(ImageChops.difference(red, green), ImageChops.difference(green, blue)),
+        ImageChops.difference(red, blue)
+    )
+    histogram = chroma.histogram()
+    colored = sum(histogram[COLOR_CHANNEL_DIFF + 1:])
+    return colored > COLOR_PIXEL_RATIO * sum(histogram)
+
+
+def has_midtone_region(gray_thumbnail: Image.Image) -> bool:
+    """
+    Zistí, či šedá zmenšenina obsahuje súvislú oblasť poltónov.
+
+    Malá fotografia na textovej strane nepresiahne celkový limit poltónov,
+    binarizácia by ju ale zničila. Okraje písma sú rozptýlené po celej
+    strane, takže žiadny štvorec nezaplnia.
+    """
+    tile = BILEVEL_TILE_SIZE
+    limit = BILEVEL_TILE_MIDTONES * tile * tile
+
+    if NUMPY_AVAILABLE:
+        pixels = np.asarray(gray_thumbnail)
+        height, width = pixels.shape
+        rows, cols = -(-height // tile), -(-width // tile)
+        midtones = np.zeros((rows * tile, cols * tile), dtype=np.int32)
+        midtones[:height, :width] = (pixels >= 64) & (pixels < 192)
+        counts = midtones.reshape(rows, tile, cols, tile).sum(axis=(1, 3))
+        return bool((counts >= limit).any())
+
+    for top in range(0, gray_thumbnail.height, tile):
+        for left in range(0, gray_thumbnail.width, tile):
+            histogram = gray_thumbnail.crop((left, top, left + tile, top + tile)).histogram()
+            if sum(histogram[64:192]) >= limit:
+                return True
+    return False
+
+
+def is_bilevel_page(gray_thumbnail: Image.Image) -> bool:
+    """Zistí, či šedá zmenšenina obsahuje takmer len čierne a biele pixely"""
+    if BILEVEL_MAX_MIDTONES <= 0:
+        return False
+    histogram = gray_thumbnail.histogram()
+    midtones = sum(histogram[64:192])
+    if midtones > BILEVEL_MAX_MIDTONES * sum(histogram):
+        return False
+    return not has_midtone_region(gray_thumbnail)
+
+
+def classify_page(image: Image.Image) -> str:
+    """
+    Určí typ strany podľa obsahu.
+
+    Args:
+        image: Vyrenderovaná strana (ľubovoľný režim PIL)
+
+    Returns:
+        PAGE_BILEVEL, PAGE_GRAY alebo PAGE_COLOR
+    """
+    if image.mode == '1':
+        return PAGE_BILEVEL
+
+    thumbnail = page_thumbnail(image)
+    try:
+        if image.mode not in ('L', 'LA') and is_color_page(thumbnail):
+            return PAGE_COLOR
+        if is_bilevel_page(thumbnail.convert('L')):
+            return PAGE_BILEVEL
+        return PAGE_GRAY
+    finally:
+        thumbnail.close()
+
+
+def format_page_kinds(counts: dict) -> str:
+    """Počty strán podľa typu pre správu (napr. G4 12, sede 3, farebne 1)"""
+    return ", ".join(
+        f"{PAGE_KIND_LABELS[kind]} {counts[kind]}" for kind in PAGE_KINDS if counts.get(kind)
+    )
+
+
+def otsu_threshold(histogram: list) -> int:
+    """Prah binarizácie maximalizujúci rozptyl medzi triedami (Otsu) z 256-prvkového histogramu"""
+    total = sum(histogram)
+    if total == 0:
+        return 128
+
+    sum_all = sum(value * count for value, count in enumerate(histogram))
+    sum_background = 0
+    weight_background = 0
+    best_threshold = 128
+    best_variance = -1.0
+
+    for value, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += value * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            best_threshold = value
+    return best_threshold
+
+
+def encode_page(image: Image.Image, kind: str, jpeg_quality: int, dpi: int) -> bytes:
+    """
+    Zakóduje stranu kodekom podľa jej typu.
+
+    Args:
+        image: Vyrenderovaná strana
+        kind: Typ strany z classify_page()
+        jpeg_quality: Kvalita JPEG (pre šedé a farebné strany)
+        dpi: DPI zapísané do hlavičky - img2pdf podľa neho určí rozmer strany
+
+    Returns:
+        Zakódovaný obrázok (G4 TIFF alebo JPEG)
+    """
+    buffer = io.BytesIO()
+
+    if kind == PAGE_BILEVEL:
+        gray = image if image.mode in ('1', 'L') else image.convert('L')
+        if gray.mode == 'L':
+            threshold = otsu_threshold(gray.histogram())
+            gray = gray.point(lambda value: 255 if value > threshold else 0, mode='1')
+        gray.save(buffer, 'TIFF', compression='group4', dpi=(dpi, dpi))
+    elif kind == PAGE_GRAY:
+        gray = image if image.mode == 'L' else image.convert('L')
+        gray.save(buffer, 'JPEG', quality=jpeg_quality, optimize=True, dpi=(dpi, dpi))
+    else:
+        color = image if image.mode == 'RGB' else image.convert('RGB')
+        color.save(buffer, 'JPEG', quality=jpeg_quality, optimize=True, dpi=(dpi, dpi))
+
+    return buffer.getvalue()
+
+
+def route_jpeg_page(data: bytes, jpeg_quality: int, dpi: int) -> tuple:
+    """
+    Zatriedi stranu vyrenderovanú priamo do JPEG (pdftoppm -jpeg).
+
+    Farebnosť sa zistí zo zmenšeniny dekódovanej v režime draft (JPEG
+    dekóder zmenší obraz už pri dekódovaní DCT) - farebná strana sa použije
+    bez ďalšieho kódovania. Ostatné strany sa dekódujú celé na klasifikáciu,
+    prekóduje sa len text na G4. Šedá strana ostane JPEG z pdftoppm - druhé
+    JPEG kódovanie by pridalo artefakty (strata generácie), takmer prázdne
+    farebné kanály zväčšia súbor len o niekoľko percent.
+
+    Returns:
+        Tuple (typ strany, zakódovaný obrázok)
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft('RGB', (image.width // 4, image.height // 4))
+        thumbnail = page_thumbnail(image)
+    try:
+        if is_color_page(thumbnail):
+            return PAGE_COLOR, data
+    finally:
+        thumbnail.close()
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        kind = classify_page(image)
+        if kind != PAGE_BILEVEL:
+            return kind, data
+        return kind, encode_page(image, kind, jpeg_quality, dpi)
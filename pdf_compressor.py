@@ -1,14 +1,28 @@
 """
 PDF Kompresor - Logika pre kompresiu PDF dokumentov zo skenov
 """
+import io
 import os
 import tempfile
 import subprocess
 import platform
+import re
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional, Tuple
-from pdf2image import convert_from_path
-from PIL import Image
+from typing import Iterator, Optional, Tuple
+from pdf2image import convert_from_path, pdfinfo_from_path
+from pdf2image.exceptions import PDFPopplerTimeoutError
+from PIL import Image, ImageStat
+from batch_manifest import (
+    BatchManifest, file_sha256, STATUS_COMPRESSED, STATUS_WOULD_GROW, STATUS_FAILED
+)
+from page_classifier import (
+    BILEVEL_MAX_MIDTONES, COLOR_PIXEL_RATIO, PAGE_BILEVEL, PAGE_PASSTHROUGH, classify_page, encode_page, format_page_kinds, route_jpeg_page
+)
+from job_profiler import run_profiled
 try:
     import img2pdf
     IMG2PDF_AVAILABLE = True
@@ -16,6 +30,95 @@ except ImportError:
     IMG2PDF_AVAILABLE = False
     import warnings
     warnings.warn("img2pdf nie je nainštalovaný. Nainštalujte ho pomocou: pip install img2pdf")
+try:
+    import pikepdf
+    PIKEPDF_AVAILABLE = True
+except ImportError:
+    # Bez pikepdf sa obsah strany nedá overiť - JPEG strany sa neprevezmú
+    PIKEPDF_AVAILABLE = False
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    # Výpočty nad obrázkami majú pomalšiu náhradu v čistom Pythone
+    NUMPY_AVAILABLE = False
+
+# Verzia kompresného algoritmu - zvýšte pri každej zmene, ktorá mení výstup
+# (používa sa v kľúči cache výsledkov, pozri output_settings())
+ENGINE_VERSION = '5'
+
+# Začiatok správy compress_pdf, keď by výstup bol väčší ako originál
+WOULD_GROW_MESSAGE = "[UPOZORNENIE] Kompresia by zvacsila subor!"
+
+# Spôsob renderovania strán:
+# - 'pil': pdftoppm -> PPM -> PIL obrázok -> klasifikácia a kódovanie v PIL
+# - 'pdftoppm': pdftoppm zapisuje JPEG priamo, PIL dekóduje len zmenšeninu
+#   pre klasifikáciu a prekóduje len čierno-biele strany (G4)
+ENGINE_PIL = 'pil'
+ENGINE_PDFTOPPM = 'pdftoppm'
+RENDER_ENGINES = (ENGINE_PIL, ENGINE_PDFTOPPM)
+RENDER_ENGINE = os.environ.get('RENDER_ENGINE', ENGINE_PIL)
+
+# Počet stránok renderovaných jedným volaním pdftoppm v streamovacom režime.
+# Určuje maximálny počet dekódovaných stránok v pamäti naraz.
+STREAM_CHUNK_PAGES = int(os.environ.get('STREAM_CHUNK_PAGES', 4))
+# Limit renderovania jednej strany (sekundy) - pdftoppm, ktorý sa na
+# poškodenom PDF zasekne, sa po ňom ukončí. 0 = bez limitu.
+PAGE_TIMEOUT = int(os.environ.get('PAGE_TIMEOUT', 120))
+# Limit pdfinfo (sekundy)
+PDFINFO_TIMEOUT = 60
+# Počet paralelných rozsahov stránok pri kompresii jedného PDF
+PAGE_WORKERS = int(os.environ.get('PAGE_WORKERS', 1))
+# Limit pamäte pre zakódované stránky jedného PDF (MB), nad limit sa
+# stránky ukladajú do dočasných súborov. 0 = všetky stránky na disk.
+IN_MEMORY_LIMIT_MB = int(os.environ.get('IN_MEMORY_LIMIT_MB', 256))
+# Prevzatie existujúcich JPEG obrázkov strán bez rekompresie (0 = vypnuté)
+JPEG_PASSTHROUGH = int(os.environ.get('JPEG_PASSTHROUGH', 1))
+# JPEG s najviac toľkými bajtmi na pixel je už komprimovaný dosť - prevezme
+# sa, ak by sa pri kompresii nezmenšovalo jeho rozlíšenie
+PASSTHROUGH_MAX_BYTES_PER_PIXEL = float(os.environ.get('PASSTHROUGH_MAX_BYTES_PER_PIXEL', 0.25))
+# Réžia procesu kompresie (interpreter, knižnice) pre odhad pamäte úlohy (MB)
+PROCESS_BASE_MEMORY_MB = 80
+# Parametre kompresie s najmenšou spotrebou pamäte (po jednej strane, stránky na disku)
+LOW_MEMORY_OPTIONS = {'stream_chunk_pages': 1, 'page_workers': 1, 'memory_limit_mb': 0}
+# Počet vzorových stránok pre odhad výsledku (cieľový režim, predikcia zväčšenia)
+TARGET_SAMPLE_PAGES = int(os.environ.get('TARGET_SAMPLE_PAGES', 3))
+# Od koľkých stránok sa pri pevných parametroch najprv odhadne, či výstup nenarastie
+PREDICT_MIN_PAGES = int(os.environ.get('PREDICT_MIN_PAGES', 8))
+
+
+
+def output_settings() -> dict:
+    """
+    Nastavenia procesu, ktoré menia výstup kompresie pri rovnakých parametroch.
+    
+    Patria do kľúča cache výsledkov, aby sa po zmene konfigurácie
+    nepoužili výsledky skomprimované s inými nastaveniami.
+    
+    Returns:
+        Slovník nastavení (verzia algoritmu, renderovanie, prevzatie JPEG, klasifikácia)
+    """
+    return {
+        'engine_version': ENGINE_VERSION,
+        'render_engine': RENDER_ENGINE,
+        # Bez pikepdf sa JPEG strany neprevezmú
+        'jpeg_passthrough': bool(JPEG_PASSTHROUGH and PIKEPDF_AVAILABLE),
+        'passthrough_max_bytes_per_pixel': PASSTHROUGH_MAX_BYTES_PER_PIXEL,
+        'bilevel_max_midtones': BILEVEL_MAX_MIDTONES,
+        'color_pixel_ratio': COLOR_PIXEL_RATIO
+    }
+
+
+# Prehľadávaný priestor parametrov v cieľovom režime
+TARGET_DPI_CAPS = (150, 125, 100)
+TARGET_QUALITIES = (60, 65, 70, 75, 80, 85, 90, 95)
+# Réžia img2pdf na stranu (objekty strany a obrázka) pre odhad veľkosti
+PAGE_OVERHEAD_BYTES = 1024
+# Odhad musí prekročiť originál aspoň o toľko, aby sa kompresia preskočila
+WOULD_GROW_MARGIN = 1.1
+# SSIM sa počíta na výrezoch v plnom rozlíšení z najdetailnejších miest strany
+SSIM_TILE = 256 if NUMPY_AVAILABLE else 64
+SSIM_TILES = 4
 
 
 def find_poppler_path() -> Optional[str]:
@@ -39,10 +142,118 @@ def find_poppler_path() -> Optional[str]:
     return None
 
 
+def _poppler_executable(name: str, poppler_path: Optional[str] = None) -> str:
+    """Vráti cestu k Poppler nástroju (pdftoppm, pdfimages, ...)"""
+    if platform.system() == 'Windows':
+        name += '.exe'
+    if poppler_path:
+        return str(Path(poppler_path) / name)
+    return name
+
+
+def _parse_size(value: str) -> int:
+    """Prevedie veľkosť z výstupu pdfimages (napr. "512K", "1.2M") na bajty"""
+    units = {'B': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(float(value))
+
+
+def list_pdf_images(pdf_path: str, poppler_path: Optional[str] = None) -> list:
+    """
+    Zoznam obrázkov vložených v PDF pomocou `pdfimages -list`.
+    
+    Číta len metadáta (rozmery, kódovanie, umiestnenie na strane),
+    pixely sa nedekódujú.
+    
+    Args:
+        pdf_path: Cesta k PDF súboru
+        poppler_path: Voliteľná cesta k Poppler binárke
+    
+    Returns:
+        Zoznam dict {'page', 'num', 'type', 'width', 'height', 'color', 'comp',
+                     'bpc', 'enc', 'x_ppi', 'y_ppi', 'size'}
+    """
+    result = subprocess.run(
+        [_poppler_executable('pdfimages', poppler_path), '-list', str(pdf_path)],
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"pdfimages zlyhal: {result.stderr.strip()}")
+    
+    images = []
+    # Prvé dva riadky sú hlavička tabuľky
+    for line in result.stdout.splitlines()[2:]:
+        fields = line.split()
+        if len(fields) < 16:
+            continue
+        try:
+            images.append({
+                'page': int(fields[0]),
+                'num': int(fields[1]),
+                'type': fields[2],
+                'width': int(fields[3]),
+                'height': int(fields[4]),
+                'color': fields[5],
+                'comp': int(fields[6]),
+                'bpc': int(fields[7]),
+                'enc': fields[8],
+                'x_ppi': int(fields[12]),
+                'y_ppi': int(fields[13]),
+                'size': _parse_size(fields[14])
+            })
+        except ValueError:
+            continue
+    return images
+
+
+def _round_dpi(original_dpi: int) -> int:
+    """Obmedzí DPI na rozumné hodnoty (72-600) a zaokrúhli na najbližších 50"""
+    if original_dpi < 72:
+        return 72
+    elif original_dpi > 600:
+        return 600
+    else:
+        return round(original_dpi / 50) * 50
+
+
+def get_pdf_page_dpis(pdf_path: str, poppler_path: Optional[str] = None) -> dict:
+    """
+    Detekuje skutočné DPI skenu pre každú stranu bez renderovania.
+    
+    DPI strany je rozlíšenie najväčšieho obrázka na strane (pdfimages ho
+    počíta z rozmerov obrázka a jeho umiestnenia na strane). Strany bez
+    obrázkov (čisto vektorové) vo výsledku chýbajú.
+    
+    Args:
+        pdf_path: Cesta k PDF súboru
+        poppler_path: Voliteľná cesta k Poppler binárke
+    
+    Returns:
+        Dict page_number -> odhadované DPI (72-600)
+    """
+    return _page_dpis_from_images(list_pdf_images(pdf_path, poppler_path))
+
+
+def _page_dpis_from_images(images: list) -> dict:
+    """DPI strán z výstupu list_pdf_images() (pozri get_pdf_page_dpis)"""
+    page_dpis = {}
+    for image in images:
+        # Masky a prázdne obrázky neurčujú rozlíšenie skenu
+        if image['type'] != 'image' or image['x_ppi'] <= 0:
+            continue
+        ppi = max(image['x_ppi'], image['y_ppi'])
+        page_dpis[image['page']] = max(page_dpis.get(image['page'], 0), ppi)
+    
+    return {page: _round_dpi(ppi) for page, ppi in page_dpis.items()}
+
+
 def get_pdf_dpi(pdf_path: str, poppler_path: Optional[str] = None) -> int:
     """
     Detekuje približné DPI originálneho PDF súboru.
-    Konvertuje prvú stránku a odhaduje na základe veľkosti obrázka.
+    Vráti najvyššie DPI spomedzi strán (z metadát obrázkov, bez renderovania).
     
     Args:
         pdf_path: Cesta k PDF súboru
@@ -52,72 +263,452 @@ def get_pdf_dpi(pdf_path: str, poppler_path: Optional[str] = None) -> int:
         Odhadované DPI (72-600)
     """
     try:
-        # Konverzia prvej stránky na štandardných 200 DPI
-        if poppler_path:
-            images = convert_from_path(pdf_path, dpi=200, first_page=1, last_page=1, poppler_path=poppler_path)
+        page_dpis = get_pdf_page_dpis(pdf_path, poppler_path)
+        if not page_dpis:
+            return 150  # Default hodnota
+        return max(page_dpis.values())
+            
+    except Exception as e:
+        # Pri chybe vrátime default hodnotu
+        return 150
+
+
+def get_pdf_page_count(pdf_path: str, poppler_path: Optional[str] = None) -> int:
+    """
+    Zistí počet stránok PDF súboru pomocou pdfinfo (bez renderovania).
+    
+    Args:
+        pdf_path: Cesta k PDF súboru
+        poppler_path: Voliteľná cesta k Poppler binárke
+    
+    Returns:
+        Počet stránok
+    """
+    info = pdfinfo_from_path(pdf_path, poppler_path=poppler_path, timeout=PDFINFO_TIMEOUT)
+    return int(info.get('Pages', 0))
+
+
+def get_pdf_page_sizes(pdf_path: str, total_pages: int, poppler_path: Optional[str] = None) -> dict:
+    """
+    Zistí rozmer a otočenie každej strany pomocou pdfinfo (bez renderovania).
+    
+    Args:
+        pdf_path: Cesta k PDF súboru
+        total_pages: Počet stránok dokumentu
+        poppler_path: Voliteľná cesta k Poppler binárke
+    
+    Returns:
+        Dict page_number -> (width_pt, height_pt, rotation)
+    """
+    info = pdfinfo_from_path(pdf_path, poppler_path=poppler_path, first_page=1, last_page=total_pages,
+                             timeout=PDFINFO_TIMEOUT)
+    
+    sizes = {}
+    rotations = {}
+    for key, value in info.items():
+        match = re.match(r'Page\s+(\d+) (size|rot)$', key)
+        if not match:
+            continue
+        page = int(match.group(1))
+        if match.group(2) == 'size':
+            size = re.match(r'([\d.]+) x ([\d.]+)', str(value))
+            if size:
+                sizes[page] = (float(size.group(1)), float(size.group(2)))
         else:
-            images = convert_from_path(pdf_path, dpi=200, first_page=1, last_page=1)
+            rotations[page] = int(float(value))
+    
+    return {page: (width, height, rotations.get(page, 0)) for page, (width, height) in sizes.items()}
+
+
+def estimate_memory_mb(
+    input_path: str,
+    dpi: int,
+    stream_chunk_pages: int = STREAM_CHUNK_PAGES,
+    page_workers: int = PAGE_WORKERS,
+    memory_limit_mb: int = IN_MEMORY_LIMIT_MB,
+    poppler_path: Optional[str] = None
+) -> int:
+    """
+    Odhadne špičkovú pamäť compress_pdf z metadát pdfinfo (bez renderovania).
+    
+    Na jeden rozsah stránok sú naraz v pamäti PPM dáta bloku z pdftoppm
+    a z nich dekódované obrázky (2 × chunk × strana × 3 B), jedna kópia
+    pri konverzii a bitmapa v procese pdftoppm. K tomu zakódované stránky
+    do limitu memory_limit_mb (najviac veľkosť vstupu).
+    
+    Args:
+        input_path: Cesta k PDF súboru
+        dpi: DPI kompresie (0 = auto, počíta sa s maximom 150)
+        stream_chunk_pages, page_workers, memory_limit_mb: Parametre ako v compress_pdf
+        poppler_path: Voliteľná cesta k Poppler binárke
+    
+    Returns:
+        Odhad v MB
+    """
+    total_pages = get_pdf_page_count(input_path, poppler_path)
+    if total_pages == 0:
+        return PROCESS_BASE_MEMORY_MB
+    page_sizes = get_pdf_page_sizes(input_path, total_pages, poppler_path)
+    
+    render_dpi = dpi or 150
+    largest_page = max(
+        (width * height for width, height, rotation in page_sizes.values()),
+        default=612 * 792  # Letter, ak pdfinfo rozmery nevráti
+    )
+    page_bytes = largest_page / (72 * 72) * render_dpi * render_dpi * 3
+    
+    chunk = total_pages if stream_chunk_pages <= 0 else min(stream_chunk_pages, total_pages)
+    ranges = max(1, min(page_workers, total_pages))
+    rendering = page_bytes * (2 * chunk + 2) * ranges
+    encoded = min(memory_limit_mb * 1024 * 1024, os.path.getsize(input_path))
+    
+    return int(PROCESS_BASE_MEMORY_MB + (rendering + encoded) / (1024 * 1024))
+
+
+def plan_passthrough_pages(images: list, page_sizes: dict, dpi: int, page_dpi: Optional[dict] = None) -> dict:
+    """
+    Vyberie strany, ktorých pôvodný JPEG sa prevezme bez rekompresie.
+    
+    Strana sa prevezme, ak je na nej jediný obrázok - 8-bitový RGB/šedý JPEG
+    pokrývajúci celú neotočenú stranu - s rozlíšením najviac také, aké by
+    mala po kompresii, a s nízkym počtom bajtov na pixel. Opätovné kódovanie
+    takej strany by výstup nezmenšilo, len by pridalo stratu kvality. Zvyšný
+    obsah strany (text, kreslenie, anotácie) overuje image_only_pages().
+    
+    Args:
+        images: Výstup list_pdf_images()
+        page_sizes: Výstup get_pdf_page_sizes()
+        dpi: DPI renderovania
+        page_dpi: Voliteľné DPI pre jednotlivé strany
+    
+    Returns:
+        Dict page_number -> záznam obrázka z list_pdf_images()
+    """
+    page_dpi = page_dpi or {}
+    by_page = {}
+    for image in images:
+        by_page.setdefault(image['page'], []).append(image)
+    
+    plan = {}
+    for page, page_images in by_page.items():
+        if len(page_images) != 1 or page not in page_sizes:
+            continue
+        image = page_images[0]
+        width_pt, height_pt, rotation = page_sizes[page]
+        if (image['type'] != 'image' or image['enc'] != 'jpeg' or image['bpc'] != 8
+                or image['color'] not in ('rgb', 'gray', 'icc') or image['comp'] not in (1, 3)
+                or rotation % 360 != 0 or image['x_ppi'] <= 0 or image['y_ppi'] <= 0):
+            continue
         
-        if len(images) == 0:
-            return 150  # Default hodnota
+        # Obrázok musí pokrývať celú stranu (inak by sa stratil zvyšok obsahu strany)
+        image_width_pt = image['width'] / image['x_ppi'] * 72
+        image_height_pt = image['height'] / image['y_ppi'] * 72
+        if abs(image_width_pt - width_pt) > width_pt * 0.02 or abs(image_height_pt - height_pt) > height_pt * 0.02:
+            continue
         
-        # Zistíme veľkosť obrázka pri 200 DPI
-        img = images[0]
-        width_200, height_200 = img.size
+        # Kompresia by znižovala rozlíšenie - tá sa oplatí
+        if max(image['x_ppi'], image['y_ppi']) > page_dpi.get(page, dpi) * 1.05:
+            continue
+        if image['size'] > image['width'] * image['height'] * PASSTHROUGH_MAX_BYTES_PER_PIXEL:
+            continue
         
-        # Pri 200 DPI platí: veľkosť v pixeloch / 200 = veľkosť v palcoch
-        # Ak je obrázok napr. 1700x2200px pri 200 DPI, veľkosť papiera je 8.5x11 palcov (A4: ~8.3x11.7)
+        plan[page] = image
+    return plan
+
+
+def image_only_pages(pdf_path: str, pages) -> set:
+    """
+    Vyberie strany, ktorých obsah je len jeden obrázok.
+    
+    Obsahový stream strany smie obsahovať len q, Q, cm a jediné Do
+    s obrazovým XObjectom, strana nesmie mať anotácie. Text, vektorové
+    kreslenie (pečiatky, podpisy, Bates čísla) ani formulárové polia nad
+    skenom by prevzatie pôvodného JPEG nezachovalo.
+    
+    Args:
+        pdf_path: Cesta k PDF súboru
+        pages: Kontrolované čísla strán (od 1)
+    
+    Returns:
+        Množina strán s jediným obrázkom (bez pikepdf prázdna)
+    """
+    if not PIKEPDF_AVAILABLE:
+        return set()
+    
+    result = set()
+    with pikepdf.open(pdf_path) as pdf:
+        for page_number in pages:
+            page = pdf.pages[page_number - 1]
+            if len(page.obj.get('/Annots', [])) > 0:
+                continue
+            
+            images = 0
+            for instruction in pikepdf.parse_content_stream(page):
+                if not isinstance(instruction, pikepdf.ContentStreamInstruction):
+                    # Inline obrázok (BI ... EI)
+                    break
+                operator = str(instruction.operator)
+                if operator in ('q', 'Q', 'cm'):
+                    continue
+                if operator != 'Do':
+                    break
+                xobject = page.obj.get('/Resources', {}).get('/XObject', {}).get(instruction.operands[0])
+                if xobject is None or xobject.get('/Subtype') != pikepdf.Name.Image:
+                    break
+                images += 1
+            else:
+                if images == 1:
+                    result.add(page_number)
+    return result
+
+
+def _set_jpeg_dpi(data: bytes, x_dpi: int, y_dpi: int) -> bytes:
+    """
+    Zapíše DPI do hlavičky JFIF bez zmeny obrazových dát.
+    
+    img2pdf podľa neho určí rozmer strany - JPEG vybraný z PDF nesie
+    rozlíšenie len v PDF, nie vo vlastnej hlavičke.
+    """
+    density = bytes([1]) + x_dpi.to_bytes(2, 'big') + y_dpi.to_bytes(2, 'big')
+    if data[2:4] == b'\xff\xe0' and data[6:11] == b'JFIF\x00':
+        return data[:13] + density + data[18:]
+    jfif = b'\xff\xe0\x00\x10JFIF\x00\x01\x01' + density + b'\x00\x00'
+    return data[:2] + jfif + data[2:]
+
+
+def iter_jpeg_pages(pdf_path: str, plan: dict, poppler_path: Optional[str] = None) -> Iterator[Tuple[int, bytes]]:
+    """
+    Vyberie pôvodné JPEG dáta naplánovaných strán pomocou `pdfimages -j`.
+    
+    pdfimages zapíše DCT stream bez dekódovania. Obrázky, ktoré nie sú
+    čistý DCT stream (uloží ich ako PPM), sa vynechajú - tie strany sa
+    skomprimujú bežne.
+    
+    Args:
+        pdf_path: Cesta k PDF súboru
+        plan: Výstup plan_passthrough_pages()
+        poppler_path: Voliteľná cesta k Poppler binárke
+    
+    Yields:
+        Tuple (page_number, JPEG bytes s DPI v hlavičke)
+    """
+    # Súvislé úseky strán - jedno volanie pdfimages na úsek
+    runs = []
+    for page in sorted(plan):
+        if runs and runs[-1][1] == page - 1:
+            runs[-1][1] = page
+        else:
+            runs.append([page, page])
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        prefix = os.path.join(temp_dir, 'img')
+        for first_page, last_page in runs:
+            result = subprocess.run(
+                [_poppler_executable('pdfimages', poppler_path), '-j', '-p',
+                 '-f', str(first_page), '-l', str(last_page), str(pdf_path), prefix],
+                capture_output=True,
+                text=True,
+                timeout=300
+            )
+            if result.returncode != 0:
+                raise RuntimeError(f"pdfimages zlyhal: {result.stderr.strip()}")
         
-        # Odhad: ak je obrázok približne A4 (8.3 x 11.7 palcov), 
-        # potom pri 200 DPI by mal byť ~1660 x 2340 pixelov
-        # Ak je väčší/menší, originálne DPI je vyššie/nižšie
+        for name in os.listdir(temp_dir):
+            match = re.match(r'img-(\d+)-\d+\.jpg$', name)
+            if not match or int(match.group(1)) not in plan:
+                continue
+            page = int(match.group(1))
+            with open(os.path.join(temp_dir, name), 'rb') as f:
+                data = f.read()
+            if data[:2] != b'\xff\xd8':
+                continue
+            image = plan[page]
+            yield page, _set_jpeg_dpi(data, image['x_ppi'], image['y_ppi'])
+
+
+def _render_timeout(first_page: int, last_page: int) -> Optional[int]:
+    """Limit jedného volania pdftoppm pre strany first_page..last_page (None = bez limitu)"""
+    if PAGE_TIMEOUT <= 0:
+        return None
+    return PAGE_TIMEOUT * (last_page - first_page + 1)
+
+
+def _page_chunks(
+    first_page: int,
+    total_pages: int,
+    dpi: int,
+    chunk_pages: int,
+    page_dpi: Optional[dict] = None,
+    skip_pages: Optional[set] = None
+) -> Iterator[Tuple[int, int, int]]:
+    """
+    Rozdelí strany first_page..total_pages na bloky pre jedno volanie pdftoppm.
+    
+    Blok končí po `chunk_pages` stranách, pri zmene DPI alebo pri vynechanej
+    strane - jedno volanie pdftoppm má jedno DPI a súvislý rozsah strán.
+    
+    Yields:
+        Tuple (chunk_first, chunk_last, chunk_dpi)
+    """
+    if chunk_pages <= 0:
+        chunk_pages = max(total_pages - first_page + 1, 1)
+    page_dpi = page_dpi or {}
+    skip_pages = skip_pages or set()
+    
+    chunk_first = first_page
+    while chunk_first <= total_pages:
+        if chunk_first in skip_pages:
+            chunk_first += 1
+            continue
         
-        # Jednoduchý výpočet: predpokladáme A4 šírku (~8.3 palcov)
-        estimated_inches = 8.3  # A4 šírka
-        original_dpi = int(width_200 / estimated_inches)
+        chunk_dpi = page_dpi.get(chunk_first, dpi)
+        chunk_last = chunk_first
+        while (chunk_last < min(chunk_first + chunk_pages - 1, total_pages)
+               and chunk_last + 1 not in skip_pages
+               and page_dpi.get(chunk_last + 1, dpi) == chunk_dpi):
+            chunk_last += 1
         
-        # Obmedzíme na rozumné hodnoty
-        if original_dpi < 72:
-            return 72
-        elif original_dpi > 600:
-            return 600
-        else:
-            # Zaokrúhlime na najbližších 50
-            return round(original_dpi / 50) * 50
+        yield chunk_first, chunk_last, chunk_dpi
+        chunk_first = chunk_last + 1
+
+
+def iter_pdf_pages(
+    pdf_path: str,
+    dpi: int,
+    total_pages: int,
+    poppler_path: Optional[str] = None,
+    chunk_pages: int = STREAM_CHUNK_PAGES,
+    first_page: int = 1,
+    page_dpi: Optional[dict] = None,
+    skip_pages: Optional[set] = None
+) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Postupne renderuje stránky PDF po blokoch (first_page/last_page okná).
+    
+    V pamäti je naraz najviac `chunk_pages` dekódovaných stránok, takže
+    spotreba pamäte nezávisí od počtu stránok dokumentu.
+    
+    Args:
+        pdf_path: Cesta k PDF súboru
+        dpi: DPI renderovania
+        total_pages: Posledná renderovaná stránka (počet stránok dokumentu)
+        poppler_path: Voliteľná cesta k Poppler binárke
+        chunk_pages: Počet stránok v jednom bloku (0 = celý rozsah naraz)
+        first_page: Prvá renderovaná stránka
+        page_dpi: Voliteľné DPI pre jednotlivé strany (page_number -> DPI),
+            strany mimo dict sa renderujú s `dpi`
+        skip_pages: Strany, ktoré sa nerenderujú (napr. prevzaté JPEG strany)
+    
+    Yields:
+        Tuple (page_number: int, image: Image.Image), čísla stránok od 1
+    """
+    for chunk_first, chunk_last, chunk_dpi in _page_chunks(
+        first_page, total_pages, dpi, chunk_pages, page_dpi, skip_pages
+    ):
+        images = convert_from_path(
+            pdf_path,
+            dpi=chunk_dpi,
+            first_page=chunk_first,
+            last_page=chunk_last,
+            poppler_path=poppler_path,
+            timeout=_render_timeout(chunk_first, chunk_last)
+        )
+        
+        page_number = chunk_first
+        while images:
+            # Odobratie zo zoznamu, aby sa obrázok uvoľnil hneď po spracovaní
+            yield page_number, images.pop(0)
+            page_number += 1
+
+
+def iter_pdf_jpeg_pages(
+    pdf_path: str,
+    dpi: int,
+    jpeg_quality: int,
+    total_pages: int,
+    poppler_path: Optional[str] = None,
+    chunk_pages: int = STREAM_CHUNK_PAGES,
+    first_page: int = 1,
+    page_dpi: Optional[dict] = None,
+    skip_pages: Optional[set] = None
+) -> Iterator[Tuple[int, bytes]]:
+    """
+    Renderuje stránky priamo do JPEG (`pdftoppm -jpeg`), bez PIL obrázkov.
+    
+    pdftoppm zapíše JPEG súbory bloku do dočasného adresára (pdf2image
+    paths_only), každý sa po načítaní hneď vymaže. Argumenty ako iter_pdf_pages.
+    
+    Yields:
+        Tuple (page_number: int, JPEG bytes s DPI v hlavičke)
+    """
+    for chunk_first, chunk_last, chunk_dpi in _page_chunks(
+        first_page, total_pages, dpi, chunk_pages, page_dpi, skip_pages
+    ):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = convert_from_path(
+                pdf_path,
+                dpi=chunk_dpi,
+                first_page=chunk_first,
+                last_page=chunk_last,
+                poppler_path=poppler_path,
+                fmt='jpeg',
+                jpegopt={'quality': jpeg_quality, 'optimize': True},
+                output_folder=temp_dir,
+                paths_only=True,
+                timeout=_render_timeout(chunk_first, chunk_last)
+            )
             
-    except Exception as e:
-        # Pri chybe vrátime default hodnotu
-        return 150
+            for page_number, path in enumerate(paths, chunk_first):
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.unlink(path)
+                yield page_number, _set_jpeg_dpi(data, chunk_dpi, chunk_dpi)
 
 
-def check_poppler_installed() -> Tuple[bool, str, Optional[str]]:
+def _pdftoppm_version(poppler_path: Optional[str] = None) -> Optional[str]:
     """
-    Kontroluje, či je Poppler nainštalovaný a dostupný.
+    Spustí `pdftoppm -v` a vráti verziu Poppler.
     
     Returns:
-        Tuple (is_installed: bool, message: str, poppler_path: Optional[str])
+        Verzia (napr. "22.02.0"), "" ak sa verzia nedá zistiť, None ak pdftoppm nie je dostupný
     """
-    # Najprv skúsime nájsť lokálnu inštaláciu
-    local_path = find_poppler_path()
-    if local_path:
-        return True, f"Poppler nájdený lokálne: {local_path}", local_path
-    
-    # Potom skúsime systémovú inštaláciu
     try:
-        # Skúsiame spustiť pdftoppm
         result = subprocess.run(
-            ['pdftoppm', '-h'] if platform.system() != 'Windows' else ['pdftoppm.exe', '-h'],
+            [_poppler_executable('pdftoppm', poppler_path), '-v'],
             capture_output=True,
             text=True,
             timeout=5
         )
-        
-        if result.returncode == 0 or 'pdftoppm' in result.stderr or 'pdftoppm' in result.stdout:
-            return True, "Poppler je nainštalovaný a dostupný v PATH", None
     except (FileNotFoundError, subprocess.TimeoutExpired):
-        pass
+        return None
     except Exception:
-        pass
+        return None
+    
+    output = result.stderr + result.stdout
+    if result.returncode != 0 and 'pdftoppm' not in output:
+        return None
+    
+    match = re.search(r'pdftoppm version ([\d.]+)', output)
+    return match.group(1) if match else ''
+
+
+def _probe_poppler() -> Tuple[bool, str, Optional[str], Optional[str]]:
+    """
+    Zistí dostupnosť Poppler (lokálna inštalácia, potom PATH).
+    
+    Returns:
+        Tuple (is_installed, message, poppler_path, version)
+    """
+    # Najprv skúsime nájsť lokálnu inštaláciu
+    local_path = find_poppler_path()
+    if local_path:
+        version = _pdftoppm_version(local_path)
+        return True, f"Poppler nájdený lokálne: {local_path}", local_path, version or None
+    
+    # Potom skúsime systémovú inštaláciu
+    version = _pdftoppm_version()
+    if version is not None:
+        return True, "Poppler je nainštalovaný a dostupný v PATH", None, version or None
     
     # Windows inštrukcie
     if platform.system() == 'Windows':
@@ -145,7 +736,562 @@ def check_poppler_installed() -> Tuple[bool, str, Optional[str]]:
             "macOS: brew install poppler"
         )
     
-    return False, message, None
+    return False, message, None, None
+
+
+# Výsledok detekcie nástrojov - zisťuje sa raz za proces
+_toolchain = None
+_toolchain_lock = threading.Lock()
+
+
+def get_toolchain(refresh: bool = False) -> dict:
+    """
+    Vráti informácie o dostupných nástrojoch (Poppler, img2pdf).
+    
+    Detekcia (subprocess + prehľadanie súborového systému) prebehne len pri
+    prvom volaní v procese, ďalšie volania vracajú uložený výsledok.
+    
+    Args:
+        refresh: Vynúti novú detekciu (napr. po doinštalovaní Poppler)
+    
+    Returns:
+        Dict {'poppler_installed', 'poppler_message', 'poppler_path',
+              'poppler_version', 'img2pdf_available', 'img2pdf_version'}
+    """
+    global _toolchain
+    
+    with _toolchain_lock:
+        if _toolchain is None or refresh:
+            installed, message, poppler_path, version = _probe_poppler()
+            _toolchain = {
+                'poppler_installed': installed,
+                'poppler_message': message,
+                'poppler_path': poppler_path,
+                'poppler_version': version,
+                'img2pdf_available': IMG2PDF_AVAILABLE,
+                'img2pdf_version': getattr(img2pdf, '__version__', None) if IMG2PDF_AVAILABLE else None
+            }
+        return dict(_toolchain)
+
+
+def invalidate_toolchain_cache() -> None:
+    """Zahodí uložený výsledok detekcie, ďalšie volanie get_toolchain() detekuje znova"""
+    global _toolchain
+    
+    with _toolchain_lock:
+        _toolchain = None
+
+
+def check_poppler_installed(refresh: bool = False) -> Tuple[bool, str, Optional[str]]:
+    """
+    Kontroluje, či je Poppler nainštalovaný a dostupný.
+    
+    Výsledok sa berie z get_toolchain(), detekcia teda prebehne raz za proces.
+    
+    Args:
+        refresh: Vynúti novú detekciu
+    
+    Returns:
+        Tuple (is_installed: bool, message: str, poppler_path: Optional[str])
+    """
+    toolchain = get_toolchain(refresh)
+    return toolchain['poppler_installed'], toolchain['poppler_message'], toolchain['poppler_path']
+
+
+class CompressionStats:
+    """
+    Trvanie fáz a počítadlá jednej kompresie.
+    
+    Fázy renderovania strán (render, classify, encode, store) sa sčítavajú
+    cez všetky vlákna rozsahov stránok, ostatné fázy sú úseky času na hodinách
+    (lap). Meranie je len perf_counter() na stranu - réžia je zanedbateľná.
+    """
+    
+    def __init__(self):
+        self.stages = {}  # fáza -> sekundy
+        self.counters = {}  # názov -> hodnota
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._last_lap = self._started
+    
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+    
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+    
+    def lap(self, name: str) -> None:
+        """Pripočíta fáze čas od predchádzajúceho lap()"""
+        now = time.perf_counter()
+        self.add_time(name, now - self._last_lap)
+        self._last_lap = now
+    
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+    
+    def timed(self, iterator: Iterator, name: str) -> Iterator:
+        """Prechádza iterátor a čas strávený v next() pripočíta fáze `name`"""
+        iterator = iter(iterator)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(name, time.perf_counter() - started)
+                return
+            self.add_time(name, time.perf_counter() - started)
+            yield item
+    
+    def as_dict(self) -> dict:
+        """Výsledok: {'seconds': celkový čas, 'stages': {...}, 'counters': {...}}"""
+        with self._lock:
+            return {
+                'seconds': round(time.perf_counter() - self._started, 4),
+                'stages': {name: round(seconds, 4) for name, seconds in self.stages.items()},
+                'counters': dict(self.counters)
+            }
+
+
+def _split_page_range(total_pages: int, parts: int) -> list:
+    """
+    Rozdelí stránky 1..total_pages na najviac `parts` súvislých rozsahov.
+    
+    Returns:
+        Zoznam tuple (first_page, last_page)
+    """
+    parts = max(1, min(parts, total_pages))
+    base, extra = divmod(total_pages, parts)
+    
+    ranges = []
+    first_page = 1
+    for i in range(parts):
+        last_page = first_page + base - 1 + (1 if i < extra else 0)
+        ranges.append((first_page, last_page))
+        first_page = last_page + 1
+    return ranges
+
+
+def _encode_page_range(
+    input_path: str,
+    dpi: int,
+    jpeg_quality: int,
+    first_page: int,
+    last_page: int,
+    poppler_path: Optional[str],
+    chunk_pages: int,
+    page_store: '_PageStore',
+    on_page_done: Optional[callable] = None,
+    page_dpi: Optional[dict] = None,
+    skip_pages: Optional[set] = None,
+    engine: str = ENGINE_PIL,
+    job_stats: Optional[CompressionStats] = None
+) -> None:
+    """
+    Renderuje rozsah stránok a každú zakóduje v pamäti podľa jej obsahu
+    (G4 pre čierno-biely text, šedý alebo farebný JPEG).
+    
+    Args:
+        page_store: Úložisko zakódovaných stránok, dopĺňa sa priebežne
+            (aby sa pri chybe dali vymazať aj čiastočné výsledky)
+        on_page_done: Funkcia volaná po zakódovaní každej stránky
+        page_dpi: Voliteľné DPI pre jednotlivé strany (page_number -> DPI)
+        skip_pages: Strany, ktoré už sú v page_store (prevzaté bez rekompresie)
+        engine: Spôsob renderovania (ENGINE_PIL alebo ENGINE_PDFTOPPM)
+        job_stats: Meranie fáz (render, classify, encode, store)
+    """
+    page_dpi = page_dpi or {}
+    job_stats = job_stats or CompressionStats()
+    
+    if engine == ENGINE_PDFTOPPM:
+        for page_number, data in job_stats.timed(iter_pdf_jpeg_pages(
+            input_path, dpi, jpeg_quality, last_page, poppler_path, chunk_pages,
+            first_page, page_dpi, skip_pages
+        ), 'render'):
+            with job_stats.stage('encode'):
+                kind, data = route_jpeg_page(data, jpeg_quality, page_dpi.get(page_number, dpi))
+            with job_stats.stage('store'):
+                page_store.add(page_number, data, kind)
+            
+            if on_page_done:
+                on_page_done()
+        return
+    
+    for page_number, image in job_stats.timed(iter_pdf_pages(
+        input_path, dpi, last_page, poppler_path, chunk_pages, first_page, page_dpi, skip_pages
+    ), 'render'):
+        # Kompresia do pamäte - DPI v hlavičke obrázka zachová rozmer
+        # strany v img2pdf aj pri rôznom DPI jednotlivých strán
+        render_dpi = page_dpi.get(page_number, dpi)
+        with job_stats.stage('classify'):
+            kind = classify_page(image)
+        with job_stats.stage('encode'):
+            data = encode_page(image, kind, jpeg_quality, render_dpi)
+        image.close()
+        with job_stats.stage('store'):
+            page_store.add(page_number, data, kind)
+        
+        if on_page_done:
+            on_page_done()
+
+
+class _PageStore:
+    """
+    Úložisko zakódovaných stránok (JPEG alebo G4 TIFF).
+    
+    Stránky sa držia v pamäti, kým ich celková veľkosť neprekročí
+    `memory_limit` bajtov - ďalšie stránky sa zapíšu do dočasných súborov.
+    Bezpečné pre použitie z viacerých vlákien.
+    """
+    
+    def __init__(self, memory_limit: int):
+        self.memory_limit = memory_limit
+        self.memory_used = 0
+        self.pages = {}  # page_number -> bytes alebo cesta k dočasnému súboru
+        self.kinds = {}  # page_number -> typ strany (page_classifier.PAGE_*)
+        self.sizes = {}  # page_number -> veľkosť zakódovanej strany v bajtoch
+        self.temp_files = []
+        self._lock = threading.Lock()
+    
+    def add(self, page_number: int, data: bytes, kind: str) -> None:
+        """Uloží zakódovanú stránku (do pamäte alebo na disk nad limitom)"""
+        with self._lock:
+            self.kinds[page_number] = kind
+            self.sizes[page_number] = len(data)
+            if self.memory_used + len(data) <= self.memory_limit:
+                self.memory_used += len(data)
+                self.pages[page_number] = data
+                return
+            
+            temp_file = tempfile.NamedTemporaryFile(
+                delete=False, suffix='.tif' if kind == PAGE_BILEVEL else '.jpg'
+            )
+            self.temp_files.append(temp_file.name)
+        
+        with temp_file:
+            temp_file.write(data)
+        with self._lock:
+            self.pages[page_number] = temp_file.name
+    
+    def ordered(self) -> list:
+        """Stránky v poradí podľa čísla strany (bytes alebo cesty)"""
+        return [self.pages[page_number] for page_number in sorted(self.pages)]
+    
+    def kind_counts(self) -> dict:
+        """Počet strán podľa typu kódovania"""
+        counts = {}
+        for kind in self.kinds.values():
+            counts[kind] = counts.get(kind, 0) + 1
+        return counts
+    
+    def open_image(self, page: object) -> Image.Image:
+        """Otvorí stránku vrátenú z ordered() ako PIL obrázok"""
+        if isinstance(page, bytes):
+            return Image.open(io.BytesIO(page))
+        return Image.open(page)
+    
+    def cleanup(self) -> None:
+        """Uvoľní pamäť a vymaže dočasné súbory"""
+        _remove_temp_files(self.temp_files)
+        self.temp_files = []
+        self.pages = {}
+        self.memory_used = 0
+
+
+def _remove_temp_files(temp_files: list) -> None:
+    """Vymaže dočasné súbory, chyby pri mazaní ignoruje"""
+    for temp_file in temp_files:
+        try:
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+        except Exception:
+            pass
+
+
+def _sample_page_numbers(total_pages: int, count: int) -> list:
+    """Rovnomerne rozložené vzorové strany (stred každého úseku dokumentu)"""
+    count = max(1, min(count, total_pages))
+    return sorted({int((i + 0.5) * total_pages / count) + 1 for i in range(count)})
+
+
+def _render_sample_pages(
+    input_path: str,
+    page_numbers: list,
+    dpi: int,
+    poppler_path: Optional[str],
+    page_dpi: Optional[dict] = None
+) -> list:
+    """
+    Renderuje vzorové strany pre odhad výsledku kompresie.
+    
+    Returns:
+        Zoznam tuple (page_number, render_dpi, image)
+    """
+    page_dpi = page_dpi or {}
+    samples = []
+    for page_number in page_numbers:
+        render_dpi = page_dpi.get(page_number, dpi)
+        images = convert_from_path(
+            input_path,
+            dpi=render_dpi,
+            first_page=page_number,
+            last_page=page_number,
+            poppler_path=poppler_path,
+            timeout=_render_timeout(page_number, page_number)
+        )
+        image = images[0]
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        samples.append((page_number, render_dpi, image))
+    return samples
+
+
+def _detail_boxes(image: Image.Image, tile: int = SSIM_TILE, count: int = SSIM_TILES) -> list:
+    """
+    Vyberie výrezy strany s najväčším kontrastom (text, hrany fotiek).
+    
+    Prázdne okraje by SSIM umelo zvyšovali - artefakty JPEG sú viditeľné
+    hlavne na detailoch, preto sa porovnávajú len tie.
+    """
+    gray = image.convert('L')
+    boxes = []
+    for top in range(0, max(1, gray.height - tile + 1), tile):
+        for left in range(0, max(1, gray.width - tile + 1), tile):
+            box = (left, top, min(left + tile, gray.width), min(top + tile, gray.height))
+            boxes.append((ImageStat.Stat(gray.crop(box)).stddev[0], box))
+    boxes.sort(reverse=True)
+    return [box for stddev, box in boxes[:count]]
+
+
+def _ssim(reference: Image.Image, candidate: Image.Image, block: int = 8) -> float:
+    """Priemerná SSIM dvoch jasových (L) výrezov rovnakej veľkosti, nepresahujúce bloky"""
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    width = reference.width // block * block
+    height = reference.height // block * block
+    if width == 0 or height == 0:
+        return 1.0
+    
+    if NUMPY_AVAILABLE:
+        shape = (height // block, block, width // block, block)
+        x = np.asarray(reference, dtype=np.float64)[:height, :width].reshape(shape)
+        y = np.asarray(candidate, dtype=np.float64)[:height, :width].reshape(shape)
+        mx = x.mean(axis=(1, 3), keepdims=True)
+        my = y.mean(axis=(1, 3), keepdims=True)
+        vx = ((x - mx) ** 2).mean(axis=(1, 3))
+        vy = ((y - my) ** 2).mean(axis=(1, 3))
+        cov = ((x - mx) * (y - my)).mean(axis=(1, 3))
+        mx = mx[:, 0, :, 0]
+        my = my[:, 0, :, 0]
+        ssim = ((2 * mx * my + c1) * (2 * cov + c2)) / ((mx ** 2 + my ** 2 + c1) * (vx + vy + c2))
+        return float(ssim.mean())
+    
+    xs = list(reference.getdata())
+    ys = list(candidate.getdata())
+    stride = reference.width
+    n = block * block
+    total = 0.0
+    blocks = 0
+    for top in range(0, height, block):
+        for left in range(0, width, block):
+            rows = range(top, top + block)
+            px = [xs[row * stride + col] for row in rows for col in range(left, left + block)]
+            py = [ys[row * stride + col] for row in rows for col in range(left, left + block)]
+            mx = sum(px) / n
+            my = sum(py) / n
+            vx = sum((v - mx) ** 2 for v in px) / n
+            vy = sum((v - my) ** 2 for v in py) / n
+            cov = sum((a - mx) * (b - my) for a, b in zip(px, py)) / n
+            total += ((2 * mx * my + c1) * (2 * cov + c2)) / ((mx ** 2 + my ** 2 + c1) * (vx + vy + c2))
+            blocks += 1
+    return total / blocks
+
+
+class _SizeEstimator:
+    """
+    Odhad výsledku kompresie z vzorových strán.
+    
+    Vzorky sa pre každú kombináciu (DPI strop, kvalita) zakódujú v pamäti
+    rovnakým kodekom ako pri kompresii, veľkosť dokumentu sa extrapoluje
+    z priemernej veľkosti vzorky. Výsledky sa ukladajú, aby sa pri hľadaní
+    žiadna kombinácia nekódovala dvakrát.
+    """
+    
+    def __init__(self, samples: list, total_pages: int):
+        self.samples = samples
+        self.total_pages = total_pages
+        self.kinds = [classify_page(image) for page_number, render_dpi, image in samples]
+        self._results = {}
+        self._references = None  # výrezy originálu pre SSIM (počítajú sa pri prvej potrebe)
+    
+    def _reference_tiles(self) -> list:
+        if self._references is None:
+            self._references = []
+            for (page_number, render_dpi, image), kind in zip(self.samples, self.kinds):
+                # Bilevel strany nezávisia od kvality JPEG - do SSIM sa nepočítajú
+                if kind == PAGE_BILEVEL:
+                    self._references.append([])
+                    continue
+                gray = image.convert('L')
+                boxes = _detail_boxes(gray)
+                self._references.append([(box, gray.crop(box)) for box in boxes])
+        return self._references
+    
+    def _scaled(self, image: Image.Image, render_dpi: int, dpi_cap: Optional[int]) -> Image.Image:
+        if dpi_cap is None or render_dpi <= dpi_cap:
+            return image
+        scale = dpi_cap / render_dpi
+        return image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                            Image.LANCZOS)
+    
+    def evaluate(self, dpi_cap: Optional[int], jpeg_quality: int, with_ssim: bool = False) -> dict:
+        """
+        Args:
+            dpi_cap: Horná hranica DPI (None = DPI renderovania vzoriek)
+            jpeg_quality: JPEG kvalita
+            with_ssim: Vypočítať aj SSIM voči vzorke
+        
+        Returns:
+            Dict {'size': odhad veľkosti v bajtoch, 'ssim': najhoršia SSIM vzorky alebo None}
+        """
+        key = (dpi_cap, jpeg_quality)
+        result = self._results.get(key)
+        if result is not None and (result['ssim'] is not None or not with_ssim):
+            return result
+        
+        sizes = []
+        ssims = []
+        references = self._reference_tiles() if with_ssim else None
+        for index, (page_number, render_dpi, image) in enumerate(self.samples):
+            scaled = self._scaled(image, render_dpi, dpi_cap)
+            data = encode_page(scaled, self.kinds[index], jpeg_quality, render_dpi)
+            sizes.append(len(data))
+            if with_ssim and references[index]:
+                # Dekódovaná strana v pôvodnom rozlíšení - ako ju uvidí čitateľ
+                with Image.open(io.BytesIO(data)) as decoded:
+                    restored = decoded.convert('L')
+                if restored.size != image.size:
+                    restored = restored.resize(image.size, Image.BILINEAR)
+                for box, tile in references[index]:
+                    ssims.append(_ssim(tile, restored.crop(box)))
+        
+        average = sum(sizes) / len(sizes)
+        result = {
+            'size': int((average + PAGE_OVERHEAD_BYTES) * self.total_pages),
+            'ssim': min(ssims) if ssims else (1.0 if with_ssim else None)
+        }
+        self._results[key] = result
+        return result
+
+
+def _last_true(items: tuple, predicate: callable) -> Optional[object]:
+    """Posledná položka, pre ktorú platí predikát (platí pre začiatok zoznamu)"""
+    low, high, found = 0, len(items) - 1, None
+    while low <= high:
+        middle = (low + high) // 2
+        if predicate(items[middle]):
+            found = items[middle]
+            low = middle + 1
+        else:
+            high = middle - 1
+    return found
+
+
+def _first_true(items: tuple, predicate: callable) -> Optional[object]:
+    """Prvá položka, pre ktorú platí predikát (platí pre koniec zoznamu)"""
+    low, high, found = 0, len(items) - 1, None
+    while low <= high:
+        middle = (low + high) // 2
+        if predicate(items[middle]):
+            found = items[middle]
+            high = middle - 1
+        else:
+            low = middle + 1
+    return found
+
+
+def choose_target_parameters(
+    estimator: '_SizeEstimator',
+    dpi_caps: tuple,
+    qualities: tuple,
+    target_size_mb: Optional[float] = None,
+    min_ssim: Optional[float] = None
+) -> dict:
+    """
+    Nájde parametre kompresie, ktoré splnia cieľ veľkosti a/alebo kvality.
+    
+    Veľkosť s kvalitou JPEG rastie a SSIM tiež, preto sa pre každý DPI strop
+    kvalita hľadá binárne. S cieľom veľkosti sa volí najvyššia kvalita, ktorá
+    sa zmestí, pri čo najvyššom DPI. Len s cieľom SSIM sa volí najmenší výstup,
+    ktorý ho dosiahne.
+    
+    Args:
+        estimator: Odhad výsledku zo vzorových strán
+        dpi_caps: Horné hranice DPI zoradené zostupne
+        qualities: JPEG kvality zoradené vzostupne
+        target_size_mb: Maximálna veľkosť výstupu (MB)
+        min_ssim: Minimálna SSIM vzorových strán (0-1)
+    
+    Returns:
+        Dict {'dpi_cap', 'jpeg_quality', 'size', 'ssim', 'met'}
+    """
+    target_bytes = target_size_mb * 1024 * 1024 if target_size_mb else None
+    with_ssim = min_ssim is not None
+    
+    def fits(dpi_cap, quality):
+        return estimator.evaluate(dpi_cap, quality)['size'] <= target_bytes
+    
+    def sharp(dpi_cap, quality):
+        return estimator.evaluate(dpi_cap, quality, True)['ssim'] >= min_ssim
+    
+    best = None
+    for dpi_cap in dpi_caps:
+        q_max = _last_true(qualities, lambda q: fits(dpi_cap, q)) if target_bytes else qualities[-1]
+        if q_max is None:
+            continue
+        q_min = _first_true(qualities, lambda q: sharp(dpi_cap, q)) if with_ssim else qualities[0]
+        if q_min is None or q_min > q_max:
+            continue
+        
+        quality = q_max if target_bytes else q_min
+        result = estimator.evaluate(dpi_cap, quality, with_ssim)
+        candidate = {'dpi_cap': dpi_cap, 'jpeg_quality': quality, 'size': result['size'],
+                     'ssim': result['ssim'], 'met': True}
+        if target_bytes:
+            # Najvyššie DPI, pri ktorom sa cieľ zmestí
+            return candidate
+        if best is None or candidate['size'] < best['size']:
+            best = candidate
+    
+    if best is not None:
+        return best
+    
+    # Cieľ sa nedá splniť - čo najbližšie k nemu
+    if target_bytes:
+        dpi_cap, quality = dpi_caps[-1], qualities[0]
+    else:
+        dpi_cap, quality = dpi_caps[0], qualities[-1]
+    result = estimator.evaluate(dpi_cap, quality, with_ssim)
+    return {'dpi_cap': dpi_cap, 'jpeg_quality': quality, 'size': result['size'],
+            'ssim': result['ssim'], 'met': False}
+
+
+def _would_grow_message(original_size: int, compressed_size: int, estimated: bool = False) -> str:
+    """Správa pre prípad, že by kompresia zväčšila súbor"""
+    label = "Odhad po kompresii" if estimated else "Po kompresii"
+    return (
+        f"{WOULD_GROW_MESSAGE} "
+        f"Original: {original_size / (1024 * 1024):.2f} MB, "
+        f"{label}: {compressed_size / (1024 * 1024):.2f} MB. "
+        f"Tento PDF je uz pravdepodobne dobre komprimovany. "
+        f"Pouzite originalny subor."
+    )
 
 
 def compress_pdf(
@@ -153,7 +1299,15 @@ def compress_pdf(
     output_path: str,
     dpi: int = 100,
     jpeg_quality: int = 75,
-    progress_callback: Optional[callable] = None
+    progress_callback: Optional[callable] = None,
+    stream_chunk_pages: int = STREAM_CHUNK_PAGES,
+    page_workers: int = PAGE_WORKERS,
+    memory_limit_mb: int = IN_MEMORY_LIMIT_MB,
+    target_size_mb: Optional[float] = None,
+    min_ssim: Optional[float] = None,
+    engine: str = RENDER_ENGINE,
+    stats: Optional[dict] = None,
+    profile: bool = False
 ) -> tuple[bool, str]:
     """
     Komprimuje jeden PDF súbor.
@@ -164,10 +1318,36 @@ def compress_pdf(
         dpi: Výstupné DPI (100-200, alebo 0 pre auto)
         jpeg_quality: Kvalita JPEG kompresie (1-100, alebo 0 pre auto)
         progress_callback: Funkcia na volanie s pokrokom (file_name, progress)
+        stream_chunk_pages: Počet stránok renderovaných naraz (0 = celý dokument)
+        page_workers: Počet paralelne spracovaných rozsahov stránok
+        memory_limit_mb: Limit pamäte pre zakódované stránky, nad limit sa použije disk
+        target_size_mb: Cieľová veľkosť výstupu (MB) - DPI/kvalita v auto režime
+            sa zvolia podľa vzorových strán
+        min_ssim: Minimálna podobnosť (SSIM 0-1) vzorových strán s originálom -
+            zvolí sa najmenší výstup, ktorý ju dosiahne
+        engine: Spôsob renderovania - ENGINE_PIL alebo ENGINE_PDFTOPPM (JPEG priamo z pdftoppm)
+        stats: Voliteľný dict, do ktorého sa zapíše trvanie fáz a počítadlá
+            (CompressionStats.as_dict()) - aj pri neúspechu
+        profile: Spustiť pod cProfile a tracemalloc, profil sa uloží vedľa
+            výstupu (job_profiler.profile_paths) - aj pri neúspechu
     
     Returns:
         Tuple (success: bool, message: str)
     """
+    if profile:
+        # cProfile vidí len volajúce vlákno - rozsahy strán sa spracujú postupne
+        return run_profiled(
+            compress_pdf, output_path, input_path, output_path,
+            dpi=dpi, jpeg_quality=jpeg_quality, progress_callback=progress_callback,
+            stream_chunk_pages=stream_chunk_pages, page_workers=1, memory_limit_mb=memory_limit_mb,
+            target_size_mb=target_size_mb, min_ssim=min_ssim, engine=engine,
+            stats=stats if stats is not None else {}
+        )
+    
+    auto_dpi = dpi == 0
+    auto_quality = jpeg_quality == 0
+    job_stats = CompressionStats()
+    
     try:
         if progress_callback:
             progress_callback(os.path.basename(input_path), 0)
@@ -176,76 +1356,201 @@ def compress_pdf(
         if not os.path.exists(input_path):
             return False, f"Vstupný súbor neexistuje: {input_path}"
         
-        # Skúsime použiť lokálnu cestu k Poppler ak existuje
-        poppler_check = check_poppler_installed()
-        poppler_path = poppler_check[2] if len(poppler_check) > 2 else None
+        if engine not in RENDER_ENGINES:
+            return False, f"Neznámy spôsob renderovania: {engine} (možnosti: {', '.join(RENDER_ENGINES)})"
+        
+        # Skúsime použiť lokálnu cestu k Poppler ak existuje (detekcia je uložená)
+        toolchain = get_toolchain()
+        poppler_path = toolchain['poppler_path']
+        page_dpi = None  # DPI jednotlivých strán (len v auto režime)
+        images = None  # Obrázky v PDF z pdfimages (zisťujú sa najviac raz)
         
         # AUTO režim - inteligentná kompresia
         if dpi == 0:  # 0 znamená auto
             if progress_callback:
                 progress_callback(os.path.basename(input_path), 5)
             
-            # Detekujeme originálne DPI
+            # Detekujeme originálne DPI každej strany z metadát obrázkov
+            target_dpi = 150  # Zvýšené pre lepšiu čitateľnosť (predtým 72)
             try:
-                original_dpi = get_pdf_dpi(input_path, poppler_path)
-                # Použijeme NIŽŠIE z dvoch hodnôt (nikdy nezvyšujeme DPI!)
-                target_dpi = 150  # Zvýšené pre lepšiu čitateľnosť (predtým 72)
-                dpi = min(original_dpi, target_dpi)
-                
-                # Minimálne 100 DPI pre čitateľnosť (predtým 50)
-                if dpi < 100:
-                    dpi = 100
-            except:
-                # Ak detekcia zlyhá, použijeme 150 DPI pre dobrú čitateľnosť
-                dpi = 150
+                images = list_pdf_images(input_path, poppler_path)
+                original_dpis = _page_dpis_from_images(images)
+            except Exception:
+                original_dpis = {}
+            
+            # Použijeme NIŽŠIE z dvoch hodnôt (nikdy nezvyšujeme DPI!),
+            # minimálne 100 DPI pre čitateľnosť (predtým 50)
+            page_dpi = {
+                page: max(min(original_dpi, target_dpi), 100)
+                for page, original_dpi in original_dpis.items()
+            }
+            
+            # Strany bez obrázkov alebo zlyhaná detekcia - 150 DPI pre dobrú čitateľnosť
+            dpi = 150
         
         # AUTO režim pre kvalitu
         if jpeg_quality == 0:  # 0 znamená auto
             jpeg_quality = 85  # Vyššia kvalita pre čitateľnosť (predtým 60)
         
-        # Konverzia PDF na obrázky
+        # Zistenie počtu stránok (bez renderovania)
         if progress_callback:
             progress_callback(os.path.basename(input_path), 10)
         
         try:
-            if poppler_path:
-                images = convert_from_path(input_path, dpi=dpi, poppler_path=poppler_path)
-            else:
-                images = convert_from_path(input_path, dpi=dpi)
+            total_pages = get_pdf_page_count(input_path, poppler_path)
         except Exception as e:
             error_msg = str(e)
-            poppler_check = check_poppler_installed()
-            if not poppler_check[0]:
-                return False, f"CHYBA: Poppler nie je nainštalovaný!\n\n{poppler_check[1]}\n\nPôvodná chyba: {error_msg}"
-            return False, f"Chyba pri konverzii PDF na obrázky: {error_msg}\n\n{poppler_check[1]}"
+            if not toolchain['poppler_installed']:
+                return False, f"CHYBA: Poppler nie je nainštalovaný!\n\n{toolchain['poppler_message']}\n\nPôvodná chyba: {error_msg}"
+            return False, f"Chyba pri konverzii PDF na obrázky: {error_msg}\n\n{toolchain['poppler_message']}"
         
-        if len(images) == 0:
+        if total_pages == 0:
             return False, f"PDF súbor neobsahuje žiadne stránky: {input_path}"
         
-        if progress_callback:
-            progress_callback(os.path.basename(input_path), 30)
+        input_size = os.path.getsize(input_path)
+        target_mode = target_size_mb is not None or min_ssim is not None
+        target_note = ""
         
-        # Vytvorenie dočasných JPEG súborov
-        temp_files = []
-        total_pages = len(images)
+        # Strany s už dobre komprimovaným JPEG sa prevezmú bez rekompresie.
+        # V cieľovom režime sa kódujú všetky strany (parametre platia pre celý dokument).
+        passthrough = {}
+        if JPEG_PASSTHROUGH and not target_mode:
+            try:
+                if images is None:
+                    images = list_pdf_images(input_path, poppler_path)
+                if any(image['enc'] == 'jpeg' for image in images):
+                    page_sizes = get_pdf_page_sizes(input_path, total_pages, poppler_path)
+                    passthrough = plan_passthrough_pages(images, page_sizes, dpi, page_dpi)
+                    # Text alebo kreslenie nad skenom by sa prevzatím stratilo
+                    image_only = image_only_pages(input_path, passthrough) if passthrough else set()
+                    passthrough = {page: image for page, image in passthrough.items() if page in image_only}
+            except Exception:
+                passthrough = {}
         
-        for i, image in enumerate(images):
-            # Konverzia na RGB ak je potrebné
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Vytvorenie dočasného JPEG súboru
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-            temp_file.close()
-            
-            # Priame uloženie s JPEG kompresiou
-            image.save(temp_file.name, 'JPEG', quality=jpeg_quality, optimize=True)
-            temp_files.append(temp_file.name)
+        # Odhad výsledku zo vzorových strán (kódovanie v pamäti) - v cieľovom
+        # režime sa podľa neho volia parametre
+        recompressed_pages = [page for page in range(1, total_pages + 1) if page not in passthrough]
+        passthrough_size = sum(image['size'] + PAGE_OVERHEAD_BYTES for image in passthrough.values())
+        job_stats.count('pages', total_pages)
+        job_stats.count('input_bytes', input_size)
+        job_stats.lap('analyze')
+        
+        if recompressed_pages and target_mode:
+            sample_pages = [
+                recompressed_pages[index - 1]
+                for index in _sample_page_numbers(len(recompressed_pages), TARGET_SAMPLE_PAGES)
+            ]
+            samples = _render_sample_pages(input_path, sample_pages, dpi, poppler_path, page_dpi)
+            try:
+                estimator = _SizeEstimator(samples, len(recompressed_pages))
+                choice = choose_target_parameters(
+                    estimator,
+                    TARGET_DPI_CAPS if auto_dpi else (dpi,),
+                    TARGET_QUALITIES if auto_quality else (jpeg_quality,),
+                    target_size_mb,
+                    min_ssim
+                )
+                if auto_dpi:
+                    dpi = min(dpi, choice['dpi_cap'])
+                    page_dpi = {page: min(value, choice['dpi_cap']) for page, value in page_dpi.items()}
+                jpeg_quality = choice['jpeg_quality']
+                estimate = choice['size']
+                target_note = (
+                    f" [Ciel: DPI max {choice['dpi_cap']}, kvalita {jpeg_quality}"
+                    + (f", SSIM {choice['ssim']:.3f}" if choice['ssim'] is not None else "")
+                    + ("" if choice['met'] else ", ciel nedosiahnutelny - najblizsie nastavenie")
+                    + "]"
+                )
+            finally:
+                for page_number, render_dpi, image in samples:
+                    image.close()
             
+            job_stats.lap('estimate')
+            if estimate > input_size * WOULD_GROW_MARGIN:
+                return False, _would_grow_message(input_size, estimate, estimated=True)
+        
+        # Streamovaná konverzia PDF na obrázky - každá stránka sa po zakódovaní
+        # do JPEG hneď uvoľní z pamäte. Pri page_workers > 1 sa dokument rozdelí
+        # na súvislé rozsahy stránok, ktoré sa spracujú paralelne.
+        page_store = _PageStore(memory_limit_mb * 1024 * 1024)
+        pages_done = [0]
+        progress_lock = threading.Lock()
+        
+        def on_page_done():
+            with progress_lock:
+                pages_done[0] += 1
+                done = pages_done[0]
             if progress_callback:
-                progress = 30 + int((i + 1) / total_pages * 50)
+                progress = 10 + int(done / total_pages * 70)
                 progress_callback(os.path.basename(input_path), progress)
         
+        page_ranges = _split_page_range(total_pages, page_workers)
+        skip_pages = set()
+        
+        try:
+            if passthrough:
+                for page_number, data in iter_jpeg_pages(input_path, passthrough, poppler_path):
+                    page_store.add(page_number, data, PAGE_PASSTHROUGH)
+                    skip_pages.add(page_number)
+                    on_page_done()
+                job_stats.lap('passthrough')
+            
+            # Pri dlhších dokumentoch s pevnými parametrami sa zväčšenie súboru
+            # predpovie zo vzorových strán. Zakódujú sa rovnako ako pri kompresii
+            # a zostanú v page_store, takže odhad nestojí renderovanie navyše.
+            if recompressed_pages and not target_mode and total_pages >= PREDICT_MIN_PAGES:
+                sample_pages = [
+                    recompressed_pages[index - 1]
+                    for index in _sample_page_numbers(len(recompressed_pages), TARGET_SAMPLE_PAGES)
+                ]
+                for page_number in sample_pages:
+                    _encode_page_range(
+                        input_path, dpi, jpeg_quality, page_number, page_number, poppler_path,
+                        1, page_store, on_page_done, page_dpi, None, engine, job_stats
+                    )
+                    skip_pages.add(page_number)
+                sample_size = sum(page_store.sizes[page_number] for page_number in sample_pages)
+                estimate = int(
+                    (sample_size / len(sample_pages) + PAGE_OVERHEAD_BYTES) * len(recompressed_pages)
+                ) + passthrough_size
+                job_stats.lap('estimate')
+                if estimate > input_size * WOULD_GROW_MARGIN:
+                    page_store.cleanup()
+                    return False, _would_grow_message(input_size, estimate, estimated=True)
+            
+            if len(page_ranges) == 1:
+                _encode_page_range(
+                    input_path, dpi, jpeg_quality, 1, total_pages, poppler_path,
+                    stream_chunk_pages, page_store, on_page_done, page_dpi, skip_pages, engine,
+                    job_stats
+                )
+            else:
+                # Vlákna stačia: pdftoppm beží ako samostatný proces a PIL
+                # uvoľňuje GIL počas dekódovania aj JPEG enkódovania
+                with ThreadPoolExecutor(max_workers=len(page_ranges)) as executor:
+                    futures = [
+                        executor.submit(
+                            _encode_page_range, input_path, dpi, jpeg_quality,
+                            first_page, last_page, poppler_path,
+                            stream_chunk_pages, page_store, on_page_done, page_dpi, skip_pages, engine,
+                            job_stats
+                        )
+                        for first_page, last_page in page_ranges
+                    ]
+                    for future in futures:
+                        future.result()
+        except Exception:
+            page_store.cleanup()
+            raise
+        
+        # Zoradenie stránok do pôvodného poradia
+        pages = page_store.ordered()
+        page_kinds = format_page_kinds(page_store.kind_counts())
+        job_stats.lap('pages')
+        for kind, count in page_store.kind_counts().items():
+            job_stats.count(f'pages_{kind}', count)
+        job_stats.count('temp_files', len(page_store.temp_files))
+        
         # Vytvorenie výstupného adresára ak neexistuje
         output_dir_path = os.path.dirname(output_path)
         if output_dir_path:
@@ -254,24 +1559,24 @@ def compress_pdf(
         if progress_callback:
             progress_callback(os.path.basename(input_path), 85)
         
-        # Konverzia JPEG súborov späť na PDF pomocou img2pdf
+        # Zloženie zakódovaných stránok (JPEG, G4 TIFF) do PDF pomocou img2pdf
         pdf_created = False
         
         try:
-            if IMG2PDF_AVAILABLE:
+            if toolchain['img2pdf_available']:
                 # Konverzia do PDF pomocou img2pdf
                 try:
-                    pdf_bytes = img2pdf.convert(temp_files)
+                    # Zápis priamo do výstupného súboru (bez medzikroku v pamäti)
                     with open(output_path, 'wb') as f:
-                        f.write(pdf_bytes)
+                        img2pdf.convert(pages, outputstream=f)
                     pdf_created = True
                 except Exception as e:
                     raise Exception(f"Chyba pri konverzii do PDF pomocou img2pdf: {str(e)}")
             else:
                 # Fallback na PIL Image.save() ak img2pdf nie je dostupný
                 try:
-                    # Načítanie JPEG súborov späť ako obrázky
-                    pil_images = [Image.open(f) for f in temp_files]
+                    # Načítanie JPEG stránok ako obrázky
+                    pil_images = [page_store.open_image(page) for page in pages]
                     
                     if len(pil_images) == 1:
                         pil_images[0].save(
@@ -305,14 +1610,10 @@ def compress_pdf(
             raise e
         
         finally:
-            # Vymazanie dočasných JPEG súborov
-            for temp_file in temp_files:
-                try:
-                    if os.path.exists(temp_file):
-                        os.unlink(temp_file)
-                except Exception:
-                    pass
+            # Uvoľnenie stránok z pamäte a vymazanie dočasných súborov stránok
+            page_store.cleanup()
         
+        job_stats.lap('assemble')
         if not pdf_created:
             return False, "PDF súbor sa nepodarilo vytvoriť"
         
@@ -325,36 +1626,98 @@ def compress_pdf(
         
         # Kontrola veľkosti súboru
         output_size = os.path.getsize(output_path)
+        job_stats.count('output_bytes', output_size)
         if output_size == 0:
             return False, f"Výstupný súbor je prázdny: {output_path}"
         
-        original_size = os.path.getsize(input_path) / (1024 * 1024)  # MB
+        original_size = input_size / (1024 * 1024)  # MB
         compressed_size = output_size / (1024 * 1024)  # MB
         
         # OCHRANA: Ak je komprimovaný súbor väčší ako originál, vrátime chybu
-        if output_size > os.path.getsize(input_path):
+        if output_size > input_size:
             # Vymazanie zbytočne veľkého výstupného súboru
             try:
                 os.unlink(output_path)
             except:
                 pass
             
-            return False, (
-                f"[UPOZORNENIE] Kompresia by zvacsila subor! "
-                f"Original: {original_size:.2f} MB, "
-                f"Po kompresii: {compressed_size:.2f} MB. "
-                f"Tento PDF je uz pravdepodobne dobre komprimovany. "
-                f"Pouzite originalny subor."
-            )
+            return False, _would_grow_message(input_size, output_size)
         
         compression_ratio = (1 - compressed_size / original_size) * 100
         
-        return True, f"Uspesne komprimovane: {original_size:.2f} MB -> {compressed_size:.2f} MB ({compression_ratio:.1f}% zmensenie)"
+        return True, f"Uspesne komprimovane: {original_size:.2f} MB -> {compressed_size:.2f} MB ({compression_ratio:.1f}% zmensenie) [Strany: {page_kinds}]{target_note}"
+    
+    except PDFPopplerTimeoutError:
+        # pdf2image pdftoppm už ukončil
+        return False, f"Renderovanie strany trvalo dlhšie ako {PAGE_TIMEOUT} s (PAGE_TIMEOUT) - PDF je pravdepodobne poškodené"
     
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
         return False, f"Chyba pri kompresii: {str(e)}\nDetaily: {error_details}"
+    
+    finally:
+        if stats is not None:
+            stats.update(job_stats.as_dict())
+
+
+def _compress_directory_file(
+    input_file: str,
+    output_file: str,
+    dpi: int,
+    jpeg_quality: int,
+    progress_callback: Optional[callable] = None,
+    compute_hash: bool = False,
+    target_size_mb: Optional[float] = None,
+    min_ssim: Optional[float] = None,
+    profile: bool = False,
+    engine: str = RENDER_ENGINE
+) -> dict:
+    """
+    Komprimuje jeden súbor pre compress_directory (spustiteľné aj vo worker procese).
+    
+    Args:
+        compute_hash: Vypočítať SHA-256 vstupu pre manifest inkrementálneho režimu
+        target_size_mb: Cieľová veľkosť výstupu (pozri compress_pdf)
+        min_ssim: Minimálna SSIM vzorových strán (pozri compress_pdf)
+        profile: Uložiť profil kompresie vedľa výstupu (pozri compress_pdf)
+        engine: Spôsob renderovania (pozri compress_pdf)
+    
+    Returns:
+        Dict {'file': str, 'success': bool, 'message': str, 'exception': bool, 'sha256': str}
+    """
+    file_name = os.path.basename(input_file)
+    sha256 = None
+    
+    try:
+        if compute_hash:
+            sha256 = file_sha256(input_file)
+        
+        success, message = compress_pdf(
+            input_file,
+            output_file,
+            dpi=dpi,
+            jpeg_quality=jpeg_quality,
+            progress_callback=progress_callback,
+            target_size_mb=target_size_mb,
+            min_ssim=min_ssim,
+            profile=profile,
+            engine=engine
+        )
+        
+        # Kontrola, či sa súbor skutočne vytvoril
+        if success and not os.path.exists(output_file):
+            success = False
+            message = f"CHYBA: Výstupný súbor sa nevytvoril: {output_file}"
+        
+        return {'file': file_name, 'success': success, 'message': message, 'exception': False,
+                'sha256': sha256}
+    
+    except Exception as e:
+        import traceback
+        error_msg = f"Výnimka pri spracovaní {file_name}: {str(e)}\n{traceback.format_exc()}"
+        return {'file': file_name, 'success': False, 'message': error_msg, 'exception': True,
+                'sha256': sha256}
 
 
 def compress_directory(
@@ -363,7 +1726,13 @@ def compress_directory(
     dpi: int = 150,
     jpeg_quality: int = 85,
     progress_callback: Optional[callable] = None,
-    log_callback: Optional[callable] = None
+    log_callback: Optional[callable] = None,
+    workers: int = 1,
+    incremental: bool = False,
+    target_size_mb: Optional[float] = None,
+    min_ssim: Optional[float] = None,
+    profile: bool = False,
+    engine: str = RENDER_ENGINE
 ) -> dict:
     """
     Komprimuje všetky PDF súbory v adresári.
@@ -375,9 +1744,16 @@ def compress_directory(
         jpeg_quality: Kvalita JPEG kompresie
         progress_callback: Funkcia na volanie s pokrokom (file_name, progress)
         log_callback: Funkcia na volanie s log správami
+        workers: Počet paralelných procesov (1 = sériové spracovanie)
+        incremental: Preskočiť súbory spracované v predchádzajúcom behu
+            (podľa manifestu vo výstupnom adresári)
+        target_size_mb: Cieľová veľkosť každého výstupného súboru (MB)
+        min_ssim: Minimálna SSIM vzorových strán každého súboru
+        profile: Uložiť profil kompresie každého súboru vedľa výstupu
+        engine: Spôsob renderovania (ENGINE_PIL alebo ENGINE_PDFTOPPM)
     
     Returns:
-        Dict so štatistikami: {'success': int, 'failed': int, 'files': list}
+        Dict so štatistikami: {'success': int, 'failed': int, 'files': list, 'skipped': int}
     """
     input_path = Path(input_dir)
     
@@ -386,24 +1762,40 @@ def compress_directory(
             log_callback(f"Adresár neexistuje: {input_dir}")
         return {'success': 0, 'failed': 0, 'files': []}
     
+    # Výstupný adresár
+    if output_dir is None:
+        output_path = input_path / 'compressed'
+    else:
+        output_path = Path(output_dir)
+    
     # Nájdenie všetkých PDF súborov (rekurzívne aj v podadresároch)
     pdf_files = list(input_path.rglob('*.pdf')) + list(input_path.rglob('*.PDF'))
     
     # Odstránenie duplikátov (ak existujú)
     pdf_files = list(set(pdf_files))
     
-    # Kontrola Poppler na začiatku
-    poppler_check = check_poppler_installed()
-    poppler_installed = poppler_check[0]
-    poppler_message = poppler_check[1]
-    poppler_path = poppler_check[2] if len(poppler_check) > 2 else None
+    # Výstupy predchádzajúceho behu (napr. input/compressed) nie sú vstupy -
+    # komprimovali by sa samé do seba
+    resolved_output = output_path.resolve()
+    pdf_files = [
+        pdf_file for pdf_file in pdf_files
+        if resolved_output not in pdf_file.resolve().parents
+    ]
+    
+    # Kontrola Poppler na začiatku (nová detekcia - používateľ mohol medzitým
+    # Poppler doinštalovať, výsledok sa uloží pre všetky súbory)
+    toolchain = get_toolchain(refresh=True)
+    poppler_installed = toolchain['poppler_installed']
+    poppler_message = toolchain['poppler_message']
+    poppler_path = toolchain['poppler_path']
+    poppler_version = f" {toolchain['poppler_version']}" if toolchain['poppler_version'] else ""
     
     if log_callback:
         if poppler_installed:
             if poppler_path:
-                log_callback(f"[OK] Poppler je nainstalovany (lokalne): {poppler_path}")
+                log_callback(f"[OK] Poppler{poppler_version} je nainstalovany (lokalne): {poppler_path}")
             else:
-                log_callback("[OK] Poppler je nainstalovany (v PATH)")
+                log_callback(f"[OK] Poppler{poppler_version} je nainstalovany (v PATH)")
         else:
             log_callback("[CHYBA] KRITICKA CHYBA: Poppler nie je nainstalovany!")
             log_callback("=" * 60)
@@ -421,7 +1813,7 @@ def compress_directory(
             log_callback(f"  ... a dalsich {len(pdf_files) - 10} suborov")
         
         # Informácia o img2pdf
-        if IMG2PDF_AVAILABLE:
+        if toolchain['img2pdf_available']:
             log_callback(f"[OK] img2pdf je dostupny - pouzije sa pre lepsiu kompresiu")
         else:
             log_callback(f"[UPOZORNENIE] img2pdf nie je nainstalovany!")
@@ -434,73 +1826,154 @@ def compress_directory(
             log_callback(f"Skontrolujte, či sú PDF súbory prítomné v adresári.")
         return {'success': 0, 'failed': 0, 'files': []}
     
-    # Výstupný adresár
-    if output_dir is None:
-        output_path = input_path / 'compressed'
-    else:
-        output_path = Path(output_dir)
-    
     output_path.mkdir(parents=True, exist_ok=True)
     
     if log_callback:
         log_callback(f"Výstupný adresár: {output_path.absolute()}")
     
-    results = {'success': 0, 'failed': 0, 'files': []}
+    results = {'success': 0, 'failed': 0, 'files': [], 'skipped': 0}
+    
+    # Zachovanie podadresárov a názvov súborov vo výstupnom adresári
+    # (a/x.pdf a b/x.pdf nesmú zapisovať do toho istého výstupu)
+    tasks = [
+        (pdf_file, output_path / pdf_file.relative_to(input_path))
+        for pdf_file in pdf_files
+    ]
+    for pdf_file, output_file in tasks:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
     
-    # Spracovanie každého súboru
-    for i, pdf_file in enumerate(pdf_files):
-        # Zachovanie štruktúry adresárov ak sú PDF súbory v podadresároch
-        relative_path = pdf_file.relative_to(input_path)
-        output_file = output_path / relative_path.name
+    # Inkrementálny režim - nezmenené súbory z predchádzajúceho behu preskočíme
+    manifest = None
+    if incremental:
+        # Rovnaké nastavenia ako v kľúči cache výsledkov - po zmene renderovania,
+        # prevzatia JPEG alebo klasifikácie sa súbory (aj 'would_grow') skúsia znova
+        params = dict(output_settings(), dpi=dpi, jpeg_quality=jpeg_quality, render_engine=engine)
+        if target_size_mb is not None:
+            params['target_size_mb'] = target_size_mb
+        if min_ssim is not None:
+            params['min_ssim'] = min_ssim
+        manifest = BatchManifest(output_path, params)
+        pending = []
+        for pdf_file, output_file in tasks:
+            if manifest.lookup(pdf_file.relative_to(input_path).as_posix(), pdf_file, output_file):
+                results['skipped'] += 1
+            else:
+                pending.append((pdf_file, output_file))
+        tasks = pending
         
         if log_callback:
-            log_callback(f"\n[{i+1}/{len(pdf_files)}] Spracovávam: {pdf_file.name}")
-            log_callback(f"  Vstup: {pdf_file}")
-            log_callback(f"  Výstup: {output_file}")
+            log_callback(f"Inkrementalny rezim: {results['skipped']} suborov bez zmeny preskocenych, "
+                         f"{len(tasks)} na spracovanie")
+    
+    tasks = [(i, pdf_file, output_file) for i, (pdf_file, output_file) in enumerate(tasks)]
+    total_files = len(tasks)
+    start_time = time.monotonic()
+    
+    def log_header(i, pdf_file, output_file):
+        """Vypíše hlavičku súboru označenú poradovým číslom"""
+        if log_callback:
+            tag = f"[{i+1}/{total_files}]"
+            log_callback(f"\n{tag} Spracovávam: {pdf_file.name}")
+            log_callback(f"{tag}   Vstup: {pdf_file}")
+            log_callback(f"{tag}   Výstup: {output_file}")
+    
+    def collect(i, pdf_file, output_file, entry, done_count):
+        """Započíta výsledok súboru, zapíše ho do manifestu a vypíše do logu"""
+        is_exception = entry.pop('exception', False)
+        sha256 = entry.pop('sha256', None)
+        if entry['success']:
+            results['success'] += 1
+        else:
+            results['failed'] += 1
+        results['files'].append(entry)
         
-        try:
-            success, message = compress_pdf(
-                str(pdf_file),
-                str(output_file),
-                dpi=dpi,
-                jpeg_quality=jpeg_quality,
-                progress_callback=progress_callback
-            )
-            
-            if success:
-                results['success'] += 1
-                # Kontrola, či sa súbor skutočne vytvoril
-                if not os.path.exists(output_file):
-                    success = False
-                    message = f"CHYBA: Výstupný súbor sa nevytvoril: {output_file}"
-                    results['success'] -= 1
-                    results['failed'] += 1
+        if manifest:
+            if entry['success']:
+                status = STATUS_COMPRESSED
+            elif entry['message'].startswith(WOULD_GROW_MESSAGE):
+                # Už dobre komprimovaný súbor - nabudúce ho neskúšame znova
+                status = STATUS_WOULD_GROW
             else:
-                results['failed'] += 1
-            
-            results['files'].append({
-                'file': pdf_file.name,
-                'success': success,
-                'message': message
-            })
+                status = STATUS_FAILED
+            try:
+                manifest.record(pdf_file.relative_to(input_path).as_posix(), pdf_file, sha256,
+                                status, entry['message'],
+                                output_file.relative_to(output_path).as_posix())
+            except OSError as e:
+                if log_callback:
+                    log_callback(f"[UPOZORNENIE] Zapis do manifestu zlyhal: {e}")
+        
+        if log_callback:
+            tag = f"[{i+1}/{total_files}]"
+            if is_exception:
+                log_callback(f"{tag} [VYNIMKA] {entry['message']}")
+            elif entry['success']:
+                log_callback(f"{tag} [OK] {entry['message']}")
+            else:
+                log_callback(f"{tag} [CHYBA] {entry['message']}")
             
-            if log_callback:
-                if success:
-                    log_callback(f"[OK] {message}")
-                else:
-                    log_callback(f"[CHYBA] {message}")
+            # Priebežná priepustnosť a odhad zostávajúceho času
+            if workers > 1:
+                elapsed = time.monotonic() - start_time
+                per_minute = done_count / elapsed * 60 if elapsed > 0 else 0
+                remaining = total_files - done_count
+                if per_minute > 0 and remaining > 0:
+                    log_callback(
+                        f"{tag} Priepustnost: {per_minute:.1f} suborov/min, "
+                        f"zostava priblizne {remaining / per_minute:.1f} min"
+                    )
+    
+    if workers <= 1:
+        # Sériové spracovanie - progress_callback dostáva priebežný pokrok
+        try:
+            for i, pdf_file, output_file in tasks:
+                log_header(i, pdf_file, output_file)
+                entry = _compress_directory_file(
+                    str(pdf_file), str(output_file), dpi, jpeg_quality, progress_callback,
+                    incremental, target_size_mb, min_ssim, profile, engine
+                )
+                collect(i, pdf_file, output_file, entry, i + 1)
+        finally:
+            if manifest:
+                manifest.close()
+        return results
+    
+    # Paralelné spracovanie v pool-e procesov - progress_callback sa volá
+    # v hlavnom procese až po dokončení každého súboru (100 %)
+    if log_callback:
+        log_callback(f"Paralelna kompresia: {workers} procesov")
+    
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    _compress_directory_file, str(pdf_file), str(output_file), dpi, jpeg_quality,
+                    None, incremental, target_size_mb, min_ssim, profile, engine
+                ): (i, pdf_file, output_file)
+                for i, pdf_file, output_file in tasks
+            }
         
-        except Exception as e:
-            import traceback
-            error_msg = f"Výnimka pri spracovaní {pdf_file.name}: {str(e)}\n{traceback.format_exc()}"
-            results['failed'] += 1
-            results['files'].append({
-                'file': pdf_file.name,
-                'success': False,
-                'message': error_msg
-            })
-            if log_callback:
-                log_callback(f"[VYNIMKA] {error_msg}")
+            for done_count, future in enumerate(as_completed(futures), start=1):
+                i, pdf_file, output_file = futures[future]
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    # Pád worker procesu (napr. nedostatok pamäte)
+                    entry = {
+                        'file': pdf_file.name,
+                        'success': False,
+                        'message': f"Výnimka pri spracovaní {pdf_file.name}: {str(e)}",
+                        'exception': True
+                    }
+            
+                if progress_callback:
+                    progress_callback(pdf_file.name, 100)
+                # Celý log súboru sa vypíše naraz, aby sa výstupy workerov nepremiešali
+                log_header(i, pdf_file, output_file)
+                collect(i, pdf_file, output_file, entry, done_count)
+    finally:
+        if manifest:
+            manifest.close()
     
     return results
 
@@ -0,0 +1,181 @@
+"""
+PDF Kompresor - Cache výsledkov kompresie (adresovaná obsahom)
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional
+
+# Maximálna veľkosť cache (MB) a vek položiek (hodiny)
+CACHE_MAX_SIZE_MB = int(os.environ.get('CACHE_MAX_SIZE_MB', 2048))
+CACHE_MAX_AGE_HOURS = int(os.environ.get('CACHE_MAX_AGE', os.environ.get('CLEANUP_AGE', 24)))
+
+
+def cache_key(content_hash: str, dpi: int, jpeg_quality: int, settings: dict) -> str:
+    """
+    Kľúč cache z hashu vstupných bajtov a efektívnych parametrov kompresie.
+
+    Args:
+        content_hash: SHA-256 hex digest vstupného PDF
+        dpi: DPI (0 = auto)
+        jpeg_quality: JPEG kvalita (0 = auto)
+        settings: Nastavenia meniace výstup (pdf_compressor.output_settings())
+
+    Returns:
+        SHA-256 hex digest
+    """
+    raw = f"{content_hash}:{dpi}:{jpeg_quality}:{json.dumps(settings, sort_keys=True)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Cache skomprimovaných PDF na disku.
+
+    Každá položka je dvojica `<key>.pdf` + `<key>.json` (správa z compress_pdf).
+    Čas poslednej zmeny súboru slúži ako čas posledného použitia pre LRU
+    vyraďovanie podľa veľkosti.
+    """
+
+    def __init__(self, directory: Path, max_size_mb: int = CACHE_MAX_SIZE_MB,
+                 max_age_hours: int = CACHE_MAX_AGE_HOURS):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size_mb * 1024 * 1024
+        self.max_age = max_age_hours * 60 * 60
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _paths(self, key: str):
+        return self.directory / f"{key}.pdf", self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Vyhľadá výsledok v cache.
+
+        Returns:
+            Dict {'path': Path, 'message': str} alebo None
+        """
+        pdf_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            # Obnovenie času použitia pre LRU
+            now = time.time()
+            os.utime(pdf_path, (now, now))
+            os.utime(meta_path, (now, now))
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return {'path': pdf_path, 'message': meta.get('message', '')}
+
+    def put(self, key: str, output_path: Path, message: str) -> None:
+        """Uloží skomprimovaný PDF do cache (hardlink, inak kópia)"""
+        pdf_path, meta_path = self._paths(key)
+        tmp_path = pdf_path.with_suffix(f'.{threading.get_ident()}.tmp')
+        try:
+            try:
+                os.link(output_path, tmp_path)
+            except OSError:
+                shutil.copyfile(output_path, tmp_path)
+            os.replace(tmp_path, pdf_path)
+
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'message': message, 'created': time.time()}, f)
+        except OSError as e:
+            print(f"Chyba pri ukladaní do cache {key}: {e}")
+            for path in (tmp_path, pdf_path, meta_path):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            return
+
+        with self._lock:
+            self.stores += 1
+
+    def copy_to(self, cached_path: Path, output_path: Path) -> None:
+        """Skopíruje výsledok z cache na výstupnú cestu (hardlink, inak kópia)"""
+        try:
+            os.link(cached_path, output_path)
+        except OSError:
+            shutil.copyfile(cached_path, output_path)
+
+    def _remove(self, key: str) -> None:
+        for path in self._paths(key):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        with self._lock:
+            self.evictions += 1
+
+    def evict(self) -> None:
+        """Vyradí položky staršie ako max_age a najdlhšie nepoužité nad max_size"""
+        entries = []
+        for pdf_path in self.directory.glob('*.pdf'):
+            try:
+                stat = pdf_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, pdf_path.stem))
+
+        cutoff = time.time() - self.max_age
+        total_size = 0
+        kept = []
+        for mtime, size, key in entries:
+            if mtime < cutoff:
+                self._remove(key)
+            else:
+                kept.append((mtime, size, key))
+                total_size += size
+
+        # Najstaršie použitie ide von ako prvé
+        kept.sort()
+        for mtime, size, key in kept:
+            if total_size <= self.max_size:
+                break
+            self._remove(key)
+            total_size -= size
+
+        # Osirelé metadáta a nedokončené dočasné súbory
+        for path in list(self.directory.glob('*.json')) + list(self.directory.glob('*.tmp')):
+            try:
+                if path.suffix == '.json' and path.with_suffix('.pdf').exists():
+                    continue
+                if path.stat().st_mtime < time.time() - 60 * 60:
+                    path.unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Počítadlá zásahov/neúspechov a aktuálna veľkosť cache"""
+        size = 0
+        entries = 0
+        for pdf_path in self.directory.glob('*.pdf'):
+            try:
+                size += pdf_path.stat().st_size
+                entries += 1
+            except OSError:
+                pass
+
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'entries': entries,
+                'size_mb': round(size / (1024 * 1024), 2)
+            }
@@ -3,6 +3,9 @@
 let currentBatchId = null;
 let currentJobIds = [];
 let selectedFiles = [];
+let uploadFailures = [];  // súbory, ktoré sa nepodarilo nahrať
+let batchCancelled = false;  // používateľ zrušil batch
+let uploadController = null;  // AbortController práve nahrávaného súboru
 
 // DOM elementy
 const uploadArea = document.getElementById('uploadArea');
@@ -15,6 +18,7 @@ const dpiRange = document.getElementById('dpiRange');
 const qualityRange = document.getElementById('qualityRange');
 const dpiValue = document.getElementById('dpiValue');
 const qualityValue = document.getElementById('qualityValue');
+const cancelBatchButton = document.getElementById('cancelBatchButton');
 
 // Auto režim handling
 autoMode.addEventListener('change', (e) => {
@@ -111,7 +115,11 @@ function handleFileSelect(files) {
     uploadFiles(files);
 }
 
-// Upload súborov
+// Počet pokusov o nahratie jedného súboru
+const UPLOAD_ATTEMPTS = 3;
+
+// Upload súborov - každý súbor ide samostatným requestom do spoločného batchu,
+// takže server komprimuje prvé súbory, kým sa ďalšie ešte nahrávajú
 async function uploadFiles(files) {
     // Skryť upload sekciu, zobraziť progress
     uploadArea.style.display = 'none';
@@ -119,35 +127,36 @@ async function uploadFiles(files) {
     progressSection.style.display = 'block';
     resultSection.style.display = 'none';
     errorSection.style.display = 'none';
+    batchCancelled = false;
+    cancelBatchButton.disabled = false;
     
-    // Pripravenie FormData
-    const formData = new FormData();
-    
-    // Pridanie všetkých súborov
-    for (const file of files) {
-        formData.append('files', file);
-    }
+    // Pripravenie FormData pre batch
+    const batchData = new FormData();
+    batchData.append('total_files', files.length);
     
     // Ak je zapnutý auto režim, pošleme 0 (čo backend rozpozná ako auto)
     if (autoMode.checked) {
-        formData.append('dpi', '0');
-        formData.append('quality', '0');
+        batchData.append('dpi', '0');
+        batchData.append('quality', '0');
     } else {
-        formData.append('dpi', dpiRange.value);
-        formData.append('quality', qualityRange.value);
+        batchData.append('dpi', dpiRange.value);
+        batchData.append('quality', qualityRange.value);
     }
     
     // Vytvorenie progress UI pre každý súbor
     const filesList = document.getElementById('filesList');
     filesList.innerHTML = '';
+    uploadFailures = [];
     
+    const fileItems = [];
     for (const file of files) {
         const fileItem = document.createElement('div');
         fileItem.className = 'file-item';
         fileItem.innerHTML = `
             <div class="file-info">
                 <span class="file-name">${file.name}</span>
-                <span class="file-status">Čaká sa...</span>
+                <span class="file-status">Čaká na nahratie...</span>
+                <button class="btn-cancel" title="Zrušiť kompresiu súboru" onclick="cancelFile(this)" hidden>✕</button>
             </div>
             <div class="progress-bar">
                 <div class="progress-fill" style="width: 0%"></div>
@@ -155,13 +164,14 @@ async function uploadFiles(files) {
             <div class="progress-text">0%</div>
         `;
         filesList.appendChild(fileItem);
+        fileItems.push(fileItem);
     }
     
     try {
-        // Upload request
-        const response = await fetch('/upload', {
+        // Vytvorenie batchu
+        const response = await fetch('/batch', {
             method: 'POST',
-            body: formData
+            body: batchData
         });
         
         if (!response.ok) {
@@ -171,17 +181,169 @@ async function uploadFiles(files) {
         
         const data = await response.json();
         currentBatchId = data.batch_id;
-        currentJobIds = data.job_ids;
+        currentJobIds = [];
         
-        // Sledovanie pokroku
-        pollBatchProgress();
+        // Sledovanie pokroku (SSE, pri chybe polling) beží už počas uploadu
+        watchBatchProgress();
+        
+        // Postupný upload - zlyhaný súbor neruší ostatné
+        const batchId = currentBatchId;
+        for (let i = 0; i < files.length; i++) {
+            if (batchId !== currentBatchId) return;
+            await uploadBatchFile(batchId, files[i], fileItems[i]);
+        }
+        
+        // Zrušený batch server uzavrel sám
+        if (batchCancelled) return;
+        
+        // Uzavretie batchu - súbory, ktoré sa nenahrali, sa nečakajú
+        await fetch(`/batch/${batchId}/close`, { method: 'POST' });
+        
+        if (currentJobIds.length === 0) {
+            throw new Error(uploadFailures.map(f => `${f.filename}: ${f.error}`).join('\n')
+                || 'Chyba pri nahrávaní súborov');
+        }
         
     } catch (error) {
         showError(error.message);
     }
 }
 
-// Sledovanie pokroku batch kompresie
+// Upload jedného súboru do batchu (s opakovaním pri výpadku spojenia alebo preťažení)
+async function uploadBatchFile(batchId, file, fileItem) {
+    const statusSpan = fileItem.querySelector('.file-status');
+    let lastError = 'Chyba pri nahrávaní súboru';
+    
+    for (let attempt = 1; attempt <= UPLOAD_ATTEMPTS; attempt++) {
+        if (batchCancelled) {
+            lastError = 'Nahrávanie zrušené';
+            break;
+        }
+        
+        statusSpan.textContent = attempt > 1
+            ? `Nahráva sa... (pokus ${attempt})`
+            : 'Nahráva sa...';
+        statusSpan.className = 'file-status status-pending';
+        
+        const formData = new FormData();
+        formData.append('file', file);
+        
+        let response;
+        uploadController = new AbortController();
+        try {
+            response = await fetch(`/batch/${batchId}/files`, {
+                method: 'POST',
+                body: formData,
+                signal: uploadController.signal
+            });
+        } catch (error) {
+            if (batchCancelled) continue;
+            // Sieťová chyba - súbor skúsime poslať znova
+            lastError = error.message;
+            await sleep(1000 * attempt);
+            continue;
+        }
+        
+        const data = await response.json().catch(() => ({}));
+        
+        if (response.ok) {
+            fileItem.dataset.jobId = data.job_id;
+            fileItem.querySelector('.btn-cancel').hidden = false;
+            currentJobIds.push(data.job_id);
+            return true;
+        }
+        
+        lastError = data.error || lastError;
+        
+        // Preťažený server - počkáme podľa Retry-After, ostatné chyby sa neopakujú
+        if (response.status !== 503) break;
+        const retryAfter = parseInt(response.headers.get('Retry-After') || '5', 10);
+        await sleep(Math.min(retryAfter, 30) * 1000);
+    }
+    
+    uploadFailures.push({ filename: file.name, error: lastError });
+    statusSpan.textContent = batchCancelled ? '⊘ Zrušené' : '✗ Chyba pri nahrávaní';
+    statusSpan.className = 'file-status status-error';
+    return false;
+}
+
+// Zrušenie celého batchu - nenahraté súbory sa už nepošlú, server zastaví
+// rozpracované kompresie a výsledok príde cez sledovanie pokroku
+async function cancelBatch() {
+    if (!currentBatchId || batchCancelled) return;
+    
+    batchCancelled = true;
+    cancelBatchButton.disabled = true;
+    if (uploadController) {
+        uploadController.abort();
+    }
+    
+    try {
+        const response = await fetch(`/batch/${currentBatchId}`, { method: 'DELETE' });
+        if (!response.ok) {
+            const error = await response.json().catch(() => ({}));
+            throw new Error(error.error || 'Chyba pri rušení kompresie');
+        }
+    } catch (error) {
+        showError(error.message);
+    }
+}
+
+// Zrušenie kompresie jedného súboru
+async function cancelFile(button) {
+    const jobId = button.closest('.file-item').dataset.jobId;
+    if (!jobId) return;
+    
+    button.disabled = true;
+    const response = await fetch(`/job/${jobId}`, { method: 'DELETE' }).catch(() => null);
+    // 409 - súbor sa medzitým dokončil, tlačidlo skryje ďalšia aktualizácia stavu
+    if (!response || (!response.ok && response.status !== 409)) {
+        button.disabled = false;
+    }
+}
+
+function sleep(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+// Sledovanie pokroku cez Server-Sent Events, polling ako záloha
+function watchBatchProgress() {
+    if (!currentBatchId) return;
+    
+    if (!window.EventSource) {
+        pollBatchProgress();
+        return;
+    }
+    
+    const batchId = currentBatchId;
+    const source = new EventSource(`/batch_events/${batchId}`);
+    let finished = false;
+    
+    source.onmessage = (event) => {
+        if (batchId !== currentBatchId) {
+            source.close();
+            return;
+        }
+        
+        const data = JSON.parse(event.data);
+        if (renderBatchProgress(data)) {
+            finished = true;
+            source.close();
+            showBatchResults(data);
+        }
+    };
+    
+    source.onerror = () => {
+        // Spojenie zlyhalo (proxy nepodporuje SSE, server má plný limit
+        // streamov - HTTP 503) - prechod na polling
+        source.close();
+        if (!finished && batchId === currentBatchId) {
+            pollBatchProgress();
+        }
+    };
+}
+
+// Sledovanie pokroku batch kompresie (polling)
 async function pollBatchProgress() {
     if (!currentBatchId) return;
     
@@ -194,51 +356,8 @@ async function pollBatchProgress() {
         
         const data = await response.json();
         
-        // Update batch summary
-        const completed = data.completed + data.failed;
-        const total = data.total_files;
-        document.getElementById('batchProgress').textContent = `${completed} / ${total} súborov dokončených`;
-        
-        // Update individual file progress
-        const filesList = document.getElementById('filesList');
-        const fileItems = filesList.querySelectorAll('.file-item');
-        
-        let index = 0;
-        for (const jobId in data.files) {
-            const fileData = data.files[jobId];
-            const fileItem = fileItems[index];
-            
-            if (fileItem) {
-                const statusSpan = fileItem.querySelector('.file-status');
-                const progressFill = fileItem.querySelector('.progress-fill');
-                const progressText = fileItem.querySelector('.progress-text');
-                
-                // Update status text
-                if (fileData.status === 'pending') {
-                    statusSpan.textContent = 'Čaká sa...';
-                    statusSpan.className = 'file-status status-pending';
-                } else if (fileData.status === 'processing') {
-                    statusSpan.textContent = 'Spracováva sa...';
-                    statusSpan.className = 'file-status status-processing';
-                } else if (fileData.status === 'completed') {
-                    statusSpan.textContent = '✓ Hotovo';
-                    statusSpan.className = 'file-status status-completed';
-                } else if (fileData.status === 'error') {
-                    statusSpan.textContent = '✗ Chyba';
-                    statusSpan.className = 'file-status status-error';
-                }
-                
-                // Update progress bar
-                const progress = Math.round(fileData.progress);
-                progressFill.style.width = `${progress}%`;
-                progressText.textContent = `${progress}%`;
-            }
-            
-            index++;
-        }
-        
         // Check if all files are done
-        if (completed >= total) {
+        if (renderBatchProgress(data)) {
             // Všetky súbory dokončené
             showBatchResults(data);
         } else {
@@ -251,15 +370,66 @@ async function pollBatchProgress() {
     }
 }
 
+// Aktualizácia UI podľa stavu batchu, vráti true ak sú všetky súbory dokončené
+function renderBatchProgress(data) {
+    // Update batch summary
+    const completed = data.completed + data.failed;
+    const total = data.total_files;
+    document.getElementById('batchProgress').textContent = `${completed} / ${total} súborov dokončených`;
+    
+    // Update individual file progress
+    const filesList = document.getElementById('filesList');
+    
+    for (const jobId in data.files) {
+        const fileData = data.files[jobId];
+        const fileItem = filesList.querySelector(`.file-item[data-job-id="${jobId}"]`);
+        
+        if (fileItem) {
+            const statusSpan = fileItem.querySelector('.file-status');
+            const cancelButton = fileItem.querySelector('.btn-cancel');
+            const progressFill = fileItem.querySelector('.progress-fill');
+            const progressText = fileItem.querySelector('.progress-text');
+            
+            // Update status text
+            if (fileData.status === 'pending') {
+                statusSpan.textContent = fileData.queue_position
+                    ? `Čaká sa... (poradie vo fronte: ${fileData.queue_position})`
+                    : 'Čaká sa...';
+                statusSpan.className = 'file-status status-pending';
+            } else if (fileData.status === 'processing') {
+                statusSpan.textContent = 'Spracováva sa...';
+                statusSpan.className = 'file-status status-processing';
+            } else if (fileData.status === 'completed') {
+                statusSpan.textContent = '✓ Hotovo';
+                statusSpan.className = 'file-status status-completed';
+            } else if (fileData.status === 'error') {
+                statusSpan.textContent = '✗ Chyba';
+                statusSpan.className = 'file-status status-error';
+            } else if (fileData.status === 'cancelled') {
+                statusSpan.textContent = '⊘ Zrušené';
+                statusSpan.className = 'file-status status-error';
+            }
+            cancelButton.hidden = !['pending', 'processing'].includes(fileData.status);
+            
+            // Update progress bar
+            const progress = Math.round(fileData.progress);
+            progressFill.style.width = `${progress}%`;
+            progressText.textContent = `${progress}%`;
+        }
+    }
+    
+    return completed >= total;
+}
+
 // Zobrazenie výsledkov batch kompresie
 function showBatchResults(data) {
     progressSection.style.display = 'none';
     resultSection.style.display = 'block';
     
     // Nastavenie štatistík
-    document.getElementById('totalProcessed').textContent = data.total_files;
+    document.getElementById('totalProcessed').textContent = data.total_files + uploadFailures.length;
     document.getElementById('totalSuccess').textContent = data.completed;
-    document.getElementById('totalFailed').textContent = data.failed;
+    document.getElementById('totalFailed').textContent = data.failed + uploadFailures.length;
     
     // Vytvorenie zoznamu výsledkov pre každý súbor
     const resultsFilesList = document.getElementById('resultsFilesList');
@@ -285,10 +455,10 @@ function showBatchResults(data) {
                 </button>
             `;
             resultItem.classList.add('result-success');
-        } else if (fileData.status === 'error') {
+        } else if (fileData.status === 'error' || fileData.status === 'cancelled') {
             resultItem.innerHTML = `
                 <div class="result-file-header">
-                    <span class="result-file-icon">✗</span>
+                    <span class="result-file-icon">${fileData.status === 'cancelled' ? '⊘' : '✗'}</span>
                     <span class="result-file-name">${fileData.filename}</span>
                 </div>
                 <div class="result-file-error">
@@ -300,6 +470,22 @@ function showBatchResults(data) {
         
         resultsFilesList.appendChild(resultItem);
     }
+    
+    // Súbory, ktoré sa nepodarilo nahrať
+    for (const failure of uploadFailures) {
+        const resultItem = document.createElement('div');
+        resultItem.className = 'result-file-item result-error';
+        resultItem.innerHTML = `
+            <div class="result-file-header">
+                <span class="result-file-icon">✗</span>
+                <span class="result-file-name">${failure.filename}</span>
+            </div>
+            <div class="result-file-error">
+                <span>${failure.error}</span>
+            </div>
+        `;
+        resultsFilesList.appendChild(resultItem);
+    }
 }
 
 // Zobrazenie chyby
@@ -321,6 +507,8 @@ function resetUpload() {
     currentBatchId = null;
     currentJobIds = [];
     selectedFiles = [];
+    uploadFailures = [];
+    batchCancelled = false;
     
     // Reset UI
     uploadArea.style.display = 'block';
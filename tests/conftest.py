@@ -0,0 +1,7 @@
+"""
+PDF Kompresor - Spoločné nastavenie testov (moduly projektu sú v koreni repozitára)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,60 @@
+"""
+PDF Kompresor - Testy dávkovej kompresie adresára (compress_directory)
+"""
+import shutil
+
+import pdf_compressor
+from batch_manifest import MANIFEST_FILENAME
+
+
+def fake_compress_pdf(input_path, output_path, **kwargs):
+    """Náhrada compress_pdf bez Poppler - výstup je kópia vstupu"""
+    assert input_path != output_path, "vstup a výstup sú ten istý súbor"
+    shutil.copyfile(input_path, output_path)
+    return True, "OK"
+
+
+def test_incremental_rerun_skips_previous_outputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_compressor, 'compress_pdf', fake_compress_pdf)
+    (tmp_path / 'a.pdf').write_bytes(b'%PDF-a')
+    (tmp_path / 'b.pdf').write_bytes(b'%PDF-b')
+
+    first = pdf_compressor.compress_directory(str(tmp_path), incremental=True)
+    assert first['success'] == 2
+
+    # Druhý beh nad tým istým adresárom s predvoleným výstupom (input/compressed)
+    second = pdf_compressor.compress_directory(str(tmp_path), incremental=True)
+    assert second['success'] == 0
+    assert second['failed'] == 0
+    assert second['skipped'] == 2
+
+    output_dir = tmp_path / 'compressed'
+    assert sorted(path.name for path in output_dir.iterdir()) == sorted(['a.pdf', 'b.pdf', MANIFEST_FILENAME])
+    assert (output_dir / 'a.pdf').read_bytes() == b'%PDF-a'
+    assert not (output_dir / 'compressed').exists()
+
+
+def test_incremental_rerun_after_settings_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_compressor, 'compress_pdf', fake_compress_pdf)
+    (tmp_path / 'a.pdf').write_bytes(b'%PDF-a')
+
+    assert pdf_compressor.compress_directory(str(tmp_path), incremental=True)['success'] == 1
+
+    # Nastavenie z prostredia, ktoré mení výstup - súbor sa spracuje znova
+    monkeypatch.setattr(pdf_compressor, 'PASSTHROUGH_MAX_BYTES_PER_PIXEL', 0.5)
+    rerun = pdf_compressor.compress_directory(str(tmp_path), incremental=True)
+    assert rerun['success'] == 1
+    assert rerun['skipped'] == 0
+
+
+def test_same_name_in_subdirectories_keeps_both(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_compressor, 'compress_pdf', fake_compress_pdf)
+    for name in ('a', 'b'):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'x.pdf').write_bytes(f'%PDF-{name}'.encode())
+
+    output_dir = tmp_path.parent / 'out'
+    results = pdf_compressor.compress_directory(str(tmp_path), str(output_dir))
+    assert results['success'] == 2
+    assert (output_dir / 'a' / 'x.pdf').read_bytes() == b'%PDF-a'
+    assert (output_dir / 'b' / 'x.pdf').read_bytes() == b'%PDF-b'
@@ -0,0 +1,23 @@
+"""
+PDF Kompresor - Testy plánovača kompresných úloh (JobScheduler)
+"""
+from job_scheduler import JobScheduler
+
+
+def test_start_failure_frees_slot_and_fails_job(tmp_path):
+    finished = []
+
+    def on_start(job_id):
+        raise RuntimeError("úložisko nedostupné")
+
+    scheduler = JobScheduler(
+        max_workers=1,
+        on_start=on_start,
+        on_finish=lambda job_id, success, message: finished.append((job_id, success, message))
+    )
+    input_path = tmp_path / 'a.pdf'
+    input_path.write_bytes(b'%PDF-a')
+    scheduler.submit('batch', 'job', str(input_path), str(tmp_path / 'out.pdf'), 150, 85)
+
+    assert finished == [('job', False, "Chyba worker procesu: úložisko nedostupné")]
+    assert scheduler.stats()['running'] == 0
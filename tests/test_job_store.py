@@ -0,0 +1,37 @@
+"""
+PDF Kompresor - Testy fronty v SQLite úložisku stavu (SqliteJobStore)
+"""
+import time
+
+from job_store import SUBMIT_TIMEOUT, SqliteJobStore
+
+
+def add_job(store, job_id, queued):
+    store.add_job(job_id, 'batch', job_id + '.pdf', {
+        'input_path': job_id + '.pdf',
+        'output_path': job_id + '_compressed.pdf',
+        'output_filename': job_id + '_compressed.pdf',
+        'queued': queued
+    })
+
+
+def test_claim_skips_job_still_being_submitted(tmp_path):
+    store = SqliteJobStore(str(tmp_path / 'jobs.db'))
+    store.create_batch('batch', 1, 150, 85)
+    add_job(store, 'fresh', time.time())
+
+    assert store.claim_job('worker', 1000, 60) is None
+
+
+def test_claim_takes_over_job_without_memory_estimate(tmp_path):
+    store = SqliteJobStore(str(tmp_path / 'jobs.db'))
+    store.create_batch('batch', 1, 150, 85)
+    # Webový proces spadol medzi add_job a set_job_memory
+    add_job(store, 'orphan', time.time() - SUBMIT_TIMEOUT - 1)
+
+    job = store.claim_job('worker', 1000, 60)
+    assert job['job_id'] == 'orphan'
+    assert job['memory_mb'] is None
+
+    store.set_job_memory('orphan', 200)
+    assert store.queue_stats(60)['memory_reserved_mb'] == 200
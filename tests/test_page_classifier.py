@@ -0,0 +1,47 @@
+"""
+PDF Kompresor - Testy klasifikácie a kódovania strán (page_classifier)
+"""
+import io
+
+from PIL import Image, ImageDraw
+
+from page_classifier import PAGE_BILEVEL, PAGE_GRAY, classify_page, route_jpeg_page
+
+
+def jpeg_bytes(image, quality=75):
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def test_route_jpeg_page_keeps_gray_jpeg():
+    # Šedý sken tak, ako ho zapíše pdftoppm -jpeg (RGB JPEG)
+    page = Image.linear_gradient('L').resize((600, 800)).convert('RGB')
+    data = jpeg_bytes(page)
+
+    kind, encoded = route_jpeg_page(data, 75, 150)
+    assert kind == PAGE_GRAY
+    assert encoded == data
+
+
+def text_page():
+    """Biela strana A4 (150 DPI) s riadkami čierneho textu"""
+    page = Image.new('L', (1240, 1754), 255)
+    draw = ImageDraw.Draw(page)
+    for top in range(150, 1600, 40):
+        for left in range(120, 1100, 60):
+            draw.rectangle((left, top, left + 40, top + 14), fill=0)
+    return page
+
+
+def test_text_page_is_bilevel():
+    assert classify_page(text_page()) == PAGE_BILEVEL
+
+
+def test_text_page_with_small_photo_is_gray():
+    page = text_page()
+    # Šedá fotografia na ~1 % plochy - celkový podiel poltónov je pod limitom
+    photo = Image.linear_gradient('L').resize((150, 150)).point(lambda value: 64 + value // 2)
+    page.paste(photo, (900, 1200))
+
+    assert classify_page(page) == PAGE_GRAY
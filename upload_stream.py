@@ -0,0 +1,133 @@
+"""
+PDF Kompresor - Streamované ukladanie nahrávaných súborov
+"""
+import os
+import uuid
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+from flask import Request
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+
+# PDF hlavička musí byť v prvom kilobajte súboru
+PDF_MAGIC = b'%PDF'
+PDF_MAGIC_WINDOW = 1024
+
+
+class UploadRejected(BadRequest):
+    """Nahrávaný súbor bol odmietnutý počas prenosu (nie je PDF)"""
+
+
+class PdfUploadStream:
+    """
+    Zapisovací stream pre jeden nahrávaný súbor.
+
+    Dáta z multipart parsera idú po blokoch priamo do dočasného súboru
+    v cieľovom adresári - bez medzikroku v pamäti či v /tmp. Počas zápisu
+    sa počíta SHA-256, kontroluje sa PDF hlavička a limit veľkosti, takže
+    neplatný alebo príliš veľký súbor sa odmietne hneď, ako sa to dá zistiť.
+    """
+
+    def __init__(self, directory: Path, filename: Optional[str], max_size: int):
+        self.filename = filename or ''
+        self.max_size = max_size
+        self.path = Path(directory) / f".upload_{uuid.uuid4().hex}.part"
+        self.size = 0
+        self.finalized = False
+        self._hasher = hashlib.sha256()
+        self._head = b''
+        self._file = open(self.path, 'w+b')
+
+    @property
+    def name(self) -> str:
+        return str(self.path)
+
+    @property
+    def sha256(self) -> str:
+        return self._hasher.hexdigest()
+
+    def _check_magic(self) -> None:
+        if PDF_MAGIC not in self._head:
+            self.discard()
+            raise UploadRejected(f'Súbor {self.filename} nie je platný PDF dokument')
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.discard()
+            raise RequestEntityTooLarge(
+                f'Súbor {self.filename} je príliš veľký. Maximum: {self.max_size / (1024*1024):.0f} MB'
+            )
+
+        if len(self._head) < PDF_MAGIC_WINDOW:
+            self._head += data[:PDF_MAGIC_WINDOW - len(self._head)]
+            if len(self._head) >= PDF_MAGIC_WINDOW:
+                self._check_magic()
+
+        self._hasher.update(data)
+        return self._file.write(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        # Parser po dokončení súboru volá seek(0) - krátky súbor kontrolujeme tu
+        if not self.finalized and len(self._head) < PDF_MAGIC_WINDOW:
+            self._check_magic()
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def finalize(self, target_path: Path) -> None:
+        """Presunie dokončený upload na cieľovú cestu (premenovanie, bez kopírovania)"""
+        self._file.close()
+        os.replace(self.path, target_path)
+        self.path = Path(target_path)
+        self.finalized = True
+
+    def discard(self) -> None:
+        """Zahodí nedokončený upload"""
+        if self.finalized:
+            return
+        self.finalized = True
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        # Upload, ktorý aplikácia neprevzala cez finalize(), sa zahodí
+        if not self.finalized:
+            self.discard()
+
+
+class StreamingUploadRequest(Request):
+    """
+    Flask Request, ktorý ukladá nahrávané súbory streamovane cez PdfUploadStream.
+
+    Cieľový adresár a limit veľkosti nastavuje aplikácia cez atribúty triedy.
+    """
+
+    upload_folder = Path('uploads')
+    max_file_size = 600 * 1024 * 1024
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        stream = PdfUploadStream(self.upload_folder, filename, self.max_file_size)
+        self.__dict__.setdefault('_upload_streams', []).append(stream)
+        return stream
+
+    def close(self) -> None:
+        super().close()
+        # Aj súbory rozpracované pri chybe parsovania (nie sú v request.files)
+        for stream in self.__dict__.get('_upload_streams', []):
+            stream.close()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+PDF Kompresor - Worker pre kompresné úlohy zo zdieľanej fronty
+Použitie: python worker.py [--workers N]
+
+Webová aplikácia (JOB_QUEUE=store) úlohy len zapisuje do SQLite úložiska
+(JOB_STORE_PATH), worker procesy si ich preberajú a výsledky zapisujú do
+zdieľaných adresárov uploads/compressed/cache. Viac workerov na viacerých
+uzloch zdieľajúcich tieto adresáre a databázu kapacitu sčítava.
+"""
+import os
+import sys
+import time
+import uuid
+import signal
+import socket
+import multiprocessing
+from multiprocessing.connection import wait
+from pathlib import Path
+
+from job_scheduler import (
+    COMPRESSION_WORKERS, JOB_TIMEOUT, MEMORY_BUDGET_MB, MEMORY_DEFER_TIMEOUT, WORKER_STALE_TIMEOUT,
+    JobProcess, default_memory_budget_mb, plan_job_memory
+)
+from job_profiler import profile_paths
+from job_store import STATUS_CANCELLED, SqliteJobStore
+from metrics import METRICS_ENABLED, record_job
+from result_cache import ResultCache
+
+CACHE_FOLDER = Path('cache')
+# Ako často sa worker bez práce pozrie do fronty (sekundy)
+WORKER_POLL_INTERVAL = float(os.environ.get('WORKER_POLL_INTERVAL', 1))
+# Interval heartbeatu počas kompresie (sekundy)
+WORKER_HEARTBEAT = int(os.environ.get('WORKER_HEARTBEAT', 10))
+# Ako často worker počas kompresie kontroluje, či úlohu niekto nezrušil (sekundy)
+WORKER_CANCEL_CHECK = float(os.environ.get('WORKER_CANCEL_CHECK', 1))
+
+
+def complete_job(job_store, result_cache, job_id, success, message) -> bool:
+    """
+    Zapíše výsledok úlohy do úložiska, uloží ho do cache a zmaže vstupný súbor.
+
+    Args:
+        job_store: Úložisko stavu úloh
+        result_cache: Cache výsledkov kompresie
+        job_id: ID úlohy
+        success: Či kompresia uspela
+        message: Správa z compress_pdf alebo popis chyby
+
+    Returns:
+        True, ak sa stav úlohy zmenil (úloha ešte nebola dokončená)
+    """
+    files = job_store.get_job_files(job_id)
+    if files is None:
+        return False
+    input_path = Path(files['input_path'])
+    output_path = Path(files['output_path'])
+
+    try:
+        if success:
+            # Získanie veľkostí súborov
+            original_size = input_path.stat().st_size / (1024 * 1024)  # MB
+            compressed_size = output_path.stat().st_size / (1024 * 1024)  # MB
+            compression_ratio = (1 - compressed_size / original_size) * 100
+
+            result = {
+                'output_file': files['output_filename'],
+                'original_size': original_size,
+                'compressed_size': compressed_size,
+                'compression_ratio': compression_ratio,
+                'message': message
+            }
+        else:
+            result = {'error': message}
+
+        # Profil úlohy sa dá stiahnuť aj pri chybe kompresie
+        if files.get('profile'):
+            result['profile_files'] = [
+                Path(path).name for path in profile_paths(output_path) if Path(path).exists()
+            ]
+    except Exception as e:
+        success = False
+        result = {'error': str(e)}
+
+        # Vymazanie výstupu pri chybe
+        try:
+            if output_path.exists():
+                output_path.unlink()
+        except:
+            pass
+
+    changed = job_store.finish_job(job_id, success, result) is not None
+
+    # Uloženie výsledku do cache pre opakované nahratie
+    if changed and success and not files.get('cache_hit'):
+        result_cache.put(files['cache_key'], output_path, message)
+
+    # Vymazanie vstupného súboru
+    try:
+        if input_path.exists():
+            input_path.unlink()
+    except:
+        pass
+
+    return changed
+
+
+def run_job(job_store, result_cache, job: dict, memory_share_mb: int, process: JobProcess) -> None:
+    """
+    Skomprimuje prevzatú úlohu v procese úlohy, počas behu posiela heartbeat a pokrok.
+
+    Úsporný režim (po jednej strane) určil odhad pamäte pri zaradení úlohy,
+    úloha bez odhadu (zo staršej verzie alebo po páde webového procesu pri
+    zaradení) sa odhadne až tu podľa podielu procesu na rozpočte
+    (memory_share_mb). Úloha zrušená vo webovej aplikácii alebo
+    bežiaca dlhšie ako JOB_TIMEOUT sa zabije aj s pdftoppm. Merania úlohy
+    sa zapíšu do metrík v zdieľanom úložisku (METRICS_ENABLED).
+    """
+    job_id = job['job_id']
+    queue_wait = max(0.0, time.time() - job['queued']) if job.get('queued') else None
+    if job.get('memory_mb'):
+        memory_mb, options = job['memory_mb'], dict(job.get('memory_options') or {})
+    else:
+        # Úloha bez odhadu (staršia verzia, nedokončené zaradenie) - rezervuje sa až teraz
+        memory_mb, options = plan_job_memory(job['input_path'], job['dpi'], memory_share_mb)
+        job_store.set_job_memory(job_id, memory_mb)
+    if options:
+        print(f"[{job_id}] Odhad pamate {memory_mb} MB - usporny rezim")
+    if job.get('profile'):
+        options = dict(options, profile=True)
+    args = (job_id, job['input_path'], job['output_path'], job['dpi'], job['jpeg_quality'],
+            options, bool(METRICS_ENABLED))
+
+    last_heartbeat = time.monotonic()
+    try:
+        process.start(args, JOB_TIMEOUT)
+        while True:
+            wait([process.connection], timeout=WORKER_CANCEL_CHECK)
+            progress, result = process.receive()
+            if progress is not None:
+                job_store.set_progress(job_id, progress)
+            if result is not None:
+                break
+
+            state = job_store.get_job(job_id)
+            if state is None or state['status'] == STATUS_CANCELLED:
+                # Stav a súbory zrušenej úlohy už upratala webová aplikácia
+                process.kill()
+                print(f"[{job_id}] Uloha zrusena")
+                return
+
+            # Počas renderovania veľkej stránky pokrok nemusí prísť dlho
+            if time.monotonic() - last_heartbeat >= WORKER_HEARTBEAT:
+                last_heartbeat = time.monotonic()
+                job_store.heartbeat(job_id)
+    except OSError as e:
+        # Proces úlohy nežije (napr. ho zabil OOM killer, kým čakal)
+        process.kill()
+        result = (False, f"Chyba worker procesu: {e}", None)
+    except BaseException:
+        # Worker sa ukončuje - úlohu prevezme iný worker
+        process.kill()
+        job_store.release_job(job_id)
+        raise
+
+    success, message, stats = result
+    complete_job(job_store, result_cache, job_id, success, message)
+    if METRICS_ENABLED:
+        stats = dict(stats or {})
+        if queue_wait is not None:
+            stats['queue_wait'] = queue_wait
+        record_job(job_store, job_id, success, stats)
+
+
+def _terminate(signum, frame):
+    raise SystemExit(0)
+
+
+def worker_loop(worker_id: str, memory_budget_mb: int, memory_share_mb: int) -> None:
+    """
+    Hlavná slučka jedného worker procesu - preberá úlohy, kým nie je ukončený.
+
+    Úlohu prevezme, len ak sa jej odhad pamäte zmestí do spoločného rozpočtu
+    (memory_budget_mb) vedľa úloh bežiacich vo všetkých workeroch.
+    """
+    signal.signal(signal.SIGTERM, _terminate)
+
+    job_store = SqliteJobStore()
+    result_cache = ResultCache(CACHE_FOLDER)
+    context = multiprocessing.get_context('spawn')
+    process = None
+    last_stale_check = 0
+
+    print(f"[{worker_id}] Worker spusteny")
+    try:
+        while True:
+            job = job_store.claim_job(worker_id, memory_budget_mb, MEMORY_DEFER_TIMEOUT)
+            if job is not None:
+                print(f"[{worker_id}] Kompresia {job['job_id']}")
+                # Proces úlohy sa používa znova, po zabití sa nahradí novým
+                if process is None or process.killed or not process.process.is_alive():
+                    process = JobProcess(context)
+                run_job(job_store, result_cache, job, memory_share_mb, process)
+                continue
+
+            # Bez práce - úlohy mŕtvych workerov sa vrátia do fronty
+            if time.time() - last_stale_check > WORKER_STALE_TIMEOUT / 2:
+                last_stale_check = time.time()
+                requeued = job_store.requeue_stale(WORKER_STALE_TIMEOUT)
+                if requeued:
+                    print(f"[{worker_id}] Vratene do fronty po vypadku workera: {requeued}")
+
+            time.sleep(WORKER_POLL_INTERVAL)
+    except (KeyboardInterrupt, SystemExit):
+        print(f"[{worker_id}] Worker ukonceny")
+    finally:
+        if process is not None:
+            process.kill()
+
+
+def parse_args(argv):
+    """
+    Spracuje argumenty príkazového riadku.
+
+    Returns:
+        Počet worker procesov alebo None pri neplatných argumentoch
+    """
+    workers = COMPRESSION_WORKERS
+
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        try:
+            if arg in ('-w', '--workers'):
+                workers = int(argv[i + 1])
+                i += 1
+            elif arg.startswith('--workers='):
+                workers = int(arg.split('=', 1)[1])
+            else:
+                return None
+        except (IndexError, ValueError):
+            return None
+        i += 1
+
+    return workers if workers >= 1 else None
+
+
+def main():
+    workers = parse_args(sys.argv[1:])
+    if workers is None:
+        print("Použitie: python worker.py [--workers N]")
+        print(f"\n  -w, --workers N   Počet paralelných kompresií (default COMPRESSION_WORKERS={COMPRESSION_WORKERS})")
+        sys.exit(1)
+
+    # Jeden proces na kompresiu - JPEG enkódovanie nie je obmedzené GIL
+    context = multiprocessing.get_context('spawn')
+    host = socket.gethostname()
+    processes = {}
+    # Rozpočet pamäte je spoločný pre všetky workery fronty - rezervuje sa
+    # v úložisku pri prevzatí úlohy
+    memory_budget_mb = MEMORY_BUDGET_MB or default_memory_budget_mb()
+    memory_share_mb = memory_budget_mb // workers
+
+    def start(index):
+        worker_id = f"{host}-{index}-{uuid.uuid4().hex[:6]}"
+        process = context.Process(target=worker_loop, args=(worker_id, memory_budget_mb, memory_share_mb),
+                                  daemon=False)
+        process.start()
+        processes[index] = process
+
+    def stop(signum, frame):
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print(f"Spustam {workers} worker procesov (fronta: {SqliteJobStore().path}, "
+          f"rozpocet pamate: {memory_budget_mb} MB)")
+    for index in range(workers):
+        start(index)
+
+    # Spadnutý proces (napr. OOM) sa nahradí novým
+    while True:
+        time.sleep(5)
+        for index, process in list(processes.items()):
+            if not process.is_alive():
+                print(f"Worker {index} skoncil s kodom {process.exitcode}, spustam znova")
+                start(index)
+
+
+if __name__ == "__main__":
+    main()
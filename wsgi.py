@@ -0,0 +1,5 @@
+"""
+PDF Kompresor - WSGI vstupný bod pre produkčný server
+Použitie: gunicorn --config gunicorn.conf.py wsgi:app
+"""
+from app import app